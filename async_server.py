@@ -0,0 +1,184 @@
+# async_server.py
+import asyncio
+from urllib.parse import quote, unquote, parse_qs
+
+try:
+    import uvicorn
+    from asgiref.wsgi import WsgiToAsgi
+except ImportError: # Optional: only needed for SERVER_MODE=async
+    uvicorn = None
+    WsgiToAsgi = None
+
+ASYNC_AVAILABLE = uvicorn is not None and WsgiToAsgi is not None
+
+from werkzeug.test import EnvironBuilder
+from flask_login import current_user
+
+from models import db
+from streaming import WAITING_MESSAGE, status_part, select_stream
+
+STREAM_PREFIX = "/video_feed/"
+
+
+class AsyncStreamServer:
+    """
+    ASGI app: /video_feed/<id> is served from the event loop out of a FrameBroadcaster, everything
+    else (login, alerts, security mode, camera APIs...) is passed to the Flask app unchanged.
+    """
+    def __init__(self, flask_app, broadcaster, camera_registry, placeholder_interval=0.5):
+        self.flask_app = flask_app
+        self.flask_asgi = WsgiToAsgi(flask_app)
+        self.broadcaster = broadcaster
+        self.camera_registry = camera_registry
+        self.placeholder_interval = placeholder_interval
+        self.loop = None
+        self.frame_events = {} # { camera_id: asyncio.Event } set when the encoder publishes a frame
+        self.stats = {"clients": 0, "frames_sent": 0, "frames_skipped": 0}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http" and scope["path"].startswith(STREAM_PREFIX):
+            await self._stream(scope, receive, send)
+        else:
+            await self.flask_asgi(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                self.loop = asyncio.get_running_loop()
+                self.broadcaster.add_listener(self._on_frame)
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    # --- Frame notifications (called from the StreamEncoder thread) ---
+    def _on_frame(self, camera_id):
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self._wake, camera_id)
+
+    def _wake(self, camera_id):
+        event = self.frame_events.pop(camera_id, None)
+        if event is not None:
+            event.set() # Wakes every client of this camera; they re-arm with a fresh Event
+
+    async def _next_frame(self, camera_id, after_version, timeout):
+        current = self.broadcaster.latest(camera_id)
+        if current is not None and current[0] != after_version:
+            return current
+        event = self.frame_events.get(camera_id)
+        if event is None:
+            event = self.frame_events[camera_id] = asyncio.Event()
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        return self.broadcaster.latest(camera_id)
+
+    # --- Auth (Flask session cookie) ---
+    def _authenticate(self, scope):
+        """ Runs the normal Flask-Login loader on the request's cookies. True if logged in. """
+        headers = [(k.decode("latin-1"), v.decode("latin-1")) for k, v in scope.get("headers", [])]
+        environ = EnvironBuilder(path=scope["path"], headers=headers).get_environ()
+        with self.flask_app.request_context(environ):
+            authenticated = current_user.is_authenticated
+            db.session.remove() # Nothing stays checked out for the life of the stream
+        return authenticated
+
+    # --- MJPEG stream ---
+    async def _respond(self, send, status, body, content_type=b"text/plain"):
+        await send({"type": "http.response.start", "status": status, "headers": [(b"content-type", content_type)]})
+        await send({"type": "http.response.body", "body": body})
+
+    async def _stream(self, scope, receive, send):
+        loop = asyncio.get_running_loop()
+        if not await loop.run_in_executor(None, self._authenticate, scope): # Once, when the connection opens
+            login_url = "/login?next=" + quote(scope["path"])
+            await send({"type": "http.response.start", "status": 302, "headers": [(b"location", login_url.encode())]})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        camera_id = unquote(scope["path"][len(STREAM_PREFIX):])
+        entry = self.camera_registry.get(camera_id) # O(1) lookup
+        if entry is None:
+            print(f"Warning: Requested camera_id '{camera_id}' not found in camera registry.")
+            await self._respond(send, 404, b"Camera not found")
+            return
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        # Stream key: the camera ID, or (camera_id, "main") for ?quality=full on a dual-stream camera
+        camera_id = select_stream(entry.camera_id, entry.processor, (query.get("quality") or [None])[0])
+
+        disconnected = asyncio.Event()
+        async def watch_disconnect():
+            while True:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    disconnected.set()
+                    return
+        watcher = asyncio.create_task(watch_disconnect())
+
+        self.broadcaster.subscribe(camera_id)
+        self.stats["clients"] += 1
+        try:
+            await send({"type": "http.response.start", "status": 200,
+                        "headers": [(b"content-type", b"multipart/x-mixed-replace; boundary=frame"),
+                                    (b"cache-control", b"no-cache")]})
+            last_version = None
+            while not disconnected.is_set():
+                current = await self._next_frame(camera_id, last_version, self.placeholder_interval)
+                if disconnected.is_set():
+                    break
+                if not self.broadcaster.is_watched(camera_id):
+                    await send({"type": "http.response.body", "body": b"", "more_body": False}) # Camera removed
+                    break
+                if current is None:
+                    if last_version is None:
+                        await send({"type": "http.response.body", "body": status_part(WAITING_MESSAGE), "more_body": True})
+                    continue
+                version, chunk = current
+                # `send` waits while the socket is backed up; frames published meanwhile are simply
+                # replaced by newer ones, so a slow client always gets the latest frame, never a backlog
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+                if last_version is not None and version - last_version > 1:
+                    self.stats["frames_skipped"] += version - last_version - 1 # Versions are consecutive per stream
+                last_version = version
+                self.stats["frames_sent"] += 1
+        except (OSError, RuntimeError):
+            pass # Client went away mid-send
+        finally:
+            watcher.cancel()
+            self.broadcaster.unsubscribe(camera_id)
+            self.stats["clients"] -= 1
+
+
+def serve(flask_app, broadcaster, camera_registry, host, port):
+    """ Runs the ASGI server (blocking). """
+    if not ASYNC_AVAILABLE:
+        raise RuntimeError("SERVER_MODE=async needs the optional 'uvicorn' and 'asgiref' packages "
+                           "(pip install -r requirements-async.txt)")
+    server = AsyncStreamServer(flask_app, broadcaster, camera_registry)
+    print(f"[Async] Serving on http://{host}:{port} (MJPEG on the event loop, other routes via Flask)")
+    uvicorn.run(server, host=host, port=port, lifespan="on", log_level="warning")
+
+
+"""
+async_server.py
+
+Optional async serving mode (`Config.SERVER_MODE = "async"`).
+
+With `app.run(threaded=True)` every MJPEG viewer holds an OS thread for as long as it watches.
+Here a single uvicorn event loop serves all /video_feed/<id> connections:
+
+    - Frames come pre-encoded from `streaming.FrameBroadcaster` (one JPEG encode per camera per tick,
+      shared by all viewers). The encoder thread wakes the loop through `call_soon_threadsafe`.
+    - Backpressure: each client holds only the version it last sent. While `send` waits on a slow
+      socket, newer frames overwrite the slot; the client then sends the newest one, so stale frames
+      are dropped instead of queued (`stats["frames_skipped"]`).
+    - Auth: the Flask session cookie is checked once when the stream opens, using the normal
+      Flask-Login loader (user cache) in a worker thread; unauthenticated clients are redirected to /login.
+    - All other routes (login, /api/alerts, /api/security_mode, camera/subscription APIs, ...) are
+      forwarded to the unchanged Flask app through asgiref's `WsgiToAsgi` (run in its thread pool).
+
+Requires `uvicorn` and `asgiref` (optional, see requirements-async.txt).
+"""
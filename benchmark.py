@@ -0,0 +1,1108 @@
+# benchmark.py
+import os
+import sys
+import time
+import json
+import csv
+import queue
+import shutil
+import asyncio
+import argparse
+import tempfile
+import functools
+import threading
+import tracemalloc
+from urllib.parse import urlparse
+
+import cv2
+import numpy as np
+
+from config import Config
+from camera_processor import CameraProcessor, ThreatDetector
+from event_log import DetectionEventLog
+from frame_slots import FrameSlots
+
+
+# --- Synthetic Sources ---
+class SyntheticCapture:
+    """ Behaves like a live `cv2.VideoCapture`: generates frames in real time at a fixed FPS. """
+    def __init__(self, width, height, fps):
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.frame_interval = 1.0 / fps
+        self.start_time = time.time()
+        self.last_index = -1
+        self.frames_delivered = 0
+        self.frames_dropped = 0 # Frames the "camera" produced that nobody read in time
+        self.opened = True
+        # Pre-generate a background so each frame only costs a copy + one rectangle
+        rng = np.random.default_rng(0)
+        self.background = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+
+    def isOpened(self):
+        return self.opened
+
+    def read(self):
+        if not self.opened:
+            return False, None
+        # Wait for the next frame to be "captured", like a real camera would
+        next_index = self.last_index + 1
+        due = self.start_time + next_index * self.frame_interval
+        now = time.time()
+        if now < due:
+            time.sleep(due - now)
+            now = due
+        # A live source always hands out its newest frame; anything older is lost
+        current_index = int((now - self.start_time) / self.frame_interval)
+        if current_index > next_index:
+            self.frames_dropped += current_index - next_index
+        self.last_index = current_index
+
+        frame = self.background.copy()
+        # Moving box so motion-based features have something to look at
+        box = max(8, self.height // 8)
+        x = int((current_index * 7) % max(1, self.width - box))
+        y = int((current_index * 3) % max(1, self.height - box))
+        cv2.rectangle(frame, (x, y), (x + box, y + box), (0, 0, 255), -1)
+        self.frames_delivered += 1
+        return True, frame
+
+    def release(self):
+        self.opened = False
+
+
+class LoopingVideoCapture:
+    """ Plays a local video file forever at a fixed FPS (rewinds on end of file). """
+    def __init__(self, path, width=None, height=None, fps=None):
+        self.path = path
+        self.cap = cv2.VideoCapture(path)
+        self.width = width
+        self.height = height
+        self.fps = fps or self.cap.get(cv2.CAP_PROP_FPS) or 25.0
+        self.frame_interval = 1.0 / self.fps
+        self.next_due = time.time()
+        self.frames_delivered = 0
+        self.frames_dropped = 0
+
+    def isOpened(self):
+        return self.cap is not None and self.cap.isOpened()
+
+    def read(self):
+        now = time.time()
+        if now < self.next_due:
+            time.sleep(self.next_due - now)
+        else:
+            # Reader fell behind: skip the frames a live camera would have dropped
+            late_frames = int((now - self.next_due) / self.frame_interval)
+            for _ in range(late_frames):
+                if not self.cap.grab():
+                    self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            self.frames_dropped += late_frames
+            self.next_due += late_frames * self.frame_interval
+        self.next_due += self.frame_interval
+
+        ret, frame = self.cap.read()
+        if not ret:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0) # Loop
+            ret, frame = self.cap.read()
+            if not ret:
+                return False, None
+        if self.width and self.height and (frame.shape[1], frame.shape[0]) != (self.width, self.height):
+            frame = cv2.resize(frame, (self.width, self.height), interpolation=cv2.INTER_LINEAR)
+        self.frames_delivered += 1
+        return True, frame
+
+    def release(self):
+        if self.cap:
+            self.cap.release()
+
+
+# Picklable capture factories for `cameras --workers` (sent to spawned worker processes)
+def synthetic_capture(width, height, fps, _source):
+    return SyntheticCapture(width, height, fps)
+
+
+def looping_video_capture(videos, width, height, fps, source):
+    camera_index = int(str(source).rsplit("/", 1)[-1]) # "bench://<cam_id>"
+    return LoopingVideoCapture(videos[camera_index % len(videos)], width, height, fps)
+
+
+# --- Stub Detector ---
+class StubDetector:
+    """ Drop-in replacement for ThreatDetector with a fixed latency and canned detections. """
+    def __init__(self, latency_s, class_name="knife", detections_per_frame=1, is_primary_threat=True):
+        self.latency_s = latency_s
+        self.class_name = class_name
+        self.detections_per_frame = detections_per_frame
+        self.is_primary_threat = is_primary_threat
+
+    def detect(self, frame):
+        time.sleep(self.latency_s)
+        h, w = frame.shape[:2]
+        detections = [{
+            "class": self.class_name,
+            "confidence": 0.9,
+            "is_primary_threat": self.is_primary_threat,
+            "bbox": [w * 0.25, h * 0.25, w * 0.5, h * 0.5],
+        } for _ in range(self.detections_per_frame)]
+        return detections
+
+
+# --- Resource Sampling ---
+def read_rss_bytes():
+    """ Current resident set size of this process (Linux /proc, falls back to peak RSS). """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def read_process_usage(pid):
+    """ (cpu_seconds, rss_bytes) of another process from /proc, or (0.0, 0) if unavailable. """
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            fields = f.read().rsplit(')', 1)[1].split() # Skip "pid (comm)"; comm may contain spaces
+        with open(f'/proc/{pid}/statm') as f:
+            rss = int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK'), rss # utime + stime
+    except (OSError, ValueError, IndexError):
+        return 0.0, 0
+
+
+class ResourceSampler(threading.Thread):
+    """
+    Samples process CPU usage (% of one core) and RSS at a fixed interval. `child_pids` (callable)
+    adds other processes, e.g. camera workers, to both numbers.
+    """
+    def __init__(self, interval=0.5, child_pids=None):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.child_pids = child_pids or (lambda: [])
+        self.samples = [] # [(wall_time, cpu_percent, rss_bytes)]
+        self.stop_event = threading.Event()
+
+    def _usage(self):
+        cpu, rss = sum(os.times()[:2]), read_rss_bytes()
+        for pid in self.child_pids():
+            child_cpu, child_rss = read_process_usage(pid)
+            cpu += child_cpu
+            rss += child_rss
+        return cpu, rss
+
+    def run(self):
+        last_wall = time.time()
+        last_cpu = self._usage()[0]
+        while not self.stop_event.wait(self.interval):
+            wall = time.time()
+            cpu, rss = self._usage()
+            # Clamped: a restarted worker's counter starts again from zero
+            cpu_percent = max(0.0, 100.0 * (cpu - last_cpu) / max(wall - last_wall, 1e-6))
+            self.samples.append((wall, cpu_percent, rss))
+            last_wall, last_cpu = wall, cpu
+
+    def stop(self):
+        self.stop_event.set()
+        self.join(timeout=2.0)
+
+    def summary(self, since=0.0):
+        samples = [s for s in self.samples if s[0] >= since] or self.samples
+        if not samples:
+            return {"cpu_percent_avg": None, "cpu_percent_max": None, "rss_mb_avg": None, "rss_mb_max": None}
+        cpu = [s[1] for s in samples]
+        rss = [s[2] / (1024 * 1024) for s in samples]
+        return {
+            "cpu_percent_avg": round(sum(cpu) / len(cpu), 1),
+            "cpu_percent_max": round(max(cpu), 1),
+            "rss_mb_avg": round(sum(rss) / len(rss), 1),
+            "rss_mb_max": round(max(rss), 1),
+        }
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100.0
+    lower = int(k)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (k - lower)
+
+
+# --- Scenario Runner ---
+def make_capture_factory(args):
+    if args.video:
+        videos = list(args.video)
+        counter = {"n": 0}
+        def factory(_source):
+            # Round-robin the given files across cameras
+            path = videos[counter["n"] % len(videos)]
+            counter["n"] += 1
+            return LoopingVideoCapture(path, args.width, args.height, args.fps)
+        return factory
+    return lambda _source: SyntheticCapture(args.width, args.height, args.fps)
+
+
+def make_detector(args):
+    if args.detector == "stub":
+        return StubDetector(latency_s=args.stub_latency_ms / 1000.0)
+    return ThreatDetector.from_config(Config, model_path=args.model)
+
+
+class AlertLatencyConsumer(threading.Thread):
+    """ Stands in for alert_processor_thread: records capture-to-alert latency of detections captured after `since`. """
+    def __init__(self, alert_queue):
+        super().__init__(daemon=True)
+        self.alert_queue = alert_queue
+        self.since = float("inf")
+        self.latencies = []
+        self.stop_event = threading.Event()
+
+    def run(self):
+        while not self.stop_event.is_set():
+            try:
+                detection = self.alert_queue.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            now = time.time()
+            if detection.get("capture_time", 0) >= self.since:
+                self.latencies.append(now - detection["capture_time"])
+            self.alert_queue.task_done()
+
+    def stop(self):
+        self.stop_event.set()
+        self.join(timeout=2.0)
+
+
+def scenario_result(num_cameras, num_workers, elapsed, start_stats, end_stats, latencies, resources,
+                    source_delivered=None, source_dropped=None):
+    """ One result row (same columns for thread and worker-process runs). """
+    def delta(key):
+        return sum(e[key] - s[key] for s, e in zip(start_stats, end_stats))
+
+    detection_fps = delta("frames_detected") / elapsed
+    source_total = (source_dropped or 0) + (source_delivered or 0)
+    result = {
+        "cameras": num_cameras,
+        "workers": num_workers, # 0 = CameraProcessor threads in this process
+        "duration_s": round(elapsed, 2),
+        "capture_fps_total": round(delta("frames_captured") / elapsed, 2),
+        "detection_fps_total": round(detection_fps, 2),
+        "detection_fps_per_camera": round(detection_fps / num_cameras, 2),
+        "source_frames_delivered": source_delivered,
+        "source_frames_dropped": source_dropped,
+        "source_drop_ratio": round(source_dropped / max(source_total, 1), 4) if source_dropped is not None else None,
+        "alerts_dropped": delta("alerts_dropped"),
+        "alerts_received": len(latencies),
+    }
+    for pct in (50, 90, 95, 99):
+        value = percentile(latencies, pct)
+        result[f"latency_p{pct}_ms"] = round(value * 1000, 2) if value is not None else None
+    result["latency_max_ms"] = round(max(latencies) * 1000, 2) if latencies else None
+    result.update(resources)
+    return result
+
+
+def run_scenario(num_cameras, args, snapshot_dir):
+    """ Runs `num_cameras` CameraProcessors for warm-up + duration seconds and measures them. """
+    bench_config = type("BenchConfig", (Config,), {"SNAPSHOT_DIR": snapshot_dir})
+    alert_queue = queue.Queue(maxsize=args.queue_size)
+    latest_frames = FrameSlots()
+    capture_factory = make_capture_factory(args)
+
+    processors = []
+    for cam_id in range(num_cameras):
+        processor = CameraProcessor(
+            camera_id=cam_id,
+            camera_source=f"bench://{cam_id}",
+            config=bench_config,
+            alert_queue=alert_queue,
+            frame_dict=latest_frames,
+            detector=make_detector(args),
+            capture_factory=capture_factory
+        )
+        processor.enable_resizing = not args.no_resize
+        processor.enable_frame_skipping = args.detect_every > 1
+        processor.detect_every_n_frames = max(1, args.detect_every)
+        processor.always_publish = not args.no_viewers # Simulate a connected stream client
+        processors.append(processor)
+
+    consumer = AlertLatencyConsumer(alert_queue)
+    sampler = ResourceSampler(interval=args.sample_interval)
+    sampler.start()
+    consumer.start()
+    for processor in processors:
+        processor.start()
+
+    time.sleep(args.warmup)
+    consumer.since = time.time()
+    start_stats = [dict(p.stats) for p in processors]
+    # The source counters live on the wrapped capture (CameraProcessor reads through TimedCapture)
+    sources = {}
+    def source_counts():
+        for p in processors:
+            if p.cap is not None and p.cap.capture is not None:
+                sources[p.camera_id] = p.cap.capture
+        return (sum(getattr(s, "frames_delivered", 0) for s in sources.values()),
+                sum(getattr(s, "frames_dropped", 0) for s in sources.values()))
+    start_delivered, start_dropped = source_counts()
+    time.sleep(args.duration)
+    elapsed = time.time() - consumer.since
+    end_stats = [dict(p.stats) for p in processors]
+    end_delivered, end_dropped = source_counts()
+
+    for processor in processors:
+        processor.stop()
+    for processor in processors:
+        processor.join(timeout=5.0)
+    consumer.stop()
+    sampler.stop()
+    return scenario_result(num_cameras, 0, elapsed, start_stats, end_stats, consumer.latencies,
+                           sampler.summary(since=consumer.since),
+                           source_delivered=end_delivered - start_delivered, source_dropped=end_dropped - start_dropped)
+
+
+def run_worker_scenario(num_cameras, num_workers, args):
+    """
+    Same measurement with the cameras sharded over `num_workers` CameraSupervisor processes (frames
+    through shared memory, detections over the IPC queue). Counters come from the workers' status
+    reports; CPU and RSS include the worker processes.
+    """
+    from camera_supervisor import CameraSupervisor
+
+    alert_queue = queue.Queue(maxsize=args.queue_size)
+    if args.video:
+        capture_factory = functools.partial(looping_video_capture, list(args.video), args.width, args.height, args.fps)
+    else:
+        capture_factory = functools.partial(synthetic_capture, args.width, args.height, args.fps)
+    if args.detector == "stub":
+        # Neither a threat nor a person: workers save snapshots to Config.SNAPSHOT_DIR, so don't trigger any
+        detector_factory = functools.partial(StubDetector, args.stub_latency_ms / 1000.0,
+                                             class_name="car", is_primary_threat=False)
+    else:
+        detector_factory = functools.partial(ThreatDetector.from_config, Config, model_path=args.model)
+    settings = {"enable_resizing": not args.no_resize, "enable_frame_skipping": args.detect_every > 1,
+                "detect_every_n_frames": max(1, args.detect_every)}
+
+    supervisor = CameraSupervisor(Config, num_workers, alert_queue,
+                                  detector_factory=detector_factory, capture_factory=capture_factory)
+    consumer = AlertLatencyConsumer(alert_queue)
+    sampler = ResourceSampler(interval=args.sample_interval,
+                              child_pids=lambda: [w["process"].pid for w in supervisor.workers if w["process"]])
+    supervisor.start()
+    sampler.start()
+    consumer.start()
+    camera_ids = list(range(num_cameras))
+    try:
+        for camera_id in camera_ids:
+            supervisor.create_handle(camera_id, f"bench://{camera_id}", settings).start()
+        # Workers load their model before reporting; don't let that count towards the warm-up
+        deadline = time.time() + 120.0
+        while time.time() < deadline and any(supervisor.camera_state(c) != "streaming" for c in camera_ids):
+            time.sleep(0.2)
+        time.sleep(args.warmup)
+        consumer.since = time.time()
+        start_stats = [supervisor.camera_stats(c) or {} for c in camera_ids]
+        time.sleep(args.duration)
+        end_stats = [supervisor.camera_stats(c) or {} for c in camera_ids]
+        elapsed = time.time() - consumer.since
+    finally:
+        supervisor.stop()
+        consumer.stop()
+        sampler.stop()
+    keys = ("frames_captured", "frames_detected", "alerts_dropped")
+    start_stats = [{k: s.get(k, 0) for k in keys} for s in start_stats]
+    end_stats = [{k: e.get(k, 0) for k in keys} for e in end_stats]
+    return scenario_result(num_cameras, num_workers, elapsed, start_stats, end_stats, consumer.latencies,
+                           sampler.summary(since=consumer.since))
+
+
+# --- Output ---
+def write_results(results, args, output_dir, prefix="camera_scaling"):
+    os.makedirs(output_dir, exist_ok=True)
+    stamp = time.strftime("%Y%m%d_%H%M%S")
+    json_path = os.path.join(output_dir, f"{prefix}_{stamp}.json")
+    csv_path = os.path.join(output_dir, f"{prefix}_{stamp}.csv")
+    with open(json_path, "w") as f:
+        json.dump({
+            "timestamp": time.time(),
+            "host": os.uname().nodename if hasattr(os, "uname") else None,
+            "cpu_count": os.cpu_count(),
+            "args": vars(args),
+            "results": results,
+        }, f, indent=2, default=str)
+    if results:
+        with open(csv_path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(results[0].keys()))
+            writer.writeheader()
+            writer.writerows(results)
+    print(f"[Bench] Results written to {json_path} and {csv_path}")
+    return json_path, csv_path
+
+
+def parse_camera_counts(value):
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def cmd_cameras(args):
+    snapshot_dir = tempfile.mkdtemp(prefix="sentry_bench_snapshots_")
+    results = []
+    try:
+        for num_workers in args.workers or [0]:
+            for num_cameras in args.cameras:
+                mode = f"{num_workers} worker process(es)" if num_workers else "threads"
+                print(f"[Bench] Running {num_cameras} camera(s) on {mode} for {args.duration}s "
+                      f"({args.width}x{args.height} @ {args.fps} FPS, detector={args.detector})...")
+                if num_workers:
+                    result = run_worker_scenario(num_cameras, num_workers, args)
+                else:
+                    result = run_scenario(num_cameras, args, snapshot_dir)
+                results.append(result)
+                print(f"[Bench]   detection FPS {result['detection_fps_total']} total "
+                      f"({result['detection_fps_per_camera']}/cam), p95 latency {result['latency_p95_ms']} ms, "
+                      f"dropped {result['source_frames_dropped']} frames, CPU {result['cpu_percent_avg']}%, "
+                      f"RSS {result['rss_mb_max']} MB")
+    finally:
+        shutil.rmtree(snapshot_dir, ignore_errors=True)
+    write_results(results, args, args.output_dir)
+    return results
+
+
+# --- Cascade Recall ---
+def load_labels(path):
+    """ Labels file: {"video.mp4": {"<frame_index>": ["knife", "person"], ...}, ...} """
+    if not path:
+        return {}
+    with open(path) as f:
+        raw = json.load(f)
+    return {os.path.basename(video): {int(k): set(v) for k, v in frames.items()} for video, frames in raw.items()}
+
+
+def cmd_cascade(args):
+    """ Measures the recall cost and speed-up of the cascade against the main model (or labels). """
+    bench_config = type("BenchConfig", (Config,), {"CASCADE_ENABLED": True})
+    if args.screen_model:
+        bench_config.SCREEN_MODEL_PATH = args.screen_model
+    if args.crops:
+        bench_config.CASCADE_ESCALATE_ON_CROPS = True
+    detector = ThreatDetector.from_config(bench_config, model_path=args.model)
+    if detector.screen_model is None:
+        print("[Bench] Screening model failed to load; nothing to compare.")
+        return []
+    labels = load_labels(args.labels)
+    watched = set(Config.PRIMARY_THREAT_CLASSES) | {Config.PERSON_CLASS_NAME}
+
+    results = []
+    for video in args.video:
+        cap = cv2.VideoCapture(video)
+        video_labels = labels.get(os.path.basename(video))
+        totals = {"frames": 0, "expected": 0, "found_reference": 0, "found_cascade": 0,
+                  "reference_time": 0.0, "cascade_time": 0.0}
+        per_class = {} # { class: [expected, found by main model, found by cascade] }
+        frame_index = -1
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frame_index += 1
+            if video_labels is not None:
+                if frame_index not in video_labels:
+                    continue # Only (and every one of) the labelled frames are scored when labels are given
+            elif frame_index % args.every != 0:
+                continue
+
+            t0 = time.perf_counter()
+            reference = detector.detect_without_cascade(frame)
+            t1 = time.perf_counter()
+            cascade = detector.detect(frame)
+            t2 = time.perf_counter()
+
+            reference_classes = {d["class"] for d in reference} & watched
+            cascade_classes = {d["class"] for d in cascade} & watched
+            # Ground truth is the label set if given, otherwise what the main model alone finds
+            expected = (video_labels[frame_index] & watched) if video_labels is not None else reference_classes
+            totals["frames"] += 1
+            totals["expected"] += len(expected)
+            totals["found_reference"] += len(expected & reference_classes)
+            totals["found_cascade"] += len(expected & cascade_classes)
+            for cls in expected:
+                counts = per_class.setdefault(cls, [0, 0, 0])
+                counts[0] += 1
+                counts[1] += cls in reference_classes
+                counts[2] += cls in cascade_classes
+            totals["reference_time"] += t1 - t0
+            totals["cascade_time"] += t2 - t1
+        cap.release()
+
+        frames = max(totals["frames"], 1)
+        results.append({
+            "video": video,
+            "ground_truth": "labels" if video_labels is not None else "main_model",
+            "frames_scored": totals["frames"],
+            "expected_objects": totals["expected"],
+            "recall_main_model": round(totals["found_reference"] / totals["expected"], 4) if totals["expected"] else None,
+            "recall_cascade": round(totals["found_cascade"] / totals["expected"], 4) if totals["expected"] else None,
+            "main_model_ms_per_frame": round(1000 * totals["reference_time"] / frames, 2),
+            "cascade_ms_per_frame": round(1000 * totals["cascade_time"] / frames, 2),
+            "per_class": {cls: {"expected": n, "recall_main_model": round(ref / n, 4), "recall_cascade": round(cas / n, 4)}
+                          for cls, (n, ref, cas) in sorted(per_class.items())},
+        })
+        print(f"[Bench] {video}: recall main={results[-1]['recall_main_model']} cascade={results[-1]['recall_cascade']}, "
+              f"{results[-1]['main_model_ms_per_frame']} -> {results[-1]['cascade_ms_per_frame']} ms/frame")
+        for cls, row in results[-1]["per_class"].items():
+            print(f"[Bench]   {cls}: n={row['expected']} recall main={row['recall_main_model']} cascade={row['recall_cascade']}")
+
+    stage_stats = detector.get_stats()
+    print(f"[Bench] Cascade stages: screen hit rate {stage_stats['screen_hit_rate']}, confirm rate {stage_stats['confirm_rate']}")
+    for row in results:
+        row["screen_hit_rate"] = stage_stats["screen_hit_rate"]
+        row["confirm_rate"] = stage_stats["confirm_rate"]
+    write_results(results, args, args.output_dir, prefix="cascade_recall")
+    return results
+
+
+# --- Event Log ---
+def cmd_events(args):
+    """ Fills a scratch event log with synthetic detections and times appends and queries over it. """
+    log_dir = tempfile.mkdtemp(prefix="sentry_bench_events_")
+    classes = list(Config.PRIMARY_THREAT_CLASSES) + [Config.PERSON_CLASS_NAME, "car", "dog", "backpack"]
+    rng = np.random.default_rng(0)
+    end = time.time()
+    start = end - args.hours * 3600
+    timestamps = np.sort(rng.uniform(start, end, args.rows))
+    cameras = rng.integers(0, args.cameras, args.rows)
+    class_indices = rng.integers(0, len(classes), args.rows)
+    confidences = rng.uniform(0.25, 1.0, args.rows)
+    results = []
+    try:
+        event_log = DetectionEventLog(log_dir, retention_days=0)
+        t0 = time.perf_counter()
+        for ts, cam, cls, conf in zip(timestamps.tolist(), cameras.tolist(), class_indices.tolist(), confidences.tolist()):
+            event_log.append({"timestamp": ts, "camera_id": cam, "class": classes[cls],
+                              "confidence": conf, "bbox_norm": [0.1, 0.1, 0.2, 0.3]})
+        event_log.flush()
+        append_seconds = time.perf_counter() - t0
+        print(f"[Bench] Appended {args.rows} rows in {append_seconds:.1f}s ({args.rows / append_seconds:.0f} rows/s)")
+
+        target_class = classes[0]
+        window = (start + args.hours * 3600 * 0.25, start + args.hours * 3600 * 0.75) # Middle half of the range
+        queries = {
+            "query_class_camera_window": lambda: len(event_log.query(*window, camera=3 % args.cameras, class_name=target_class)["timestamp"]),
+            "count_class_all": lambda: event_log.count(start, end + 1, class_name=target_class),
+            "hourly_counts_all": lambda: len(event_log.hourly_counts(start, end + 1)),
+        }
+        for name, run in queries.items():
+            timings = []
+            for _ in range(args.repeat):
+                t0 = time.perf_counter()
+                matched = run()
+                timings.append(time.perf_counter() - t0)
+            results.append({
+                "query": name,
+                "rows_total": args.rows,
+                "matched": matched,
+                "ms_min": round(min(timings) * 1000, 2),
+                "ms_p50": round(percentile(timings, 50) * 1000, 2),
+                "append_rows_per_sec": round(args.rows / append_seconds),
+            })
+            print(f"[Bench] {name}: {matched} result(s), p50 {results[-1]['ms_p50']} ms")
+    finally:
+        shutil.rmtree(log_dir, ignore_errors=True)
+    write_results(results, args, args.output_dir, prefix="event_log")
+    return results
+
+
+# --- Authenticated Request Throughput ---
+def build_auth_app(database_uri, cached, args):
+    """ Minimal app with the real User model and loader, serving a /api/alerts-like endpoint. """
+    from flask import Flask, jsonify
+    from flask_login import LoginManager, login_required
+    from sqlalchemy import event
+    from models import db, User
+    from user_cache import UserCache, CachedUser
+
+    app = Flask(__name__)
+    app.config.update(SECRET_KEY="bench", SQLALCHEMY_DATABASE_URI=database_uri,
+                      SQLALCHEMY_TRACK_MODIFICATIONS=False, TESTING=True)
+    db.init_app(app)
+    login = LoginManager(app)
+    counters = {"queries": 0}
+
+    if cached:
+        cache = UserCache(lambda user_id: CachedUser.from_model(User.query.get(user_id)),
+                          max_size=args.cache_size, ttl=args.cache_ttl)
+        cache.listen(User)
+        login.user_loader(lambda id: cache.get(int(id)))
+    else:
+        login.user_loader(lambda id: User.query.get(int(id))) # Original loader
+
+    @app.route('/api/alerts')
+    @login_required
+    def alerts():
+        return jsonify([])
+
+    with app.app_context():
+        db.create_all()
+        if not User.query.count():
+            db.session.add_all(User(email=f"user{i}@bench.local", password_hash="x") for i in range(args.users))
+            db.session.commit()
+        event.listen(db.engine, "before_cursor_execute",
+                     lambda *a, **k: counters.__setitem__("queries", counters["queries"] + 1))
+    return app, counters
+
+
+def cmd_auth(args):
+    """ Requests/second of an authenticated polling endpoint with the original and the cached user loader. """
+    db_dir = tempfile.mkdtemp(prefix="sentry_bench_auth_")
+    results = []
+    try:
+        for cached in (False, True):
+            app, counters = build_auth_app(f"sqlite:///{os.path.join(db_dir, 'bench.db')}", cached, args)
+            done = {"requests": 0, "errors": 0}
+            done_lock = threading.Lock()
+            stop_at = {"t": 0.0}
+
+            def client_loop(user_id):
+                client = app.test_client()
+                with client.session_transaction() as sess:
+                    sess["_user_id"] = str(user_id) # Logged-in session cookie, as after /login
+                    sess["_fresh"] = True
+                requests_made = errors = 0
+                while time.perf_counter() < stop_at["t"]:
+                    response = client.get("/api/alerts")
+                    requests_made += 1
+                    errors += response.status_code != 200
+                with done_lock:
+                    done["requests"] += requests_made
+                    done["errors"] += errors
+
+            queries_before = counters["queries"]
+            stop_at["t"] = time.perf_counter() + args.duration
+            threads = [threading.Thread(target=client_loop, args=(1 + i % args.users,), daemon=True)
+                       for i in range(args.clients)]
+            started = time.perf_counter()
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            elapsed = time.perf_counter() - started
+            results.append({
+                "loader": "cached" if cached else "uncached",
+                "clients": args.clients,
+                "users": args.users,
+                "requests": done["requests"],
+                "errors": done["errors"],
+                "requests_per_sec": round(done["requests"] / elapsed, 1),
+                "db_queries_per_request": round((counters["queries"] - queries_before) / max(done["requests"], 1), 4),
+            })
+            print(f"[Bench] {results[-1]['loader']}: {results[-1]['requests_per_sec']} req/s, "
+                  f"{results[-1]['db_queries_per_request']} DB queries/request")
+    finally:
+        shutil.rmtree(db_dir, ignore_errors=True)
+    write_results(results, args, args.output_dir, prefix="auth_throughput")
+    return results
+
+
+# --- Concurrent Stream Load Test ---
+def read_process_stats(pid):
+    """ Thread count and RSS (MB) of a local server process, from /proc. """
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            fields = dict(line.split(":", 1) for line in f if ":" in line)
+        return int(fields["Threads"]), round(int(fields["VmRSS"].split()[0]) / 1024, 1)
+    except (OSError, KeyError, ValueError):
+        return None, None
+
+
+async def stream_client(host, port, path, cookie, stop_at, read_delay, result):
+    """ One MJPEG viewer: counts JPEG parts received until `stop_at`. `read_delay` simulates a slow client. """
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+    except OSError as e:
+        result["error"] = str(e)
+        return
+    request = f"GET {path} HTTP/1.1\r\nHost: {host}:{port}\r\nConnection: keep-alive\r\n"
+    if cookie:
+        request += f"Cookie: {cookie}\r\n"
+    writer.write((request + "\r\n").encode())
+    await writer.drain()
+    loop = asyncio.get_running_loop()
+    first_frame_at = None
+    tail = b""
+    try:
+        status_line = await asyncio.wait_for(reader.readline(), timeout=10)
+        result["status"] = status_line.decode(errors="replace").strip()
+        while loop.time() < stop_at:
+            chunk = await asyncio.wait_for(reader.read(65536), timeout=max(0.1, stop_at - loop.time()))
+            if not chunk:
+                break
+            result["bytes"] += len(chunk)
+            data = tail + chunk
+            frames = data.count(b"Content-Type: image/jpeg")
+            tail = data[-32:] # Boundary markers may straddle reads
+            if frames:
+                result["frames"] += frames
+                if first_frame_at is None:
+                    first_frame_at = loop.time()
+                    result["first_frame_s"] = round(first_frame_at - result["started"], 3)
+            if read_delay:
+                await asyncio.sleep(read_delay)
+    except asyncio.TimeoutError:
+        pass
+    except (OSError, asyncio.IncompleteReadError) as e:
+        result["error"] = str(e)
+    finally:
+        writer.close()
+
+
+async def run_streams(args, clients):
+    parsed = urlparse(args.url)
+    host, port = parsed.hostname, parsed.port or 80
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    stop_at = start + args.duration
+    results = []
+    tasks = []
+    for i in range(clients):
+        camera_id = args.camera_ids[i % len(args.camera_ids)]
+        slow = i < int(clients * args.slow_fraction)
+        result = {"frames": 0, "bytes": 0, "started": loop.time(), "slow": slow, "first_frame_s": None, "error": None}
+        results.append(result)
+        tasks.append(stream_client(host, port, f"{parsed.path.rstrip('/')}/video_feed/{camera_id}", args.cookie,
+                                   stop_at, args.slow_read_delay if slow else 0.0, result))
+
+    peak = {"threads": None, "rss_mb": None}
+    async def sample_server():
+        while loop.time() < stop_at:
+            threads, rss = read_process_stats(args.server_pid)
+            if threads is not None:
+                peak["threads"] = max(peak["threads"] or 0, threads)
+                peak["rss_mb"] = max(peak["rss_mb"] or 0, rss)
+            await asyncio.sleep(0.5)
+    if args.server_pid:
+        tasks.append(sample_server())
+    await asyncio.gather(*tasks)
+    return results, peak
+
+
+def cmd_streams(args):
+    """ Opens N concurrent /video_feed clients against a running server and reports delivered FPS. """
+    summary = []
+    for clients in args.clients:
+        print(f"[Bench] {clients} concurrent stream(s) against {args.url} for {args.duration}s...")
+        results, peak = asyncio.run(run_streams(args, clients))
+        fast = [r["frames"] / args.duration for r in results if not r["slow"] and not r["error"]]
+        slow = [r["frames"] / args.duration for r in results if r["slow"] and not r["error"]]
+        first = [r["first_frame_s"] for r in results if r["first_frame_s"] is not None]
+        row = {
+            "clients": clients,
+            "errors": sum(1 for r in results if r["error"]),
+            "no_frames": sum(1 for r in results if not r["frames"]),
+            "fps_per_client_p50": round(percentile(fast, 50), 2) if fast else None,
+            "fps_per_client_min": round(min(fast), 2) if fast else None,
+            "fps_slow_client_p50": round(percentile(slow, 50), 2) if slow else None,
+            "mbit_per_sec_total": round(sum(r["bytes"] for r in results) * 8 / args.duration / 1e6, 2),
+            "first_frame_p95_s": round(percentile(first, 95), 3) if first else None,
+            "server_threads_peak": peak["threads"],
+            "server_rss_mb_peak": peak["rss_mb"],
+        }
+        summary.append(row)
+        print(f"[Bench]   p50 {row['fps_per_client_p50']} FPS/client (min {row['fps_per_client_min']}), "
+              f"{row['errors']} error(s), {row['no_frames']} without frames, server threads {row['server_threads_peak']}")
+        if results and results[0].get("status") and " 200" not in results[0]["status"]:
+            print(f"[Bench]   Server answered '{results[0]['status']}' - is --cookie a valid session cookie?")
+    write_results(summary, args, args.output_dir, prefix="stream_load")
+    return summary
+
+
+# --- Frame Handoff ---
+class LockedFrameDict:
+    """ The previous handoff: one dict + one global lock, and a fresh copy of every published frame. """
+    def __init__(self):
+        self.frames = {}
+        self.lock = threading.Lock()
+        self.lock_wait = [] # Seconds spent acquiring the lock, per acquisition
+        self.wait_lock = threading.Lock()
+
+    def _acquire(self):
+        t0 = time.perf_counter()
+        self.lock.acquire()
+        waited = time.perf_counter() - t0
+        with self.wait_lock:
+            self.lock_wait.append(waited)
+
+    def publish(self, camera_id, frame):
+        annotated = frame.copy() # What the renderer/`results[0].plot()` path allocated per frame
+        self._acquire()
+        try:
+            self.frames[camera_id] = annotated
+        finally:
+            self.lock.release()
+
+    def read(self, camera_id):
+        self._acquire()
+        try:
+            return self.frames.get(camera_id)
+        finally:
+            self.lock.release()
+
+
+class SlotFrameStore:
+    """ The FrameSlots handoff, through the same interface as LockedFrameDict. """
+    def __init__(self):
+        self.frames = FrameSlots()
+        self.lock_wait = [] # No lock to wait on
+
+    def publish(self, camera_id, frame):
+        slot = self.frames.slot(camera_id)
+        np.copyto(slot.begin_write(frame.shape, frame.dtype), frame) # Stands in for rendering into the slot
+        slot.commit()
+
+    def read(self, camera_id):
+        return self.frames.read(camera_id)[2]
+
+
+def run_handoff(store, args):
+    """ `--cameras` writer threads at `--fps` and `--readers` reader threads per camera, for `--duration`. """
+    source = np.random.default_rng(0).integers(0, 255, (args.height, args.width, 3), dtype=np.uint8)
+    stop = threading.Event()
+    counters = {"writes": 0, "reads": 0}
+    counters_lock = threading.Lock()
+
+    def writer(camera_id):
+        interval = 1.0 / args.fps
+        writes = 0
+        next_at = time.perf_counter()
+        while not stop.is_set():
+            store.publish(camera_id, source)
+            writes += 1
+            next_at += interval
+            time.sleep(max(0.0, next_at - time.perf_counter()))
+        with counters_lock:
+            counters["writes"] += writes
+
+    def reader(camera_id):
+        reads = 0
+        while not stop.is_set():
+            frame = store.read(camera_id)
+            if frame is not None:
+                int(frame[0, 0, 0]) # Touch the frame like an encoder would
+                reads += 1
+            time.sleep(1.0 / args.read_fps)
+        with counters_lock:
+            counters["reads"] += reads
+
+    threads = [threading.Thread(target=writer, args=(c,), daemon=True) for c in range(args.cameras)]
+    threads += [threading.Thread(target=reader, args=(c,), daemon=True)
+                for c in range(args.cameras) for _ in range(args.readers)]
+    tracemalloc.start()
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    time.sleep(args.duration)
+    stop.set()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    if isinstance(store, SlotFrameStore):
+        allocations = sum(s["allocations"] for s in store.frames.get_stats().values())
+    else:
+        allocations = counters["writes"] # One frame-sized copy per publish
+    waits = store.lock_wait
+    return {
+        "handoff": "frame_slots" if isinstance(store, SlotFrameStore) else "dict_global_lock",
+        "cameras": args.cameras,
+        "readers_per_camera": args.readers,
+        "writes_per_sec": round(counters["writes"] / elapsed, 1),
+        "reads_per_sec": round(counters["reads"] / elapsed, 1),
+        "lock_acquisitions": len(waits),
+        "lock_wait_ms_total": round(sum(waits) * 1000, 2),
+        "lock_wait_p99_us": round(percentile(waits, 99) * 1e6, 1) if waits else 0.0,
+        "lock_wait_max_us": round(max(waits) * 1e6, 1) if waits else 0.0,
+        "frame_allocations_per_sec": round(allocations / elapsed, 2),
+        "frame_mb_allocated_per_sec": round(allocations * source.nbytes / elapsed / 1e6, 1),
+        "tracemalloc_peak_mb": round(peak / 1e6, 1),
+    }
+
+
+def cmd_handoff(args):
+    """ Lock wait and allocation rate of the old dict + global lock handoff vs FrameSlots. """
+    results = []
+    for store in (LockedFrameDict(), SlotFrameStore()):
+        result = run_handoff(store, args)
+        results.append(result)
+        print(f"[Bench] {result['handoff']}: lock wait {result['lock_wait_ms_total']} ms total "
+              f"(p99 {result['lock_wait_p99_us']} us), {result['frame_mb_allocated_per_sec']} MB/s of frame "
+              f"allocations, tracemalloc peak {result['tracemalloc_peak_mb']} MB")
+    write_results(results, args, args.output_dir, prefix="frame_handoff")
+    return results
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="SentryVision end-to-end benchmarks")
+    sub = parser.add_subparsers(dest="command")
+
+    cams = sub.add_parser("cameras", help="Scale CameraProcessor count against synthetic sources")
+    cams.add_argument("--cameras", type=parse_camera_counts, default=[1, 2, 4, 8],
+                      help="Comma-separated camera counts to run, e.g. 1,2,4,8")
+    cams.add_argument("--duration", type=float, default=20.0, help="Measured seconds per scenario")
+    cams.add_argument("--warmup", type=float, default=5.0, help="Unmeasured seconds before each scenario")
+    cams.add_argument("--width", type=int, default=1280)
+    cams.add_argument("--height", type=int, default=720)
+    cams.add_argument("--fps", type=float, default=25.0)
+    cams.add_argument("--video", action="append", help="Loop this local video file instead of generated frames (repeatable)")
+    cams.add_argument("--detector", choices=["stub", "real"], default="stub")
+    cams.add_argument("--stub-latency-ms", type=float, default=30.0)
+    cams.add_argument("--model", help="Model path for --detector real (defaults to Config.MODEL_PATH)")
+    cams.add_argument("--detect-every", type=int, default=3, help="Run detection every Nth frame (1 = every frame)")
+    cams.add_argument("--no-resize", action="store_true", help="Detect on native resolution frames")
+    cams.add_argument("--no-viewers", action="store_true", help="Don't render stream frames (nobody watching)")
+    cams.add_argument("--workers", type=parse_camera_counts,
+                      help="Comma-separated worker-process counts (CameraSupervisor), e.g. 0,1,2,4; 0 = threads. "
+                           "Every camera count runs with every worker count")
+    cams.add_argument("--queue-size", type=int, default=100)
+    cams.add_argument("--sample-interval", type=float, default=0.5)
+    cams.add_argument("--output-dir", default="bench_results")
+    cams.set_defaults(func=cmd_cameras)
+
+    cascade = sub.add_parser("cascade", help="Recall cost / speed-up of the screening cascade on local videos")
+    cascade.add_argument("--video", action="append", required=True, help="Local video file (repeatable)")
+    cascade.add_argument("--labels", help="JSON labels {video: {frame_index: [classes]}}; default = main model as reference")
+    cascade.add_argument("--model", help="Main model (defaults to Config.MODEL_PATH)")
+    cascade.add_argument("--screen-model", help="Screening model (defaults to Config.SCREEN_MODEL_PATH)")
+    cascade.add_argument("--crops", action="store_true", help="Escalate on candidate crops instead of full frames")
+    cascade.add_argument("--every", type=int, default=5, help="Score every Nth frame (ignored with --labels: all labelled frames are scored)")
+    cascade.add_argument("--output-dir", default="bench_results")
+    cascade.set_defaults(func=cmd_cascade)
+
+    events = sub.add_parser("events", help="Append throughput and query latency of the detection event log")
+    events.add_argument("--rows", type=int, default=2_000_000)
+    events.add_argument("--hours", type=float, default=48.0, help="Time span the synthetic rows cover")
+    events.add_argument("--cameras", type=int, default=8)
+    events.add_argument("--repeat", type=int, default=5, help="Runs per query")
+    events.add_argument("--output-dir", default="bench_results")
+    events.set_defaults(func=cmd_events)
+
+    auth = sub.add_parser("auth", help="Authenticated request throughput with and without the user cache")
+    auth.add_argument("--clients", type=int, default=8, help="Concurrent polling clients (dashboard tabs)")
+    auth.add_argument("--users", type=int, default=4, help="Distinct logged-in users")
+    auth.add_argument("--duration", type=float, default=10.0, help="Seconds per loader")
+    auth.add_argument("--cache-ttl", type=float, default=Config.USER_CACHE_TTL_SECONDS)
+    auth.add_argument("--cache-size", type=int, default=Config.USER_CACHE_MAX_SIZE)
+    auth.add_argument("--output-dir", default="bench_results")
+    auth.set_defaults(func=cmd_auth)
+
+    streams = sub.add_parser("streams", help="Concurrent MJPEG viewers against a running server (threaded or async mode)")
+    streams.add_argument("--url", default=f"http://127.0.0.1:{Config.FLASK_PORT}", help="Server base URL")
+    streams.add_argument("--cookie", help="Cookie header of a logged-in session, e.g. 'session=...'")
+    streams.add_argument("--clients", type=parse_camera_counts, default=[10, 50, 100, 200],
+                         help="Comma-separated concurrent viewer counts")
+    streams.add_argument("--camera-ids", type=lambda v: [c.strip() for c in v.split(",") if c.strip()], default=["0"],
+                         help="Cameras to spread viewers over")
+    streams.add_argument("--duration", type=float, default=20.0, help="Seconds per client count")
+    streams.add_argument("--slow-fraction", type=float, default=0.1, help="Fraction of viewers that read slowly")
+    streams.add_argument("--slow-read-delay", type=float, default=0.5, help="Seconds a slow viewer sleeps between reads")
+    streams.add_argument("--server-pid", type=int, help="Local server PID to sample thread count / RSS from /proc")
+    streams.add_argument("--output-dir", default="bench_results")
+    streams.set_defaults(func=cmd_streams)
+
+    handoff = sub.add_parser("handoff", help="Lock wait / allocation rate of the frame handoff (global lock vs FrameSlots)")
+    handoff.add_argument("--cameras", type=int, default=8)
+    handoff.add_argument("--readers", type=int, default=4, help="Reader threads per camera (stream clients)")
+    handoff.add_argument("--width", type=int, default=1920)
+    handoff.add_argument("--height", type=int, default=1080)
+    handoff.add_argument("--fps", type=float, default=25.0, help="Frames published per camera per second")
+    handoff.add_argument("--read-fps", type=float, default=30.0, help="Reads per reader per second")
+    handoff.add_argument("--duration", type=float, default=10.0, help="Seconds per handoff")
+    handoff.add_argument("--output-dir", default="bench_results")
+    handoff.set_defaults(func=cmd_handoff)
+    return parser
+
+
+if __name__ == "__main__":
+    parser = build_parser()
+    args = parser.parse_args()
+    if not getattr(args, "func", None):
+        parser.print_help()
+        sys.exit(1)
+    args.func(args)
+
+
+"""
+benchmark.py
+
+End-to-end benchmarks for the detection pipeline. Results are written as JSON (full run
+metadata + per-scenario rows) and CSV (one row per scenario) so runs can be diffed/plotted.
+
+Subcommands:
+--------
+cameras:
+    Runs N `CameraProcessor` threads against synthetic sources for each N in `--cameras`
+    and reports, per N:
+    - Sustained capture and detection FPS (total and per camera)
+    - Capture-to-alert latency percentiles (time from `cap.read()` to the detection
+      being taken off `alert_queue`)
+    - Dropped frames (frames a live source produced that were never read) and alerts
+      dropped because `alert_queue` was full
+    - Process CPU (% of one core) and RSS
+
+    With `--workers 0,1,2,4` each camera count is also run with the cameras sharded over that many
+    `CameraSupervisor` worker processes (0 = threads), to check how throughput scales with processes.
+    Worker runs use the same synthetic sources and stub detector (created in the workers); their
+    counters come from the workers' status reports and CPU/RSS include the worker processes. Source
+    frame drops are only measured for thread runs, and workers always render stream frames.
+
+cascade:
+    Runs each frame of local videos through the main model alone and through the cascade, and
+    reports overall and per-class recall of both (against `--labels`, or against the main model if no
+    labels are given), ms/frame for each path, and the cascade's per-stage hit rates. With `--labels`
+    every labelled frame is scored and `--every` is ignored; without, every `--every`th frame is.
+
+events:
+    Appends `--rows` synthetic detections to a scratch `DetectionEventLog` and reports append
+    throughput and the latency of a camera+class+time-window query, a full-range class count and
+    per-hour class counts.
+
+auth:
+    Polls a login-protected endpoint from `--clients` threads using real session cookies, first with
+    the original `User.query.get` loader and then with `UserCache`, and reports requests/second and
+    database queries per request for each.
+
+streams:
+    Load test for a running server: opens `--clients` concurrent /video_feed connections (a fraction
+    of them deliberately slow readers) with a logged-in session cookie and reports delivered FPS per
+    client, throughput, time to first frame and, with `--server-pid`, the server's peak thread count
+    and RSS. Run it once against `SERVER_MODE=threaded` and once against `SERVER_MODE=async`.
+
+handoff:
+    Isolates the camera -> stream frame handoff: `--cameras` writer threads publish frames at `--fps`
+    while `--readers` threads per camera read them, first through the old dict + global lock (with a
+    copy per published frame) and then through `FrameSlots`. Reports total/p99 lock wait, frame
+    allocations per second and the tracemalloc peak for each.
+
+Sources:
+--------
+- `SyntheticCapture`: generated frames at `--width x --height` and `--fps`, paced like a live camera.
+- `LoopingVideoCapture`: loops local video files (`--video`), paced at `--fps`.
+
+Detectors:
+--------
+- `--detector stub`: `StubDetector` with a fixed latency (`--stub-latency-ms`), isolates pipeline overhead.
+- `--detector real`: the real `ThreatDetector` (one model per camera, like `start_camera_processors`).
+
+Typical Usage:
+    python benchmark.py cameras --cameras 1,2,4,8 --fps 25 --width 1920 --height 1080
+    python benchmark.py cameras --detector real --video sample.mp4 --cameras 1,2
+    python benchmark.py cameras --cameras 8 --workers 0,1,2,4 --stub-latency-ms 60
+    python benchmark.py cascade --video lobby.mp4 --labels lobby_labels.json
+    python benchmark.py events --rows 5000000
+    python benchmark.py auth --clients 16
+    python benchmark.py handoff --cameras 16 --readers 8
+    python benchmark.py streams --cookie "session=..." --clients 50,200 --server-pid 12345
+"""
@@ -0,0 +1,253 @@
+# camera_health.py
+import time
+import random
+import threading
+
+import cv2
+
+
+class Backoff:
+    """ Jittered exponential retry delays: base, 2*base, 4*base ... up to `maximum`, each scaled by 50-100%. """
+    def __init__(self, base=0.5, maximum=30.0, stable_after=30.0):
+        self.base = base
+        self.maximum = maximum
+        self.stable_after = stable_after # A connection that lasted this long resets the backoff
+        self.attempt = 0
+
+    def next_delay(self, connected_for=0.0):
+        if connected_for >= self.stable_after:
+            self.attempt = 0 # Healthy for a while: this is a fresh outage, retry fast
+        delay = min(self.maximum, self.base * (2 ** self.attempt))
+        self.attempt = min(self.attempt + 1, 16)
+        return delay * random.uniform(0.5, 1.0) # Jitter so cameras behind one switch/NVR don't retry in lockstep
+
+
+def open_video_capture(source, open_timeout, read_timeout):
+    """ cv2.VideoCapture with the backend's own open/read timeouts, so a hung call returns by itself. """
+    return cv2.VideoCapture(source, cv2.CAP_ANY, [
+        cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, int(open_timeout * 1000),
+        cv2.CAP_PROP_READ_TIMEOUT_MSEC, int(read_timeout * 1000),
+    ])
+
+
+class TimedCapture:
+    """
+    A capture (cv2.VideoCapture or compatible) driven by a helper thread, so `open()` and `read()`
+    give up after a timeout instead of blocking the camera thread on a dead RTSP host. A capture
+    that timed out is abandoned: its helper releases it whenever the stuck call returns, and no
+    new helper is started under the same `name` until then.
+    """
+    abandoned = {} # { name: helpers still stuck in a call that timed out }
+    abandoned_lock = threading.Lock()
+
+    def __init__(self, capture_factory, source, open_timeout=10.0, read_timeout=5.0, name="Capture"):
+        self.capture_factory = capture_factory
+        self.source = source
+        self.open_timeout = open_timeout
+        self.read_timeout = read_timeout
+        self.name = name
+        self.request = threading.Event() # Set by read(): helper should read one frame
+        self.ready = threading.Event() # Set by the helper: `result` holds the open/read outcome
+        self.result = (False, None)
+        self.error = None
+        self.capture = None # The wrapped capture, once the helper has created it
+        self.opened = False
+        self.closed = False
+        self.finished = False # Helper has released the capture and exited
+        self.stuck = False # Counted in `abandoned` until the helper finishes
+
+    @classmethod
+    def stuck_helpers(cls, name):
+        with cls.abandoned_lock:
+            return cls.abandoned.get(name, 0)
+
+    def open(self):
+        """ True once the source is open, False if it refused. Raises TimeoutError if it hangs. """
+        stuck = self.stuck_helpers(self.name)
+        if stuck:
+            # Each attempt against a hung host would otherwise leave another thread + native capture behind
+            self.closed = True
+            raise TimeoutError(f"{stuck} earlier capture(s) of this source still stuck; not opening another yet")
+        threading.Thread(target=self._run, name=self.name, daemon=True).start()
+        if not self.ready.wait(self.open_timeout):
+            self._abandon()
+            raise TimeoutError(f"open did not complete within {self.open_timeout}s")
+        self.ready.clear()
+        self.opened = self.result[0]
+        if not self.opened:
+            self.release()
+        return self.opened
+
+    def isOpened(self):
+        return self.opened and not self.closed
+
+    def read(self):
+        """ (ret, frame) like cv2.VideoCapture.read(). Raises TimeoutError if no frame arrives in time. """
+        self.request.set()
+        if not self.ready.wait(self.read_timeout):
+            self._abandon()
+            raise TimeoutError(f"no frame within {self.read_timeout}s")
+        self.ready.clear()
+        return self.result
+
+    def release(self):
+        self.closed = True
+        self.request.set() # Wakes an idle helper so it releases the capture and exits
+
+    def _abandon(self):
+        with self.abandoned_lock:
+            if not self.finished and not self.stuck:
+                self.stuck = True
+                self.abandoned[self.name] = self.abandoned.get(self.name, 0) + 1
+        self.release()
+
+    def _run(self):
+        cap = None
+        try:
+            if self.capture_factory is cv2.VideoCapture:
+                cap = open_video_capture(self.source, self.open_timeout, self.read_timeout)
+            else:
+                cap = self.capture_factory(self.source)
+            self.capture = cap
+            self.result = (cap.isOpened(), None)
+            self.ready.set()
+            while self.result[0] and not self.closed:
+                self.request.wait()
+                self.request.clear()
+                if self.closed:
+                    break
+                self.result = cap.read()
+                self.ready.set()
+        except Exception as e:
+            self.error = e
+            self.result = (False, None)
+            self.ready.set()
+        finally:
+            if cap is not None:
+                try: cap.release()
+                except Exception: pass
+            with self.abandoned_lock:
+                self.finished = True
+                if self.stuck:
+                    remaining = self.abandoned.get(self.name, 1) - 1
+                    if remaining:
+                        self.abandoned[self.name] = remaining
+                    else:
+                        self.abandoned.pop(self.name, None)
+
+
+class CameraHealth:
+    """ Connection state of one camera source, for /healthz and the stream's offline frame. """
+    def __init__(self, stall_timeout=5.0, capture_name=None):
+        self.stall_timeout = stall_timeout
+        self.capture_name = capture_name # TimedCapture name, for its count of stuck helpers
+        self.state = "connecting" # connecting / streaming / stalled / offline (/ idle: closed while not needed)
+        self.state_since = time.time()
+        self.connected_at = None
+        self.last_frame_time = None
+        self.retry_at = None
+        self.last_error = None
+        self.consecutive_failures = 0
+        self.reconnects = 0
+        self.uptime_total = 0.0 # Seconds streaming over previous connections
+
+    def _set(self, state):
+        if state != self.state:
+            self.state = state
+            self.state_since = time.time()
+
+    def connected(self):
+        if self.last_frame_time is not None: # Had a picture before, so this is a reconnect
+            self.reconnects += 1
+        self.connected_at = time.time()
+        self.retry_at = None
+        self._set("streaming")
+
+    def frame(self, timestamp):
+        self.last_frame_time = timestamp
+        self.consecutive_failures = 0
+        if self.state != "streaming":
+            self._set("streaming")
+
+    def connected_for(self):
+        return time.time() - self.connected_at if self.connected_at is not None else 0.0
+
+    def failed(self, reason, retry_in, stalled=False):
+        """ The source failed (open refused/timed out, read failed, stream stalled); retry in `retry_in`s. """
+        if self.connected_at is not None:
+            self.uptime_total += self.connected_for()
+            self.connected_at = None
+        self.consecutive_failures += 1
+        self.last_error = reason
+        self.retry_at = time.time() + retry_in
+        self._set("stalled" if stalled else "offline")
+
+    def reconnecting(self):
+        self._set("connecting")
+
+    def released(self):
+        """ The source was closed on purpose (nobody needs it); not an outage, the next open isn't a reconnect. """
+        if self.connected_at is not None:
+            self.uptime_total += self.connected_for()
+            self.connected_at = None
+        self.last_frame_time = None
+        self.retry_at = None
+        self._set("idle")
+
+    def is_offline(self):
+        """ True while there is no live picture (failed, or streaming but no frame for `stall_timeout`). """
+        if self.state in ("offline", "stalled"):
+            return True
+        return (self.state == "streaming" and self.last_frame_time is not None
+                and time.time() - self.last_frame_time > self.stall_timeout)
+
+    def to_dict(self):
+        now = time.time()
+        state = self.state
+        if state == "streaming" and self.is_offline():
+            state = "stalled" # Camera thread is stuck elsewhere (e.g. detection), not in the capture
+        return {
+            "state": state,
+            "since": round(now - self.state_since, 1),
+            "uptime": round(self.connected_for(), 1),
+            "uptime_total": round(self.uptime_total + self.connected_for(), 1),
+            "last_frame_age": round(now - self.last_frame_time, 2) if self.last_frame_time else None,
+            "reconnects": self.reconnects,
+            "consecutive_failures": self.consecutive_failures,
+            "retry_in": round(max(0.0, self.retry_at - now), 1) if self.retry_at else None,
+            "last_error": self.last_error,
+            "stuck_captures": TimedCapture.stuck_helpers(self.capture_name) if self.capture_name else 0,
+        }
+
+
+"""
+camera_health.py
+
+Camera connection supervision for CameraProcessor.
+
+Previously a failed open or read slept a fixed 5 s (10 s after an exception), and an open/read on a
+dead RTSP host could block the camera thread indefinitely.
+
+class Backoff:
+
+    Jittered exponential retry delays (`Config.CAMERA_RETRY_BASE_SECONDS` doubling up to
+    `CAMERA_RETRY_MAX_SECONDS`). A connection that stayed up `CAMERA_STABLE_SECONDS` resets it, so a
+    healthy camera that drops reconnects within a second while a flapping one backs off.
+
+class TimedCapture:
+
+    Wraps the capture in a helper thread: `open()` and `read()` raise TimeoutError after
+    `CAMERA_OPEN_TIMEOUT_SECONDS` / `CAMERA_READ_TIMEOUT_SECONDS`. A read that doesn't return within
+    the read timeout is a stalled stream. The hung capture is abandoned (released by its helper when
+    the call finally returns), so the camera thread moves straight on to the backoff and reconnect.
+    A plain cv2.VideoCapture is opened with CAP_PROP_OPEN_TIMEOUT_MSEC / CAP_PROP_READ_TIMEOUT_MSEC,
+    so the backend itself gives up and abandoned helpers exit. Until they do, `open()` refuses to start
+    another helper for the same camera (counted in `stuck_captures` of /healthz), so a hung host can't
+    pile up threads and native captures one per retry.
+
+class CameraHealth:
+
+    Per-camera state (connecting / streaming / stalled / offline), uptime, reconnect count, last error
+    and time to the next retry; reported by /healthz. While a camera is offline, stream viewers get a
+    cached "Camera offline" frame (streaming.status_part) instead of the last frozen image.
+"""
@@ -3,17 +3,50 @@ import cv2
 import time
 import os
 import threading
-from ultralytics import YOLO
 import queue # For thread-safe communication
+from tiling import TiledInference
+from renderer import AnnotationRenderer
+from preprocess import Letterbox, normalize_bbox
+from main_stream import MainStream, split_source, scale_detections
+from camera_health import Backoff, TimedCapture, CameraHealth
 
 class ThreatDetector:
-    """ Handles YOLO model loading and object detection. """
-    def __init__(self, model_path, confidence_threshold, primary_threat_classes, person_class_name):
+    """ Handles YOLO model loading and object detection (optionally as a two-stage cascade). """
+    def __init__(self, model_path, confidence_threshold, primary_threat_classes, person_class_name,
+                 screen_model_path=None, screen_confidence_threshold=0.25,
+                 escalate_on_crops=False, crop_margin=0.15):
+        # Imported here so the web tier can start without paying for torch/ultralytics
+        from ultralytics import YOLO
+        from concurrent.futures import ThreadPoolExecutor
+
+        self.confidence_threshold = confidence_threshold
+        self.primary_threat_classes = set(primary_threat_classes)
+        self.person_class_name = person_class_name
+        # One model can be shared by several CameraProcessors; YOLO predictors are not thread-safe
+        self.inference_lock = threading.Lock()
+        self.warm_lock = threading.Lock()
+        self.warmed_shapes = set() # Input shapes that already ran a warm-up inference
+
+        # --- Optional cascade: cheap screening model decides when the main model runs ---
+        self.screen_model = None
+        self.screen_confidence_threshold = screen_confidence_threshold
+        self.escalate_on_crops = escalate_on_crops
+        self.crop_margin = crop_margin
+        self.stats_lock = threading.Lock()
+        self.stats = {
+            "frames": 0,              # Frames passed to detect()
+            "frames_escalated": 0,    # Frames the screener sent on to the main model
+            "frames_confirmed": 0,    # Escalated frames where the main model found something
+            "screen_candidates": 0,   # Candidate boxes reported by the screener
+        }
+
+        # Load the main and screening models in parallel (both are mostly file I/O + deserialization)
+        with ThreadPoolExecutor(max_workers=2, thread_name_prefix="ModelLoader") as pool:
+            main_future = pool.submit(YOLO, model_path)
+            screen_future = pool.submit(YOLO, screen_model_path) if screen_model_path else None
+
         try:
-            self.model = YOLO(model_path)
-            self.confidence_threshold = confidence_threshold
-            self.primary_threat_classes = set(primary_threat_classes)
-            self.person_class_name = person_class_name
+            self.model = main_future.result()
             self.all_class_names = self.model.names
             print(f"  [Detector] YOLO model '{model_path}' loaded successfully.")
             # Check if the model loaded has the person class if specified
@@ -23,80 +56,244 @@ class ThreatDetector:
             print(f"  [Detector] CRITICAL: Error loading YOLO model '{model_path}': {e}")
             raise # Stop initialization if model fails
 
+        if screen_future is not None:
+            try:
+                self.screen_model = screen_future.result()
+                self.screen_class_names = self.screen_model.names
+                print(f"  [Detector] Cascade enabled: screening with '{screen_model_path}' "
+                      f"(conf >= {screen_confidence_threshold}, {'crops' if escalate_on_crops else 'full frame'}).")
+            except Exception as e:
+                print(f"  [Detector] Error loading screening model '{screen_model_path}': {e}. Cascade disabled.")
+                self.screen_model = None
+
+    def warm_up(self, height, width):
+        """ Runs one inference per model on a dummy frame so the first real frame doesn't pay for it. """
+        import numpy as np
+        with self.warm_lock:
+            if (height, width) in self.warmed_shapes:
+                return # Shared detector: another camera already warmed this input shape
+            dummy = np.full((height, width, 3), 114, dtype=np.uint8)
+            start = time.time()
+            with self.inference_lock:
+                self.model(dummy, conf=self.confidence_threshold, verbose=False)
+                if self.screen_model is not None:
+                    self.screen_model(dummy, conf=self.screen_confidence_threshold, verbose=False)
+            self.warmed_shapes.add((height, width))
+            print(f"  [Detector] Warm-up for {width}x{height} took {time.time() - start:.2f}s.")
+
+    @classmethod
+    def from_config(cls, config, model_path=None):
+        """ Builds a detector (and its cascade, if enabled) from a Config object. """
+        return cls(
+            model_path=model_path or config.MODEL_PATH,
+            confidence_threshold=config.CONFIDENCE_THRESHOLD,
+            primary_threat_classes=config.PRIMARY_THREAT_CLASSES,
+            person_class_name=config.PERSON_CLASS_NAME,
+            screen_model_path=config.SCREEN_MODEL_PATH if config.CASCADE_ENABLED else None,
+            screen_confidence_threshold=config.SCREEN_CONFIDENCE_THRESHOLD,
+            escalate_on_crops=config.CASCADE_ESCALATE_ON_CROPS,
+            crop_margin=config.CASCADE_CROP_MARGIN
+        )
+
     def detect(self, frame):
-        """ Performs detection on a single frame. """
-        detections = []
-        annotated_frame = frame # Default to original if detection fails
+        """ Performs detection on a single frame. Returns raw detections only (see renderer.py for drawing). """
+        with self.stats_lock:
+            self.stats["frames"] += 1
+        if self.screen_model is None:
+            return self.detect_without_cascade(frame)
 
         try:
-            results = self.model(frame, conf=self.confidence_threshold, verbose=False) # verbose=False reduces console spam
+            candidates = self._screen(frame)
+        except Exception as e:
+            print(f"  [Detector] Error during screening: {e}. Falling back to main model.")
+            return self.detect_without_cascade(frame)
+        if not candidates:
+            return [] # Nothing worth a closer look
+
+        with self.stats_lock:
+            self.stats["frames_escalated"] += 1
+            self.stats["screen_candidates"] += len(candidates)
+
+        if self.escalate_on_crops:
+            detections = self._detect_crop(frame, candidates)
+        else:
+            detections = self.detect_without_cascade(frame)
+        if detections:
+            with self.stats_lock:
+                self.stats["frames_confirmed"] += 1
+        return detections
+
+    def detect_without_cascade(self, frame):
+        """ Runs the main model on the whole frame (the pre-cascade behaviour). """
+        try:
+            with self.inference_lock:
+                results = self.model(frame, conf=self.confidence_threshold, verbose=False) # verbose=False reduces console spam
 
             if results and results[0].boxes:
-                # Use YOLO's plotting function to get the annotated frame
-                annotated_frame = results[0].plot()
-                # Extract detection details
-                for box in results[0].boxes:
-                    try:
-                        class_id = int(box.cls[0])
-                        class_name = self.all_class_names[class_id]
-                        confidence = float(box.conf[0])
-                        # Check if it's a primary threat (gun, knife, etc.)
-                        is_primary_threat = class_name in self.primary_threat_classes
-
-                        detections.append({
-                            "class": class_name,
-                            "confidence": confidence,
-                            "is_primary_threat": is_primary_threat,
-                            "bbox": box.xyxy[0].tolist() # [xmin, ymin, xmax, ymax]
-                        })
-                    except Exception as e:
-                        # Log error processing a specific box but continue with others
-                        print(f"  [Detector] Error processing detection box: {e}")
-                        continue
-            # If no boxes found, detections remains empty, annotated_frame is original frame plotted (if plot() handles empty) or just original frame.
-            # Ensure annotated_frame is always assigned. `results[0].plot()` might return the original if no boxes? Test this.
-            # Safer: annotated_frame = results[0].plot() if results[0].boxes else frame.copy()
+                return self._extract_detections(results[0])
 
         except Exception as e:
              # Log error during the main prediction step
              print(f"  [Detector] Error during model prediction: {e}")
-             # Return empty detections and the original (non-annotated) frame
-             return [], frame
 
-        return detections, annotated_frame
+        return []
+
+    def detect_batch(self, frames):
+        """ Runs the main model on several frames (e.g. tiles) in one call; returns a detection list per frame. """
+        if not frames:
+            return []
+        try:
+            with self.inference_lock:
+                results = self.model(list(frames), conf=self.confidence_threshold, verbose=False)
+        except Exception as e:
+            print(f"  [Detector] Error during batch prediction: {e}")
+            return [[] for _ in frames]
+        return [self._extract_detections(result) if result.boxes else [] for result in results]
+
+    def _screen(self, frame):
+        """ Runs the screening model; returns candidate boxes (threat classes or people). """
+        with self.inference_lock:
+            results = self.screen_model(frame, conf=self.screen_confidence_threshold, verbose=False)
+        candidates = []
+        if results and results[0].boxes:
+            for box in results[0].boxes:
+                class_name = self.screen_class_names[int(box.cls[0])]
+                if class_name in self.primary_threat_classes or class_name == self.person_class_name:
+                    candidates.append(box.xyxy[0].tolist())
+        return candidates
+
+    def _detect_crop(self, frame, candidates):
+        """ Runs the main model only on the region covering all candidates (plus a margin). """
+        height, width = frame.shape[:2]
+        x0 = min(c[0] for c in candidates); y0 = min(c[1] for c in candidates)
+        x1 = max(c[2] for c in candidates); y1 = max(c[3] for c in candidates)
+        margin_x = (x1 - x0) * self.crop_margin + 16
+        margin_y = (y1 - y0) * self.crop_margin + 16
+        x0 = max(0, int(x0 - margin_x)); y0 = max(0, int(y0 - margin_y))
+        x1 = min(width, int(x1 + margin_x)); y1 = min(height, int(y1 + margin_y))
+        if x1 - x0 < 2 or y1 - y0 < 2:
+            return self.detect_without_cascade(frame)
+
+        crop = frame[y0:y1, x0:x1]
+        try:
+            with self.inference_lock:
+                results = self.model(crop, conf=self.confidence_threshold, verbose=False)
+        except Exception as e:
+            print(f"  [Detector] Error during model prediction: {e}")
+            return []
+        if not (results and results[0].boxes):
+            return []
+        return self._extract_detections(results[0], offset=(x0, y0))
+
+    def _extract_detections(self, result, offset=(0, 0)):
+        detections = []
+        for box in result.boxes:
+            try:
+                class_id = int(box.cls[0])
+                class_name = self.all_class_names[class_id]
+                confidence = float(box.conf[0])
+                # Check if it's a primary threat (gun, knife, etc.)
+                is_primary_threat = class_name in self.primary_threat_classes
+                x_min, y_min, x_max, y_max = box.xyxy[0].tolist()
+
+                detections.append({
+                    "class": class_name,
+                    "confidence": confidence,
+                    "is_primary_threat": is_primary_threat,
+                    "bbox": [x_min + offset[0], y_min + offset[1], x_max + offset[0], y_max + offset[1]] # [xmin, ymin, xmax, ymax]
+                })
+            except Exception as e:
+                # Log error processing a specific box but continue with others
+                print(f"  [Detector] Error processing detection box: {e}")
+                continue
+        return detections
+
+    def get_stats(self):
+        """ Per-stage counters and hit rates (screen = escalated/frames, confirm = confirmed/escalated). """
+        with self.stats_lock:
+            stats = dict(self.stats)
+        stats["cascade_enabled"] = self.screen_model is not None
+        stats["screen_hit_rate"] = stats["frames_escalated"] / stats["frames"] if stats["frames"] else None
+        stats["confirm_rate"] = (stats["frames_confirmed"] / stats["frames_escalated"]
+                                 if stats["frames_escalated"] else None)
+        return stats
 
 class CameraProcessor(threading.Thread):
     """
     Handles video capture, processing, detection, snapshot saving,
     and communication for a single camera source in a separate thread.
     """
-    def __init__(self, camera_id, camera_source, config, alert_queue, frame_dict, frame_lock):
-        super().__init__()
+    def __init__(self, camera_id, camera_source, config, alert_queue, frame_dict,
+                 detector=None, capture_factory=None, detector_factory=None, viewer_count=None):
+        super().__init__(name=f"Camera-{camera_id}") # Thread name is used by the sampling profiler
         self.camera_id = camera_id
         self.camera_source = camera_source
         self.config = config # Access config object directly
         self.alert_queue = alert_queue
-        self.frame_dict = frame_dict # Shared dictionary for latest frames
-        self.frame_lock = frame_lock # Lock protecting frame_dict
+        self.frame_dict = frame_dict # Latest-frame store (FrameSlots, or a dict-like stand-in in workers)
 
         # --- Configuration for this processor ---
         self.snapshot_dir = config.SNAPSHOT_DIR
         # Performance Tuning (set values directly or get from config)
         self.enable_resizing = True # <<< Set to False to disable resizing
-        self.detect_w = 640         # <<< Width for detection if resizing enabled
+        self.detect_w = 640         # <<< Width for detection if resizing enabled (letterboxed, no stretching)
         self.detect_h = 480         # <<< Height for detection if resizing enabled
         self.enable_frame_skipping = True # <<< Set to False to detect every frame
         self.detect_every_n_frames = 3   # <<< Process every Nth frame if skipping enabled
-
-        self.detector = ThreatDetector(
-            model_path=config.MODEL_PATH,
-            confidence_threshold=config.CONFIDENCE_THRESHOLD,
-            primary_threat_classes=config.PRIMARY_THREAT_CLASSES,
-            person_class_name=config.PERSON_CLASS_NAME
-        )
+        self.enable_tiling = config.TILING_ENABLED # <<< Native-resolution tiled inference (high-res cameras)
+        self.tiler = None # Created on first tiled frame
+        self.letterbox = None # Preallocated letterbox buffers, (re)built when detect_w/detect_h change
+
+        # --- Annotation (only drawn when a stream or snapshot needs pixels) ---
+        annotate_classes = getattr(config, "ANNOTATE_CLASSES", None)
+        self.stream_renderer = AnnotationRenderer(config.PRIMARY_THREAT_CLASSES, config.PERSON_CLASS_NAME,
+                                                  annotate_classes, buffers=2)
+        self.snapshot_renderer = AnnotationRenderer(config.PRIMARY_THREAT_CLASSES, config.PERSON_CLASS_NAME,
+                                                    annotate_classes, buffers=1)
+        # Callable(stream_key) -> open /video_feed streams (FrameBroadcaster.viewers). Counted per camera
+        # ID outside this thread, so streams opened before a restart/reconfigure keep getting frames.
+        self.viewer_count = viewer_count or (lambda stream_key: 0)
+        self.always_publish = False # Worker/edge modes can't see viewers, so they publish every frame
+        self.last_detections = [] # Raw detections from the latest detection pass (kept apart from pixels)
+
+        # Detector and capture can be injected (e.g. stub detector / synthetic source for benchmarks).
+        # Otherwise the model is loaded and warmed up in run(), so creating the thread never blocks.
+        self.detector = detector
+        self.detector_factory = detector_factory or (lambda: ThreatDetector.from_config(config))
+        # Lifecycle for /healthz and /readyz: loading -> warming -> connecting -> streaming (or failed/stopped)
+        self.state = "loading"
+        self.state_error = None
+        self.capture_factory = capture_factory or cv2.VideoCapture
         self.cap = None
+        # Source connection: open/read timeouts, jittered backoff, state for /healthz and the offline frame
+        self.open_timeout = getattr(config, "CAMERA_OPEN_TIMEOUT_SECONDS", 10.0)
+        self.read_timeout = getattr(config, "CAMERA_READ_TIMEOUT_SECONDS", 5.0)
+        self.backoff = Backoff(getattr(config, "CAMERA_RETRY_BASE_SECONDS", 0.5),
+                               getattr(config, "CAMERA_RETRY_MAX_SECONDS", 30.0),
+                               getattr(config, "CAMERA_STABLE_SECONDS", 30.0))
+        self.health = CameraHealth(stall_timeout=self.read_timeout, capture_name=f"Capture-{camera_id}")
+        self.stop_event = threading.Event() # Lets stop() cut a backoff wait short
+        # Dual-stream cameras ({"detect": sub, "main": main}): decode the substream continuously,
+        # open the main stream only for full-quality viewers and snapshots
+        self.detect_source, main_source = split_source(camera_source)
+        self.main_stream = None
+        if main_source is not None:
+            self.main_stream = MainStream(
+                camera_id, main_source, self.capture_factory,
+                frame_slots=frame_dict if hasattr(frame_dict, "slot") else None,
+                renderer=AnnotationRenderer(config.PRIMARY_THREAT_CLASSES, config.PERSON_CLASS_NAME, annotate_classes),
+                idle_timeout=getattr(config, "MAIN_STREAM_IDLE_SECONDS", 30.0),
+                open_timeout=self.open_timeout, read_timeout=self.read_timeout, viewer_count=self.viewer_count
+            )
         self.running = False
         self.frame_count = 0
+        # Counters read by benchmark.py (plain ints, only written by this thread)
+        self.stats = {
+            "frames_captured": 0,
+            "frames_detected": 0,
+            "detections": 0,
+            "alerts_dropped": 0,
+        }
         self.daemon = True # Allows main program to exit even if this thread is running
 
         # Ensure snapshot directory exists for this camera processor
@@ -111,62 +308,113 @@ class CameraProcessor(threading.Thread):
         """ Main processing loop for the camera thread. """
         print(f"[Cam {self.camera_id}] Starting processor thread (Source: {self.camera_source})")
         self.running = True
-        retry_delay = 5 # Seconds between camera open retries
+
+        # --- Model Loading & Warm-up (in this thread, so the web tier is already serving) ---
+        try:
+            if self.detector is None:
+                self.state = "loading"
+                self.detector = self.detector_factory()
+            if hasattr(self.detector, "warm_up"):
+                self.state = "warming"
+                if self.enable_resizing and not self.enable_tiling:
+                    self.detector.warm_up(self.detect_h, self.detect_w)
+                else:
+                    self.detector.warm_up(self.config.TILE_SIZE, self.config.TILE_SIZE)
+            self.state = "connecting"
+        except Exception as e:
+            print(f"[Cam {self.camera_id}] CRITICAL: Detector failed to load/warm up: {e}")
+            self.state = "failed"
+            self.state_error = str(e)
+            self.running = False
 
         while self.running:
             try:
                 # --- Camera Handling ---
                 if self.cap is None or not self.cap.isOpened():
                     # print(f"[Cam {self.camera_id}] Opening camera...") # Reduce verbosity
-                    self.cap = cv2.VideoCapture(self.camera_source)
+                    self.health.reconnecting()
+                    # Open (and later read) in a helper thread, so a dead host can't hang this thread
+                    self.cap = TimedCapture(self.capture_factory, self.detect_source, self.open_timeout,
+                                            self.read_timeout, name=f"Capture-{self.camera_id}")
                     # Optional: Set camera properties (e.g., resolution, FPS) - may fail
                     # self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
                     # self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
-                    if not self.cap.isOpened():
-                        # print(f"[Cam {self.camera_id}] Error: Could not open camera. Retrying in {retry_delay}s...")
-                        self.cap = None
-                        time.sleep(retry_delay)
+                    try:
+                        opened = self.cap.open()
+                    except TimeoutError as e:
+                        self._source_failed(f"Open timed out: {e}")
                         continue
-                    else:
-                         print(f"[Cam {self.camera_id}] Camera opened successfully.")
+                    if not opened:
+                        self._source_failed("Could not open camera", log=False)
+                        continue
+                    print(f"[Cam {self.camera_id}] Camera opened successfully.")
+                    self.health.connected()
 
                 # --- Frame Capture ---
-                ret, frame = self.cap.read()
+                try:
+                    ret, frame = self.cap.read()
+                except TimeoutError as e:
+                    self._source_failed(f"Stream stalled: {e}", stalled=True)
+                    continue
                 if not ret or frame is None:
-                    print(f"[Cam {self.camera_id}] Warning: Failed to capture frame. Releasing and retrying...")
-                    if self.cap: self.cap.release()
-                    self.cap = None
-                    time.sleep(retry_delay) # Wait before trying to reopen
+                    self._source_failed("Failed to capture frame")
                     continue
 
+                capture_time = time.time() # Used for capture-to-alert latency
+                self.state = "streaming"
+                self.health.frame(capture_time)
+                self.stats["frames_captured"] += 1
+
                 # --- Frame Skipping Logic ---
                 self.frame_count += 1
                 run_detection_this_frame = (not self.enable_frame_skipping or
                                             self.frame_count % self.detect_every_n_frames == 0)
 
-                annotated_frame_for_stream = frame.copy() # Default to original frame for stream
                 detected_objects_this_frame = []
 
                 # --- Detection & Annotation (only if not skipped) ---
                 if run_detection_this_frame:
                     frame_to_detect = frame # Default to original frame
+                    letterboxed = False
 
-                    # --- Optional Resizing ---
-                    if self.enable_resizing:
+                    # --- Optional Letterboxing (tiling works on the native frame instead) ---
+                    if self.enable_resizing and not self.enable_tiling:
                         try:
-                            # Resize before detection for performance
-                            frame_to_detect = cv2.resize(frame, (self.detect_w, self.detect_h), interpolation=cv2.INTER_LINEAR)
+                            if self.letterbox is None or (self.letterbox.width, self.letterbox.height) != (self.detect_w, self.detect_h):
+                                self.letterbox = Letterbox(self.detect_w, self.detect_h)
+                            # Aspect-preserving resize into a reused buffer before detection
+                            frame_to_detect = self.letterbox(frame)
+                            letterboxed = True
                         except Exception as resize_e:
                             print(f"[Cam {self.camera_id}] Error resizing frame: {resize_e}. Using original.")
                             frame_to_detect = frame # Fallback
 
                     # --- Run Detection ---
-                    detections, annotated_detection_frame = self.detector.detect(frame_to_detect)
+                    if self.enable_tiling:
+                        if self.tiler is None:
+                            self.tiler = TiledInference(
+                                self.detector,
+                                tile_size=self.config.TILE_SIZE,
+                                overlap=self.config.TILE_OVERLAP,
+                                track_ttl=self.config.TILE_TRACK_TTL_SECONDS,
+                                full_scan_interval=self.config.TILE_FULL_SCAN_INTERVAL_SECONDS
+                            )
+                        detections = self.tiler.detect(frame_to_detect)
+                    else:
+                        detections = self.detector.detect(frame_to_detect)
+                    # Emit boxes in source-camera pixels ("bbox") and normalized ("bbox_norm")
+                    native_h, native_w = frame.shape[:2]
+                    for detection in detections:
+                        if letterboxed:
+                            detection["bbox"] = self.letterbox.to_native(detection["bbox"])
+                        detection["bbox_norm"] = normalize_bbox(detection["bbox"], native_w, native_h)
                     detected_objects_this_frame = detections # Store detections from this frame
-
-                    # Use the annotated frame (potentially resized) for the stream when detection runs
-                    annotated_frame_for_stream = annotated_detection_frame
-
+                    self.stats["frames_detected"] += 1
+                    self.stats["detections"] += len(detections)
+                    self.last_detections = detections
+                    if self.main_stream is not None:
+                        self.main_stream.set_detections(detections) # Drawn on full-quality streams
+                    snapshot_frame = None # Rendered at most once per detection pass, only if needed
 
                     # --- Process Detections: Snapshot & Queueing (only when detection runs) ---
                     current_detection_time = time.time() # Timestamp for detections in this batch
@@ -184,8 +432,9 @@ class CameraProcessor(threading.Thread):
                             snapshot_save_path = os.path.join(self.snapshot_dir, snapshot_filename)
 
                             try:
-                                # Save the frame that detection ran on (annotated_detection_frame)
-                                cv2.imwrite(snapshot_save_path, annotated_detection_frame)
+                                if snapshot_frame is None:
+                                    snapshot_frame = self._render_snapshot(frame, detections)
+                                cv2.imwrite(snapshot_save_path, snapshot_frame)
                                 snapshot_filename_for_queue = snapshot_filename # Store filename if saved
                             except Exception as e:
                                  print(f"[Cam {self.camera_id}] Error saving snapshot '{snapshot_filename}': {e}")
@@ -195,6 +444,7 @@ class CameraProcessor(threading.Thread):
                         detection_data = detection.copy()
                         detection_data['camera_id'] = self.camera_id
                         detection_data['timestamp'] = current_detection_time
+                        detection_data['capture_time'] = capture_time
                         detection_data['snapshot_file'] = snapshot_filename_for_queue # Add filename (or None)
 
                         # Put onto the queue for central processing
@@ -203,14 +453,23 @@ class CameraProcessor(threading.Thread):
                         except queue.Full:
                             # This is okay if the central processor is busy, alerts just get dropped
                             # print(f"[Cam {self.camera_id}] Warning: Alert queue full. Dropping detection.") # Reduce noise
-                            pass # Silently drop if queue is full
-
-
-                # --- Update Shared Frame Dictionary for Streaming ---
-                # This should happen relatively frequently, even if detection is skipped,
-                # using either the newly annotated frame or the original frame.
-                with self.frame_lock:
-                    self.frame_dict[self.camera_id] = annotated_frame_for_stream # Store the frame designated for streaming
+                            self.stats["alerts_dropped"] += 1 # Silently drop if queue is full
+
+
+                # --- Publish the Stream Frame ---
+                # Only when someone is watching: the latest detections are drawn onto the current
+                # frame (so boxes persist across skipped frames). With a FrameSlot the drawing goes
+                # straight into the slot's back buffer, which is then swapped in (no lock, no extra copy).
+                if self.main_stream is not None and self.main_stream.viewers > 0:
+                    self.main_stream.touch() # Full-quality viewers: (re)open the main stream, also after a restart
+                if self.always_publish or self.viewers > 0:
+                    if hasattr(self.frame_dict, "slot"):
+                        slot = self.frame_dict.slot(self.camera_id)
+                        self.stream_renderer.render(frame, self.last_detections,
+                                                    out=slot.begin_write(frame.shape, frame.dtype))
+                        slot.commit(capture_time)
+                    else:
+                        self.frame_dict[self.camera_id] = self.stream_renderer.render(frame, self.last_detections)
 
                 # Small delay to prevent busy-waiting and yield CPU time
                 time.sleep(0.01) # Adjust if needed
@@ -224,24 +483,54 @@ class CameraProcessor(threading.Thread):
                 print(f"[Cam {self.camera_id}] CRITICAL Error in processing loop: {e}")
                 import traceback
                 traceback.print_exc() # Print full traceback for debugging
-                # Attempt recovery by releasing camera and delaying
-                if self.cap:
-                    try: self.cap.release()
-                    except Exception: pass
-                self.cap = None
-                time.sleep(retry_delay * 2) # Longer delay after a major error
+                # Attempt recovery by releasing the camera and reconnecting after a backoff
+                self._source_failed(f"Processing error: {e}", log=False)
 
 
         # --- Cleanup when loop finishes ---
         if self.cap and self.cap.isOpened():
             try: self.cap.release()
             except Exception as e: print(f"[Cam {self.camera_id}] Error releasing camera on stop: {e}")
+        self.frame_dict.pop(self.camera_id, None) # Don't leave a stale frame behind for viewers
+        if self.state != "failed":
+            self.state = "stopped"
         print(f"[Cam {self.camera_id}] Processor thread stopped.")
 
+    def _source_failed(self, reason, stalled=False, log=True):
+        """ Drops the capture and waits out a jittered backoff (cut short by stop()). """
+        if self.cap is not None:
+            try: self.cap.release()
+            except Exception: pass
+        self.cap = None
+        self.state = "connecting"
+        delay = self.backoff.next_delay(self.health.connected_for())
+        self.health.failed(reason, delay, stalled=stalled)
+        self.frame_dict.pop(self.camera_id, None) # Viewers get the offline frame, not the last image
+        if log:
+            print(f"[Cam {self.camera_id}] Warning: {reason}. Reconnecting in {delay:.1f}s...")
+        self.stop_event.wait(delay)
+
+    @property
+    def viewers(self):
+        """ Open stream clients of this camera; frames are only rendered/published while viewers > 0. """
+        return self.viewer_count(self.camera_id)
+
+    def _render_snapshot(self, frame, detections):
+        """ Snapshot from the main stream when it has a fresh frame, else from the detection frame. """
+        if self.main_stream is not None and getattr(self.config, "MAIN_STREAM_SNAPSHOTS", True):
+            # Also (re)opens the main stream, so follow-up snapshots of this event are full resolution
+            full = self.main_stream.latest_frame(max_age=getattr(self.config, "MAIN_STREAM_MAX_FRAME_AGE", 1.0))
+            if full is not None:
+                return self.snapshot_renderer.render(full, scale_detections(detections, full.shape[1], full.shape[0]))
+        return self.snapshot_renderer.render(frame, detections)
+
     def stop(self):
         """ Signals the thread to stop processing. """
         print(f"[Cam {self.camera_id}] Stop signal received.")
         self.running = False
+        self.stop_event.set()
+        if self.main_stream is not None:
+            self.main_stream.close()
 
 
 """
@@ -259,15 +548,27 @@ class ThreatDetector:
         confidence_threshold (float): Minimum confidence for detection filtering.
         primary_threat_classes (list[str]): Class names considered high-threat (e.g., weapons).
         person_class_name (str): Class name used to identify people (e.g., 'person').
+        screen_model_path (str, optional): Small model (e.g. yolov8n.pt) that screens every frame.
+            When set, the main model only runs on frames where the screener reports a primary threat
+            class or a person above `screen_confidence_threshold`.
+        escalate_on_crops (bool): Run the main model on the region around the screener's candidates
+            instead of the whole frame.
 
     Methods:
-        detect(frame): Detects objects in the input frame and returns detection info and annotated frame.
+        from_config(config): Builds a detector (with cascade if `CASCADE_ENABLED`) from Config.
+        detect(frame): Detects objects in the input frame and returns the list of detection dicts.
+        detect_without_cascade(frame): Main model only (reference for measuring cascade recall).
+        detect_batch(frames): Main model on a batch of frames (used for tiled inference).
+        get_stats(): Per-stage counters and hit rates.
+        warm_up(height, width): One dummy inference per model (once per input shape).
 
 
 2. `CameraProcessor`: A threaded video processor for a single camera source, which handles:
-    - Capturing frames from a camera or video stream
-    - Performing object detection using YOLO
-    - Annotating frames
+    - Capturing frames from a camera or video stream (timed open/read, jittered reconnect backoff,
+      `health` state for /healthz; see camera_health.py)
+    - Performing object detection using YOLO (on a letterboxed frame, or tiled at native resolution)
+    - Emitting boxes in native-pixel ("bbox") and normalized ("bbox_norm") coordinates
+    - Annotating frames (AnnotationRenderer, only while a viewer is connected or for snapshots)
     - Saving snapshots of detected threats
     - Sending detection data to a shared alert queue
     - Updating frames for live video streaming
@@ -279,15 +580,25 @@ class CameraProcessor(threading.Thread):
 
     Args:
         camera_id (int): Unique ID for this camera.
-        camera_source (str): Camera input source (index, RTSP stream, or file path).
+        camera_source (str | dict): Camera input source (index, RTSP stream, or file path), or
+            {"detect": substream, "main": main stream} for dual-stream cameras (see main_stream.py).
         config (object): Configuration object with model path, threshold, classes, etc.
         alert_queue (Queue): Shared queue for detection results.
-        frame_dict (dict): Shared dictionary storing the latest frame for each camera.
-        frame_lock (threading.Lock): Lock to protect access to frame_dict.
+        frame_dict (FrameSlots): Latest-frame store; stream frames are rendered into this camera's slot.
+            Any dict-like object with `[]=` and `pop` also works (worker/edge stand-ins).
+        detector_factory (callable, optional): Builds the detector inside the thread when `detector`
+            is not given (defaults to `ThreatDetector.from_config(config)`).
+        detector (ThreatDetector, optional): Pre-built detector to use instead of loading one.
+        capture_factory (callable, optional): Builds the capture object from `camera_source`
+            (defaults to `cv2.VideoCapture`). Must provide `isOpened()`, `read()` and `release()`.
+        viewer_count (callable, optional): stream_key -> number of open stream clients
+            (FrameBroadcaster.viewers); without it nothing is published unless `always_publish`.
 
     Methods:
         run(): Main loop capturing frames, detecting threats, and updating shared data.
         stop(): Gracefully stops the processing thread.
+        viewers: Connected stream clients, read from `viewer_count` (not tracked by the thread).
+        health (CameraHealth): Connection state, uptime and reconnects of the capture source.
 
 
 
@@ -296,7 +607,7 @@ such as surveillance systems.
 
 Dependencies:
 - OpenCV (cv2)
-- ultralytics (YOLO model)
+- ultralytics (YOLO model, imported lazily when a ThreatDetector is created)
 - threading, time, queue, os
 
 Typical Usage:
@@ -305,8 +616,7 @@ Typical Usage:
         camera_source="rtsp://example.com/stream",
         config=config,
         alert_queue=alert_queue,
-        frame_dict=shared_frame_dict,
-        frame_lock=shared_lock
+        frame_dict=frame_slots
     )
     processor.start()
 """
@@ -0,0 +1,376 @@
+# camera_registry.py
+import threading
+import time
+
+from camera_processor import CameraProcessor, ThreatDetector
+
+# Per-camera settings that can be changed at runtime (mapped onto CameraProcessor attributes)
+CAMERA_SETTING_KEYS = ("enable_resizing", "detect_w", "detect_h", "enable_frame_skipping", "detect_every_n_frames",
+                       "enable_tiling")
+
+
+class CameraBusyError(RuntimeError):
+    """ The camera's previous thread hasn't exited yet, so a new one can't be started. """
+
+
+def parse_bool(value, name):
+    """ JSON booleans, or the strings "true"/"false". Raises ValueError on anything else ("no", 1, ...). """
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.strip().lower() in ("true", "false"):
+        return value.strip().lower() == "true"
+    raise ValueError(f"{name} must be true or false")
+
+
+def normalize_camera_id(camera_id):
+    """ Camera IDs are ints; URL/JSON values like "3" map to 3. Non-numeric IDs are kept as strings. """
+    if isinstance(camera_id, int):
+        return camera_id
+    camera_id = str(camera_id).strip()
+    return int(camera_id) if camera_id.isdigit() else camera_id
+
+
+def normalize_source(source):
+    """
+    Webcam indices may arrive as strings ("0"); cv2 needs them as ints. Dual-stream sources are
+    dicts {"detect": ..., "main": ...}. Raises ValueError on a malformed dict.
+    """
+    if isinstance(source, dict):
+        unknown = set(source) - {"detect", "main"}
+        if unknown or source.get("detect") in (None, ""):
+            raise ValueError("Dual-stream source must be {\"detect\": <source>, \"main\": <source>}")
+        return {key: normalize_source(value) for key, value in source.items() if value not in (None, "")}
+    if isinstance(source, str) and source.strip().isdigit():
+        return int(source.strip())
+    return source
+
+
+class CameraEntry:
+    """ Registry record for one camera: its source, settings and (when running) its thread. """
+    def __init__(self, camera_id, source, settings=None, paused=False, remote=False):
+        self.camera_id = camera_id
+        self.source = source
+        self.settings = dict(settings or {})
+        self.paused = paused
+        self.remote = remote # Fed by an edge worker (edge_worker.py); no local thread
+        self.processor = None
+        self.created_at = time.time()
+        self.lock = threading.Lock() # Serializes start/stop/pause/resume/reconfigure of this camera
+        self.removed = False
+
+    def is_running(self):
+        if self.remote:
+            return True
+        return self.processor is not None and self.processor.is_alive()
+
+    def state(self):
+        """ loading / warming / connecting / streaming / failed / stopped / paused (see CameraProcessor.state). """
+        if self.remote:
+            return "streaming"
+        if self.paused:
+            return "paused"
+        if self.processor is None:
+            return "stopped"
+        default = "streaming" if self.processor.is_alive() else "stopped"
+        return getattr(self.processor, "state", default)
+
+    def health(self):
+        """ Capture connection health (CameraHealth.to_dict), or None for remote/worker/stopped cameras. """
+        health = getattr(self.processor, "health", None)
+        if health is None:
+            return None
+        report = health.to_dict()
+        main_stream = getattr(self.processor, "main_stream", None)
+        if main_stream is not None:
+            report["main_stream"] = main_stream.health.to_dict() # Dual-stream camera's on-demand main stream
+        return report
+
+    def to_dict(self):
+        return {
+            "id": self.camera_id,
+            "source": self.source,
+            "settings": self.settings,
+            "paused": self.paused,
+            "remote": self.remote,
+            "running": self.is_running(),
+            "state": self.state(),
+            "health": self.health(),
+            "created_at": self.created_at,
+        }
+
+
+class CameraRegistry:
+    """
+    Owns the set of cameras and their CameraProcessor threads.
+    IDs are stable for the lifetime of the process and lookups are a single dict access.
+    """
+    def __init__(self, config, alert_queue, frame_dict, viewer_count=None, drop_streams=None):
+        self.config = config
+        self.alert_queue = alert_queue
+        self.frame_dict = frame_dict
+        self.viewer_count = viewer_count # FrameBroadcaster.viewers, handed to every camera thread started
+        self.drop_streams = drop_streams # FrameBroadcaster.drop: ends open streams of a removed camera
+        self.cameras = {} # { camera_id: CameraEntry }
+        self.lock = threading.RLock() # Protects `cameras`, `next_id` and `stopping` (not held during thread joins)
+        self.stopping = {} # { camera_id: processor } threads that didn't stop within `stop_timeout`
+        self.stop_timeout = 5.0
+        self.next_id = 0
+        self.detector = None # Shared model, loaded on first use
+        self.detector_lock = threading.Lock()
+        self.supervisor = None # Set by use_supervisor() when cameras run in worker processes
+
+    def use_supervisor(self, supervisor):
+        """ Run cameras in a CameraSupervisor's worker processes; frames are then read from shared memory. """
+        self.supervisor = supervisor
+        self.frame_dict = supervisor.frames
+
+    # --- Shared Model ---
+    def get_detector(self):
+        with self.detector_lock:
+            if self.detector is None:
+                self.detector = ThreatDetector.from_config(self.config)
+            return self.detector
+
+    # --- Lookups ---
+    def get(self, camera_id):
+        return self.cameras.get(normalize_camera_id(camera_id))
+
+    def ids(self):
+        with self.lock:
+            return list(self.cameras.keys())
+
+    def stream_health(self, stream_key):
+        """ `health` of whatever currently serves a stream key (camera ID, or (camera_id, "main")). """
+        camera_id, which = stream_key if isinstance(stream_key, tuple) else (stream_key, None)
+        entry = self.get(camera_id)
+        source = entry.processor if entry is not None else None
+        if which == "main":
+            source = getattr(source, "main_stream", None)
+        return getattr(source, "health", None)
+
+    def list(self):
+        with self.lock:
+            entries = list(self.cameras.values())
+        return [entry.to_dict() for entry in entries]
+
+    # --- Thread Control (callers hold entry.lock) ---
+    def _start(self, entry):
+        with self.lock:
+            previous = self.stopping.get(entry.camera_id)
+            if previous is not None and not previous.is_alive():
+                del self.stopping[entry.camera_id]
+                previous = None
+        if previous is not None:
+            # Two threads for one camera would share its frame slot, and the old one's cleanup would clear it
+            raise CameraBusyError(f"Camera {entry.camera_id}: the previous thread is still stopping, try again later")
+        if self.supervisor is not None:
+            processor = self.supervisor.create_handle(entry.camera_id, entry.source, entry.settings)
+            entry.processor = processor
+            processor.start()
+            return
+        processor = CameraProcessor(
+            camera_id=entry.camera_id,
+            camera_source=entry.source,
+            config=self.config,
+            alert_queue=self.alert_queue,
+            frame_dict=self.frame_dict,
+            detector_factory=self.get_detector, # Loaded/warmed in the camera thread; shared across cameras
+            viewer_count=self.viewer_count
+        )
+        for key, value in entry.settings.items():
+            setattr(processor, key, value)
+        entry.processor = processor
+        processor.start()
+
+    def _stop(self, entry):
+        """ Stops the camera's thread. False if it is still running after `stop_timeout` (see `stopping`). """
+        processor, entry.processor = entry.processor, None
+        if processor is None:
+            return True
+        processor.stop()
+        if processor.is_alive():
+            processor.join(timeout=self.stop_timeout)
+            if processor.is_alive():
+                print(f"[Registry] Warning: Thread for Camera {entry.camera_id} did not stop gracefully.")
+                with self.lock:
+                    self.stopping[entry.camera_id] = processor # No restart until it exits (it clears its own slot)
+                return False
+        self.frame_dict.pop(entry.camera_id, None)
+        return True
+
+    # --- Mutations ---
+    def add(self, source, settings=None, camera_id=None, paused=False):
+        """ Registers a camera and starts its thread (unless paused). Raises ValueError on bad input. """
+        settings = self._validate_settings(settings)
+        with self.lock:
+            if camera_id is None:
+                camera_id = self.next_id
+            camera_id = normalize_camera_id(camera_id)
+            if camera_id in self.cameras:
+                raise ValueError(f"Camera {camera_id} already exists")
+            if isinstance(camera_id, int):
+                self.next_id = max(self.next_id, camera_id + 1)
+            entry = CameraEntry(camera_id, normalize_source(source), settings, paused)
+            self.cameras[camera_id] = entry
+        print(f"[Registry] Added Camera {camera_id} (Source: {entry.source}){' [paused]' if paused else ''}")
+        if not paused:
+            try:
+                with entry.lock:
+                    self._start(entry)
+            except Exception:
+                with self.lock:
+                    if self.cameras.get(camera_id) is entry:
+                        del self.cameras[camera_id] # Don't keep a camera that never started
+                raise
+        return entry
+
+    def register_remote(self, camera_id, source_label):
+        """ Registers a camera whose frames/detections arrive from an edge worker, replacing any previous entry. """
+        entry = CameraEntry(normalize_camera_id(camera_id), source_label, remote=True)
+        with self.lock:
+            previous = self.cameras.get(entry.camera_id)
+            self.cameras[entry.camera_id] = entry
+        if previous is not None:
+            with previous.lock:
+                previous.removed = True
+                self._stop(previous)
+            print(f"[Registry] Replaced Camera {entry.camera_id} ({previous.source} -> {source_label})")
+        return entry
+
+    def remove(self, camera_id, expected=None):
+        """ Removes a camera. With `expected`, only if that entry is still the registered one. """
+        with self.lock:
+            camera_id = normalize_camera_id(camera_id)
+            entry = self.cameras.get(camera_id)
+            if entry is None or (expected is not None and entry is not expected):
+                return None
+            del self.cameras[camera_id]
+        with entry.lock:
+            entry.removed = True
+            self._stop(entry)
+        if self.drop_streams is not None:
+            self.drop_streams(entry.camera_id) # Otherwise open streams would poll a camera that's gone forever
+        print(f"[Registry] Removed Camera {entry.camera_id}")
+        return entry
+
+    def pause(self, camera_id):
+        entry = self.get(camera_id)
+        if entry is None:
+            return None
+        with entry.lock:
+            if entry.removed:
+                return None
+            self._check_local(entry)
+            entry.paused = True
+            self._stop(entry)
+        print(f"[Registry] Paused Camera {entry.camera_id}")
+        return entry
+
+    def resume(self, camera_id):
+        """ Restarts a paused/stopped camera. Raises CameraBusyError while its old thread is still exiting. """
+        entry = self.get(camera_id)
+        if entry is None:
+            return None
+        with entry.lock:
+            if entry.removed:
+                return None
+            self._check_local(entry)
+            if not entry.is_running(): # Checked under the entry lock, so concurrent resumes start one thread
+                self._start(entry)
+            entry.paused = False
+        print(f"[Registry] Resumed Camera {entry.camera_id}")
+        return entry
+
+    def reconfigure(self, camera_id, source=None, settings=None):
+        """
+        Applies a new source and/or settings, restarting only this camera's thread. If the old thread
+        doesn't stop in time the new configuration is kept and CameraBusyError is raised (resume later).
+        """
+        settings = self._validate_settings(settings)
+        source = normalize_source(source) if source is not None else None
+        entry = self.get(camera_id)
+        if entry is None:
+            return None
+        with entry.lock:
+            if entry.removed:
+                return None
+            self._check_local(entry)
+            self._stop(entry)
+            if source is not None:
+                entry.source = source
+            entry.settings.update(settings)
+            if not entry.paused: # Paused cameras pick up the new config on resume
+                self._start(entry)
+        print(f"[Registry] Reconfigured Camera {entry.camera_id} (Source: {entry.source}, Settings: {entry.settings})")
+        return entry
+
+    def stop_all(self):
+        with self.lock:
+            entries = list(self.cameras.values())
+        for entry in entries:
+            if entry.processor is not None:
+                entry.processor.stop() # Signal all first so they wind down in parallel
+        for entry in entries:
+            with entry.lock:
+                self._stop(entry)
+
+    @staticmethod
+    def _check_local(entry):
+        if entry.remote:
+            raise ValueError(f"Camera {entry.camera_id} is managed by its edge worker")
+
+    @staticmethod
+    def _validate_settings(settings):
+        settings = dict(settings or {})
+        unknown = set(settings) - set(CAMERA_SETTING_KEYS)
+        if unknown:
+            raise ValueError(f"Unknown camera settings: {sorted(unknown)}")
+        for key in ("detect_w", "detect_h", "detect_every_n_frames"):
+            if key in settings:
+                settings[key] = int(settings[key])
+                if settings[key] < 1:
+                    raise ValueError(f"{key} must be >= 1")
+        for key in ("enable_resizing", "enable_frame_skipping", "enable_tiling"):
+            if key in settings:
+                settings[key] = parse_bool(settings[key], key) # bool("false") would be True
+        return settings
+
+
+"""
+camera_registry.py
+
+Runtime registry of camera sources and their `CameraProcessor` threads.
+
+class CameraRegistry:
+
+    Replaces the old "index into Config.CAMERA_SOURCES" scheme. Each camera gets a stable ID
+    (ints, allocated from a counter, never reused while the process runs) and lives in a dict,
+    so lookups from `/video_feed/<id>` and the camera API are O(1).
+
+    With `use_supervisor()`, cameras are started in CameraSupervisor worker processes instead
+    (see camera_supervisor.py); the API and IDs stay the same.
+
+    All in-process cameras share one `ThreatDetector` (the model is loaded once, on first use); the detector
+    serializes inference with its own lock.
+
+    Args:
+        config (object): Configuration object (model path, thresholds, snapshot dir, ...).
+        alert_queue (Queue): Shared queue for detection results.
+        frame_dict (FrameSlots): Per-camera latest-frame slots.
+
+    Methods:
+        add(source, settings, camera_id, paused): Register a camera and start its thread.
+        remove(camera_id): Stop its thread and drop its frame/stream state.
+        pause(camera_id) / resume(camera_id): Stop/start the thread but keep the registration.
+        reconfigure(camera_id, source, settings): Restart just this camera with new parameters.
+        register_remote(camera_id, source_label): Register an edge-worker camera (no local thread).
+
+    Lifecycle operations on one camera are serialized by its entry's lock. A thread that doesn't stop
+    within 5 s is parked in `stopping`; the camera can't be started again (CameraBusyError) until it
+    has exited, so two threads never share (and clear) one frame slot.
+        get(camera_id): O(1) lookup (accepts "3" or 3).
+        stop_all(): Stop every camera thread (used at shutdown).
+
+    Settings (`CAMERA_SETTING_KEYS`) map directly onto CameraProcessor attributes:
+        enable_resizing, detect_w, detect_h, enable_frame_skipping, detect_every_n_frames, enable_tiling
+"""
@@ -0,0 +1,531 @@
+# camera_supervisor.py
+import time
+import queue
+import random
+import threading
+import multiprocessing as mp
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+from frame_slots import FrameSlots
+
+# --- Shared-Memory Frame Ring ---
+HEADER_BYTES = 64      # [0:8] latest written sequence number (int64)
+SLOT_HEADER_BYTES = 32 # seq (int64), height, width, channels (int32 x3), padding, timestamp (float64)
+STATUS_MESSAGE = "camera_status" # Tuples with this tag on the detection queue carry worker-side camera state
+STATUS_INTERVAL = 1.0 # Seconds between status reports from each worker
+STATUS_STALE_SECONDS = 5.0 # No report for this long = the worker is hung; its cameras count as offline
+
+
+class SharedFrameRing:
+    """
+    Single-writer / multi-reader ring of frames in shared memory.
+    The writer fills the next slot and then publishes its sequence number; readers pick the
+    latest slot and re-check its sequence after copying (seqlock) to detect torn reads.
+    """
+    def __init__(self, name=None, slots=3, max_frame_bytes=1920 * 1080 * 3, create=False):
+        self.slots = slots
+        self.max_frame_bytes = max_frame_bytes
+        self.slot_bytes = SLOT_HEADER_BYTES + max_frame_bytes
+        size = HEADER_BYTES + slots * self.slot_bytes
+        if create:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+            self.shm.buf[:HEADER_BYTES] = bytes(HEADER_BYTES)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.name = self.shm.name
+        self.owner = create
+        self.latest = np.ndarray((1,), dtype=np.int64, buffer=self.shm.buf, offset=0)
+        self.slot_seq = []
+        self.slot_shape = []
+        self.slot_time = []
+        self.slot_data = []
+        for i in range(slots):
+            base = HEADER_BYTES + i * self.slot_bytes
+            self.slot_seq.append(np.ndarray((1,), dtype=np.int64, buffer=self.shm.buf, offset=base))
+            self.slot_shape.append(np.ndarray((3,), dtype=np.int32, buffer=self.shm.buf, offset=base + 8))
+            self.slot_time.append(np.ndarray((1,), dtype=np.float64, buffer=self.shm.buf, offset=base + 24))
+            self.slot_data.append(np.ndarray((max_frame_bytes,), dtype=np.uint8, buffer=self.shm.buf,
+                                             offset=base + SLOT_HEADER_BYTES))
+
+    def write(self, frame):
+        if frame.nbytes > self.max_frame_bytes:
+            # Shrink oversized frames to fit the slot (keeps aspect ratio)
+            scale = (self.max_frame_bytes / frame.nbytes) ** 0.5
+            frame = cv2.resize(frame, (max(1, int(frame.shape[1] * scale)), max(1, int(frame.shape[0] * scale))),
+                               interpolation=cv2.INTER_AREA)
+        frame = np.ascontiguousarray(frame)
+        seq = int(self.latest[0]) + 1
+        slot = seq % self.slots
+        self.slot_seq[slot][0] = -1 # Mark slot as being written
+        height, width = frame.shape[:2]
+        channels = frame.shape[2] if frame.ndim == 3 else 1
+        self.slot_shape[slot][:] = (height, width, channels)
+        self.slot_time[slot][0] = time.time()
+        self.slot_data[slot][:frame.nbytes] = frame.reshape(-1)
+        self.slot_seq[slot][0] = seq
+        self.latest[0] = seq
+
+    def read(self):
+        """ Returns (seq, timestamp, frame copy) for the newest complete frame, or (0, 0.0, None). """
+        for _ in range(3):
+            seq = int(self.latest[0])
+            if seq <= 0:
+                return 0, 0.0, None
+            slot = seq % self.slots
+            if int(self.slot_seq[slot][0]) != seq:
+                continue # Writer lapped us; retry with the new latest
+            height, width, channels = (int(v) for v in self.slot_shape[slot])
+            nbytes = height * width * channels
+            frame = self.slot_data[slot][:nbytes].copy()
+            timestamp = float(self.slot_time[slot][0])
+            if int(self.slot_seq[slot][0]) == seq:
+                shape = (height, width, channels) if channels > 1 else (height, width)
+                return seq, timestamp, frame.reshape(shape)
+        return 0, 0.0, None
+
+    def close(self):
+        # Drop numpy views first, otherwise SharedMemory.close() refuses (exported pointers)
+        self.latest = None
+        self.slot_seq, self.slot_shape, self.slot_time, self.slot_data = [], [], [], []
+        try:
+            self.shm.close()
+            if self.owner:
+                self.shm.unlink()
+        except (FileNotFoundError, BufferError):
+            pass
+
+
+class SharedFrameWriter:
+    """ Dict-like stand-in for `latest_frames` inside a worker: assignments go to the camera's ring. """
+    def __init__(self):
+        self.rings = {} # { camera_id: SharedFrameRing }
+
+    def attach(self, camera_id, ring_name, slots, max_frame_bytes):
+        self.rings[camera_id] = SharedFrameRing(ring_name, slots, max_frame_bytes)
+
+    def detach(self, camera_id):
+        ring = self.rings.pop(camera_id, None)
+        if ring:
+            ring.close()
+
+    def __setitem__(self, camera_id, frame):
+        ring = self.rings.get(camera_id)
+        if ring is not None:
+            ring.write(frame)
+
+    def pop(self, camera_id, default=None):
+        return default # Ring lifetime is owned by the supervisor
+
+
+class SharedFrameReader:
+    """ FrameSlots-like view used by the Flask process in place of `latest_frames`. """
+    def __init__(self):
+        self.rings = {} # { camera_id: SharedFrameRing }
+        self.local = FrameSlots() # Frames produced in this process (e.g. from edge workers)
+
+    def read(self, camera_id):
+        """ (seq, timestamp, frame); ring frames are private copies. """
+        ring = self.rings.get(camera_id)
+        if ring is None:
+            return self.local.read(camera_id)
+        return ring.read()
+
+    def still_valid(self, camera_id, seq):
+        return camera_id in self.rings or self.local.still_valid(camera_id, seq)
+
+    def get(self, camera_id, default=None):
+        frame = self.read(camera_id)[2]
+        return frame if frame is not None else default
+
+    def __setitem__(self, camera_id, frame):
+        self.local[camera_id] = frame
+
+    def __contains__(self, camera_id):
+        return camera_id in self.rings or camera_id in self.local
+
+    def pop(self, camera_id, default=None):
+        ring = self.rings.pop(camera_id, None)
+        if ring is None:
+            return self.local.pop(camera_id, default)
+        ring.close()
+        return None
+
+
+# --- Worker Process ---
+def camera_worker_main(worker_index, config, command_queue, detection_queue, stop_event,
+                       detector_factory=None, capture_factory=None):
+    """ Entry point of a worker process: runs the CameraProcessors assigned to it. """
+    from camera_processor import CameraProcessor, ThreatDetector # Imported in the child only
+
+    print(f"[Worker {worker_index}] Started.")
+    detector = detector_factory() if detector_factory else ThreatDetector.from_config(config)
+    frames = SharedFrameWriter()
+    processors = {} # { camera_id: CameraProcessor }
+    next_report = 0.0
+
+    def report_status():
+        # Lifecycle state, connection health and counters of each camera, for /readyz, /healthz and viewers
+        status = {camera_id: {"state": processor.state, "health": processor.health.to_dict(),
+                              "stats": dict(processor.stats)}
+                  for camera_id, processor in processors.items()}
+        try:
+            detection_queue.put((STATUS_MESSAGE, worker_index, status), block=False)
+        except queue.Full:
+            pass # The next report follows in STATUS_INTERVAL
+
+    def stop_camera(camera_id):
+        processor = processors.pop(camera_id, None)
+        if processor:
+            processor.stop()
+            processor.join(timeout=5.0)
+        frames.detach(camera_id)
+
+    while not stop_event.is_set():
+        if time.time() >= next_report:
+            report_status()
+            next_report = time.time() + STATUS_INTERVAL
+        try:
+            command = command_queue.get(timeout=0.5)
+        except queue.Empty:
+            continue
+        action = command[0]
+        if action == "add":
+            _, camera_id, source, settings, ring_name, slots, max_frame_bytes = command
+            stop_camera(camera_id)
+            frames.attach(camera_id, ring_name, slots, max_frame_bytes)
+            processor = CameraProcessor(
+                camera_id=camera_id,
+                camera_source=source,
+                config=config,
+                alert_queue=detection_queue, # multiprocessing.Queue raises queue.Full like queue.Queue
+                frame_dict=frames,
+                detector=detector,
+                capture_factory=capture_factory
+            )
+            for key, value in (settings or {}).items():
+                setattr(processor, key, value)
+            processor.always_publish = True # Viewers live in the Flask process
+            processors[camera_id] = processor
+            processor.start()
+        elif action == "remove":
+            stop_camera(command[1])
+        elif action == "stop":
+            break
+
+    for camera_id in list(processors):
+        stop_camera(camera_id)
+    print(f"[Worker {worker_index}] Stopped.")
+
+
+class RemoteCameraHealth:
+    """ CameraHealth stand-in for a worker-process camera, backed by the worker's status reports. """
+    def __init__(self, supervisor, camera_id):
+        self.supervisor = supervisor
+        self.camera_id = camera_id
+
+    def to_dict(self):
+        return self.supervisor.camera_health(self.camera_id)
+
+    def is_offline(self):
+        health = self.to_dict()
+        return health is not None and health["state"] in ("offline", "stalled")
+
+
+class RemoteCameraHandle:
+    """ Stands in for a CameraProcessor thread when the camera runs in a worker process. """
+    def __init__(self, supervisor, camera_id):
+        self.supervisor = supervisor
+        self.camera_id = camera_id
+        self.health = RemoteCameraHealth(supervisor, camera_id)
+
+    @property
+    def state(self):
+        """ Lifecycle state reported by the worker (see CameraProcessor.state). """
+        return self.supervisor.camera_state(self.camera_id)
+
+    def start(self):
+        self.supervisor.start_camera(self.camera_id)
+
+    def stop(self):
+        self.supervisor.stop_camera(self.camera_id)
+
+    def is_alive(self):
+        return self.supervisor.is_camera_running(self.camera_id)
+
+    def join(self, timeout=None):
+        pass # Stopping is asynchronous in the worker; nothing to wait on here
+
+
+# --- Supervisor ---
+class CameraSupervisor:
+    """
+    Spreads cameras over a pool of worker processes, restarts crashed workers and
+    forwards their detections into the main process' `alert_queue`.
+    """
+    def __init__(self, config, num_workers, alert_queue, detector_factory=None, capture_factory=None):
+        self.config = config
+        self.num_workers = max(1, int(num_workers))
+        self.alert_queue = alert_queue
+        # Optional picklable factories run in the workers (benchmark.py: stub detector, synthetic sources)
+        self.detector_factory = detector_factory
+        self.capture_factory = capture_factory
+        self.ctx = mp.get_context("spawn") # Never fork a process that already runs Flask/MQTT threads
+        self.detection_queue = self.ctx.Queue(maxsize=config.WORKER_DETECTION_QUEUE_SIZE)
+        self.stop_event = self.ctx.Event()
+        self.frames = SharedFrameReader()
+        self.lock = threading.RLock()
+        self.workers = [] # [{"process", "commands", "cameras": {camera_id: (source, settings)}, "restarts", "next_restart"}]
+        self.assignment = {} # { camera_id: worker_index }
+        self.camera_status = {} # { camera_id: (received_at, {"state", "health", "stats"}) } from worker reports
+        self.threads = []
+        self.running = False
+
+    def start(self):
+        print(f"[Supervisor] Starting {self.num_workers} camera worker processes...")
+        self.running = True
+        for index in range(self.num_workers):
+            worker = {"process": None, "commands": None, "cameras": {}, "restarts": 0, "next_restart": 0.0, "started_at": 0.0}
+            self.workers.append(worker)
+            process, commands = self._start_process(index)
+            with self.lock:
+                self._publish(index, process, commands)
+        for target, name in ((self._forward_detections, "SupervisorForwarder"),
+                             (self._monitor_workers, "SupervisorMonitor")):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def _start_process(self, index):
+        """ Starts a fresh worker process. Called without `self.lock`: a spawn-context start takes a while. """
+        commands = self.ctx.Queue()
+        process = self.ctx.Process(
+            target=camera_worker_main,
+            args=(index, self.config, commands, self.detection_queue, self.stop_event,
+                  self.detector_factory, self.capture_factory),
+            name=f"CameraWorker-{index}",
+            daemon=True
+        )
+        process.start()
+        return process, commands
+
+    def _publish(self, index, process, commands):
+        """ Installs a started process as worker `index` (caller holds `self.lock`). """
+        worker = self.workers[index]
+        worker["commands"] = commands
+        worker["process"] = process
+        worker["started_at"] = time.time()
+        for camera_id in worker["cameras"]:
+            self.camera_status.pop(camera_id, None) # The new process reports afresh (loading first)
+        # Re-send the worker's cameras as they are now (after a crash this restores its whole shard,
+        # including cameras added or removed while the process was starting)
+        for camera_id, (source, settings) in worker["cameras"].items():
+            self._send_add(index, camera_id, source, settings)
+
+    def _send_add(self, index, camera_id, source, settings):
+        ring = self.frames.rings[camera_id]
+        self.workers[index]["commands"].put(
+            ("add", camera_id, source, settings, ring.name, ring.slots, ring.max_frame_bytes))
+
+    # --- Camera Assignment (called via RemoteCameraHandle / CameraRegistry) ---
+    def create_handle(self, camera_id, source, settings):
+        with self.lock:
+            if camera_id not in self.assignment:
+                # Least-loaded worker keeps shards balanced as cameras come and go
+                index = min(range(self.num_workers), key=lambda i: len(self.workers[i]["cameras"]))
+                self.assignment[camera_id] = index
+            self.workers[self.assignment[camera_id]]["cameras"][camera_id] = (source, dict(settings or {}))
+        return RemoteCameraHandle(self, camera_id)
+
+    def start_camera(self, camera_id):
+        with self.lock:
+            index = self.assignment[camera_id]
+            source, settings = self.workers[index]["cameras"][camera_id]
+            if camera_id not in self.frames.rings:
+                self.frames.rings[camera_id] = SharedFrameRing(
+                    slots=self.config.SHM_RING_SLOTS, max_frame_bytes=self.config.SHM_MAX_FRAME_BYTES, create=True)
+            self._send_add(index, camera_id, source, settings)
+        print(f"[Supervisor] Camera {camera_id} assigned to worker {index}.")
+
+    def stop_camera(self, camera_id):
+        with self.lock:
+            index = self.assignment.pop(camera_id, None)
+            if index is None:
+                return
+            self.workers[index]["cameras"].pop(camera_id, None)
+            self.workers[index]["commands"].put(("remove", camera_id))
+            self.camera_status.pop(camera_id, None)
+
+    def is_camera_running(self, camera_id):
+        with self.lock:
+            index = self.assignment.get(camera_id)
+            if index is None:
+                return False
+            process = self.workers[index]["process"]
+        return process is not None and process.is_alive()
+
+    def camera_state(self, camera_id):
+        """ loading (no report yet) / the worker-reported state / failed (worker down) / stopped. """
+        with self.lock:
+            index = self.assignment.get(camera_id)
+            if index is None:
+                return "stopped"
+            process = self.workers[index]["process"]
+            report = self.camera_status.get(camera_id)
+        if process is None or not process.is_alive():
+            return "failed" # Crashed; the monitor restarts it
+        if report is None:
+            return "loading" # Worker still loading its model, or the camera was just added
+        return report[1]["state"]
+
+    def camera_health(self, camera_id):
+        """ The worker-reported CameraHealth dict, marked offline if the worker died or stopped reporting. """
+        with self.lock:
+            index = self.assignment.get(camera_id)
+            report = self.camera_status.get(camera_id)
+            process = self.workers[index]["process"] if index is not None else None
+        if report is None:
+            return None
+        received_at, status = report
+        health = dict(status["health"], reported_age=round(time.time() - received_at, 1))
+        if process is None or not process.is_alive():
+            health.update(state="offline", last_error="Worker process exited")
+        elif health["reported_age"] > STATUS_STALE_SECONDS:
+            health.update(state="stalled", last_error="Worker stopped reporting")
+        return health
+
+    def camera_stats(self, camera_id):
+        """ Last reported CameraProcessor.stats (benchmark.py), or None. """
+        with self.lock:
+            report = self.camera_status.get(camera_id)
+        return dict(report[1]["stats"]) if report is not None else None
+
+    # --- Background Threads ---
+    def _forward_detections(self):
+        while self.running:
+            try:
+                detection = self.detection_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                break
+            if isinstance(detection, tuple) and detection[0] == STATUS_MESSAGE:
+                _, index, status = detection
+                received_at = time.time()
+                with self.lock:
+                    for camera_id, camera_status in status.items():
+                        if self.assignment.get(camera_id) == index: # Ignore reports for cameras moved/removed since
+                            self.camera_status[camera_id] = (received_at, camera_status)
+                continue
+            try:
+                self.alert_queue.put(detection, block=False)
+            except queue.Full:
+                pass # Same policy as CameraProcessor: drop when the alert processor is behind
+
+    def _monitor_workers(self):
+        while self.running:
+            time.sleep(1.0)
+            self._check_workers()
+
+    def _check_workers(self):
+        # Decide under the lock, start processes outside it: handles, status and the forwarder stay responsive
+        due = []
+        with self.lock:
+            for index, worker in enumerate(self.workers):
+                process = worker["process"]
+                if not self.running or process is None or process.is_alive():
+                    continue
+                now = time.time()
+                if worker["next_restart"] == 0.0:
+                    if now - worker["started_at"] > 60.0:
+                        worker["restarts"] = 0 # Ran fine for a while; this isn't a crash loop
+                    # Exponential backoff with jitter so a crash loop doesn't spin the CPU
+                    delay = min(30.0, 2 ** min(worker["restarts"], 5)) * random.uniform(0.8, 1.2)
+                    worker["next_restart"] = now + delay
+                    print(f"[Supervisor] Worker {index} exited (code {process.exitcode}). Restarting in {delay:.1f}s "
+                          f"({len(worker['cameras'])} camera(s)).")
+                    continue
+                if now >= worker["next_restart"]:
+                    worker["restarts"] += 1
+                    worker["next_restart"] = 0.0
+                    due.append(index)
+        for index in due:
+            process, commands = self._start_process(index)
+            with self.lock:
+                self._publish(index, process, commands)
+
+    def status(self):
+        with self.lock:
+            return [{
+                "worker": index,
+                "pid": worker["process"].pid if worker["process"] else None,
+                "alive": bool(worker["process"] and worker["process"].is_alive()),
+                "restarts": worker["restarts"],
+                "cameras": list(worker["cameras"].keys()),
+            } for index, worker in enumerate(self.workers)]
+
+    def stop(self):
+        print("[Supervisor] Stopping camera workers...")
+        self.running = False
+        self.stop_event.set()
+        for worker in self.workers:
+            process = worker["process"]
+            if process is None:
+                continue
+            process.join(timeout=10.0)
+            if process.is_alive():
+                print(f"[Supervisor] Worker {process.name} did not stop; terminating.")
+                process.terminate()
+                process.join(timeout=2.0)
+        for thread in self.threads:
+            thread.join(timeout=2.0)
+        for camera_id in list(self.frames.rings):
+            self.frames.pop(camera_id)
+        print("[Supervisor] Camera workers stopped.")
+
+
+"""
+camera_supervisor.py
+
+Multi-process camera sharding. With `Config.CAMERA_WORKER_PROCESSES > 0`, cameras run in a pool
+of worker processes instead of threads in the Flask process, so decoding, inference and drawing
+are no longer serialized by one GIL and one misbehaving camera can only take down its own worker.
+
+Data paths:
+--------
+- Frames: each camera has a `SharedFrameRing` (shared memory, created by the supervisor).
+  The worker's CameraProcessor writes its stream frame into the ring via `SharedFrameWriter`
+  (a drop-in for the `latest_frames` dict); Flask reads the newest frame through
+  `SharedFrameReader.get()`, a raw memory copy with no pickling.
+- Detections: CameraProcessor puts its detection dicts on a `multiprocessing.Queue`; a forwarder
+  thread moves them into the normal `alert_queue`, so alert processing is unchanged.
+- Control: one command queue per worker ("add" / "remove" / "stop").
+- Status: every `STATUS_INTERVAL` each worker puts a `(STATUS_MESSAGE, worker, {camera_id: ...})` tuple
+  with every camera's state, health and counters on the detection queue. The forwarder keeps the latest
+  one per camera, and `RemoteCameraHandle.state` / `.health` serve it to /readyz, /healthz and the
+  stream's offline frame. Until a camera's first report its state is "loading" (the worker is still
+  loading its model). A dead worker means "failed", and a silent one marks its cameras "stalled".
+
+class CameraSupervisor:
+
+    Args:
+        config (object): Configuration object (passed to workers; must be importable, e.g. `Config`).
+        num_workers (int): Number of worker processes (typically the number of cores minus one).
+        alert_queue (Queue): The main process' alert queue.
+
+    Methods:
+        start() / stop(): Spawn / shut down the worker pool.
+        create_handle(camera_id, source, settings): Assign a camera to the least-loaded worker;
+            returns a `RemoteCameraHandle` (start/stop/is_alive/join) used by CameraRegistry.
+        status(): Per-worker pid, liveness, restart count and cameras.
+        camera_state(camera_id) / camera_health(camera_id) / camera_stats(camera_id): Worker-reported status.
+        detector_factory / capture_factory (optional, picklable): Used in the workers instead of the
+            real model / cv2.VideoCapture (benchmark.py `cameras --workers`).
+
+    Crashed workers are restarted with jittered exponential backoff (max 30s) and receive their
+    whole shard again; ring buffers outlive the worker so viewers keep their frame source.
+
+Each worker loads its own model copy, so memory grows with the worker count.
+"""
@@ -13,6 +13,9 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
         'sqlite:///' + os.path.join(basedir, 'instance', 'site.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Flask-Login user loader cache (see user_cache.py)
+    USER_CACHE_TTL_SECONDS = 60
+    USER_CACHE_MAX_SIZE = 1024
 
     # --- MQTT (Added if missing) ---
     MQTT_BROKER = os.environ.get('MQTT_BROKER') # Ensure this line exists and is inside the class
@@ -25,12 +28,57 @@ class Config:
                               "wood", "stick", "bludgeon", "club", "brass knuckles", "nunchaku", "katana", "scimitar", "swordfish"
                               ,"machete", "crossbow", "slingshot", "boomerang",  "scimitar"]
     PERSON_CLASS_NAME = "person"
+    ANNOTATE_CLASSES = None # Classes drawn on streams/snapshots (None = primary threats + person)
+    # Tiled inference for high-resolution cameras (per camera via the `enable_tiling` setting)
+    TILING_ENABLED = False
+    TILE_SIZE = 640 # Native pixels per tile edge
+    TILE_OVERLAP = 0.2 # Overlap between neighbouring tiles
+    TILE_TRACK_TTL_SECONDS = 2.0 # Tiles with detections this recent keep running without motion
+    TILE_FULL_SCAN_INTERVAL_SECONDS = 10.0 # Periodic pass over every tile
+    # Model cascade: a small model screens every frame, MODEL_PATH only runs on candidate frames
+    CASCADE_ENABLED = os.environ.get('CASCADE_ENABLED', 'False').lower() in ('true', '1', 't')
+    SCREEN_MODEL_PATH = "yolov8n.pt"
+    SCREEN_CONFIDENCE_THRESHOLD = 0.25 # Low on purpose: the screener should over- rather than under-escalate
+    CASCADE_ESCALATE_ON_CROPS = False # True = run MODEL_PATH on the candidate region only
+    CASCADE_CROP_MARGIN = 0.15 # Fraction of the candidate region added on each side
     ALERT_INTERVAL_SECONDS = 2.0 # Min seconds between alerts (for display/MQTT)
     SNAPSHOT_DIR = os.path.join(basedir, 'static', 'snapshots')
     MAX_ALERT_HISTORY = 50
+    # Columnar log of every detection for historical queries (see event_log.py)
+    EVENT_LOG_ENABLED = os.environ.get('EVENT_LOG_ENABLED', 'true').lower() == 'true'
+    EVENT_LOG_DIR = os.path.join(basedir, 'event_log')
+    EVENT_LOG_SEGMENT_SECONDS = 3600 # One segment per hour
+    EVENT_LOG_SEGMENT_CAPACITY = 1_000_000 # Rows preallocated per segment (rolls over early when full)
+    EVENT_LOG_RETENTION_DAYS = 30
+    EVENT_LOG_MAX_QUERY_ROWS = 10000 # Cap on rows returned by /api/events
     # Define camera sources (indices, RTSP URLs, video files, etc.)
     # Example: CAMERA_SOURCES = [0, 'rtsp://user:pass@ip:port/stream', '/dev/video1']
+    # Dual-stream camera (detect on the substream, main stream on demand):
+    #   {'detect': 'rtsp://ip/substream', 'main': 'rtsp://ip/mainstream'}
     CAMERA_SOURCES = [0] # Start with one camera
+    # Source connection supervision (see camera_health.py)
+    CAMERA_OPEN_TIMEOUT_SECONDS = 10 # Give up on an open that hangs (dead RTSP host)
+    CAMERA_READ_TIMEOUT_SECONDS = 5 # No frame for this long = stalled stream, reconnect
+    CAMERA_RETRY_BASE_SECONDS = 0.5 # First reconnect delay; doubles per failure (jittered)
+    CAMERA_RETRY_MAX_SECONDS = 30
+    CAMERA_STABLE_SECONDS = 30 # A connection that lasted this long resets the backoff
+
+    # --- Multi-Process Camera Workers ---
+    # 0 = run every CameraProcessor as a thread in the Flask process (default).
+    # N > 0 = shard cameras across N worker processes (frames via shared memory, see camera_supervisor.py).
+    CAMERA_WORKER_PROCESSES = int(os.environ.get('CAMERA_WORKER_PROCESSES') or 0)
+    SHM_RING_SLOTS = 3 # Frames buffered per camera in shared memory
+    SHM_MAX_FRAME_BYTES = 1920 * 1080 * 3 # Per-slot capacity; larger frames are downscaled to fit
+    WORKER_DETECTION_QUEUE_SIZE = 1000 # IPC queue from workers to the alert processor
+
+    # --- Edge Workers (see edge_worker.py) ---
+    EDGE_LISTEN_HOST = os.environ.get('EDGE_LISTEN_HOST') or '0.0.0.0'
+    EDGE_LISTEN_PORT = int(os.environ.get('EDGE_LISTEN_PORT') or 0) # Central node: 0 = don't accept edge workers
+    EDGE_AUTH_TOKEN = os.environ.get('EDGE_AUTH_TOKEN') # Shared secret checked in the HELLO message (required: the listener won't start without it)
+    EDGE_CENTRAL_HOST = os.environ.get('EDGE_CENTRAL_HOST') or '127.0.0.1' # Worker: where the central node listens
+    EDGE_NODE_NAME = os.environ.get('EDGE_NODE_NAME') # Worker: unique node name (defaults to hostname)
+    EDGE_FRAME_FPS = 10 # Worker: max frames per second sent per camera
+    EDGE_JPEG_QUALITY = 70
 
     # --- Email Alerts ---
     # Get these from environment variables for security!
@@ -42,10 +90,22 @@ class Config:
     MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD') # Your email APP PASSWORD (not main password)
     MAIL_SENDER = os.environ.get('MAIL_SENDER') or MAIL_USERNAME # Email address alerts come from
     MAIL_ALERT_INTERVAL_SECONDS = 60 # Min seconds between emails for the *same* threat type
+    MAIL_BATCH_SECONDS = 5.0 # Alerts within this window are merged into one email per recipient
+    SUBSCRIPTION_REFRESH_SECONDS = 300 # Periodic full reload of the subscription index (changes reload immediately)
     
+    # --- Profiling ---
+    PROFILER_MAX_DURATION_SECONDS = 300 # Upper bound for one /api/profiler session
+    PROFILER_DEFAULT_INTERVAL_MS = 10   # Sampling interval (lower = more detail, more overhead)
+
     # --- Other ---
     FLASK_HOST = '0.0.0.0'
     FLASK_PORT = 5000
+    SERVER_MODE = os.environ.get('SERVER_MODE', 'threaded').lower() # 'threaded' (app.run) or 'async' (uvicorn, see async_server.py)
+    STREAM_FPS = 30 # Max MJPEG frames/second per camera (encoded once, shared by all viewers)
+    STREAM_JPEG_QUALITY = 80
+    MAIN_STREAM_IDLE_SECONDS = 30 # Release a dual-stream camera's main stream after this long unused
+    MAIN_STREAM_SNAPSHOTS = True # Alert snapshots from the main stream when it is open (else the substream)
+    MAIN_STREAM_MAX_FRAME_AGE = 1.0 # Seconds; older main-stream frames aren't used for snapshots
 
 
 """
@@ -68,6 +128,7 @@ Main Configuration Sections:
 2. Database:
     - `SQLALCHEMY_DATABASE_URI`: Path to the app's SQLite database (or can be overridden via `DATABASE_URL` environment variable).
     - `SQLALCHEMY_TRACK_MODIFICATIONS`: Disables a feature that unnecessarily uses memory.
+    - `USER_CACHE_TTL_SECONDS` / `USER_CACHE_MAX_SIZE`: Bounded TTL cache of logged-in users, so authenticated requests skip the DB.
 
 3. MQTT Settings:
     - Used for real-time alert publishing to MQTT topics.
@@ -76,16 +137,38 @@ Main Configuration Sections:
 4. Camera & Detection:
     - `MODEL_PATH`: YOLOv8 model used for detection.
     - `CONFIDENCE_THRESHOLD`: Minimum confidence to consider a detection valid.
+    - `TILING_ENABLED` / `TILE_*`: Native-resolution tiled inference on motion/track tiles (see tiling.py).
+    - `CASCADE_ENABLED` / `SCREEN_MODEL_PATH`: Two-stage cascade; the screening model decides when `MODEL_PATH` runs.
     - `PRIMARY_THREAT_CLASSES`: List of objects considered a primary threat (triggers alerts even in normal mode).
     - `CAMERA_SOURCES`: Defines which camera feeds are used (webcam index, RTSP stream, etc.).
+    - `CAMERA_*_TIMEOUT_SECONDS` / `CAMERA_RETRY_*` / `CAMERA_STABLE_SECONDS`: Timed opens/reads, stall
+      detection and jittered exponential reconnect backoff (see camera_health.py, reported by /healthz).
+
+    - `CAMERA_WORKER_PROCESSES`: Number of worker processes to shard cameras across (0 = threads only).
+    - `SHM_RING_SLOTS` / `SHM_MAX_FRAME_BYTES`: Shared-memory frame ring sizing per camera.
+
+    - `EDGE_*`: Edge-worker mode; the central node listens on `EDGE_LISTEN_PORT`, workers run `edge_worker.py`.
 
 5. Email Alerts:
     - Settings for SMTP-based email alerts.
     - Use environment variables to store sensitive credentials securely.
     - `MAIL_ALERT_INTERVAL_SECONDS`: Minimum interval between similar alert emails to avoid spam.
+    - `MAIL_BATCH_SECONDS`: Batching window of the email dispatcher.
+    - Recipients come from per-user `AlertSubscription` rows (`/api/subscriptions`), not the logged-in user.
+    - `SUBSCRIPTION_REFRESH_SECONDS`: Safety-net reload interval of the in-memory subscription index.
+
+6. Profiling:
+    - `PROFILER_MAX_DURATION_SECONDS` / `PROFILER_DEFAULT_INTERVAL_MS`: Limits for the on-demand sampling profiler API.
+
+7. Event Log:
+    - `EVENT_LOG_*`: Memory-mapped columnar detection log (`/api/events`, `/api/events/hourly`), segmented by hour.
 
-6. Other:
+8. Other:
     - `FLASK_HOST` and `FLASK_PORT`: Used when running the app directly via `app.run()`.
+    - `SERVER_MODE`: `threaded` runs Flask's server (one thread per viewer); `async` serves MJPEG from one
+      event loop via uvicorn (needs the optional `uvicorn` and `asgiref` packages, requirements-async.txt).
+    - `STREAM_FPS` / `STREAM_JPEG_QUALITY`: Shared stream encoder settings (see streaming.py).
+    - `MAIN_STREAM_*`: Dual-stream cameras (see main_stream.py); `/video_feed/<id>?quality=full` shows the main stream.
 
 Usage:
 --------
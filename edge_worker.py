@@ -0,0 +1,415 @@
+# edge_worker.py
+import os
+import re
+import hmac
+import json
+import time
+import queue
+import socket
+import struct
+import random
+import argparse
+import threading
+
+import cv2
+import numpy as np
+
+from config import Config
+from frame_slots import FrameSlots
+
+# --- Wire Protocol ---
+PROTOCOL_MAGIC = b"SV"
+PROTOCOL_VERSION = 1
+HEADER = struct.Struct("!2sBBIdI") # magic, version, msg_type, camera_id, timestamp, payload_len
+MAX_PAYLOAD_BYTES = 16 * 1024 * 1024
+
+MSG_HELLO = 1      # JSON {"node", "token", "cameras": [ids]}
+MSG_FRAME = 2      # JPEG bytes
+MSG_DETECTION = 3  # JSON detection dict (as put on alert_queue by CameraProcessor)
+MSG_HEARTBEAT = 4  # empty
+MSG_SNAPSHOT = 5   # uint16 filename length + UTF-8 filename + JPEG bytes
+
+SNAPSHOT_NAME = re.compile(r"[A-Za-z0-9_.-]+\.jpg") # Snapshots from workers are always "<node>_<file>.jpg"
+
+
+class ProtocolError(Exception):
+    pass
+
+
+def encode_message(msg_type, camera_id=0, payload=b"", timestamp=None):
+    return HEADER.pack(PROTOCOL_MAGIC, PROTOCOL_VERSION, msg_type, camera_id,
+                       time.time() if timestamp is None else timestamp, len(payload)) + payload
+
+
+def recv_exact(sock, size):
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("Connection closed")
+        data.extend(chunk)
+    return bytes(data)
+
+
+def read_message(sock):
+    """ Reads one message; returns (msg_type, camera_id, timestamp, payload). """
+    magic, version, msg_type, camera_id, timestamp, length = HEADER.unpack(recv_exact(sock, HEADER.size))
+    if magic != PROTOCOL_MAGIC or version != PROTOCOL_VERSION:
+        raise ProtocolError(f"Bad header (magic={magic!r}, version={version})")
+    if length > MAX_PAYLOAD_BYTES:
+        raise ProtocolError(f"Payload too large ({length} bytes)")
+    payload = recv_exact(sock, length) if length else b""
+    return msg_type, camera_id, timestamp, payload
+
+
+def encode_snapshot_payload(filename, jpeg_bytes):
+    name = filename.encode("utf-8")
+    return struct.pack("!H", len(name)) + name + jpeg_bytes
+
+
+def decode_snapshot_payload(payload):
+    (name_len,) = struct.unpack("!H", payload[:2])
+    return payload[2:2 + name_len].decode("utf-8"), payload[2 + name_len:]
+
+
+# --- Worker Side ---
+class EdgeSender(threading.Thread):
+    """ Streams compressed frames and detections from this node to the central dashboard. """
+    def __init__(self, central_host, central_port, node_name, camera_ids, alert_queue, frame_dict,
+                 frame_fps=Config.EDGE_FRAME_FPS, jpeg_quality=Config.EDGE_JPEG_QUALITY,
+                 snapshot_dir=Config.SNAPSHOT_DIR, token=Config.EDGE_AUTH_TOKEN):
+        super().__init__(name="EdgeSender", daemon=True)
+        self.central = (central_host, central_port)
+        self.node_name = node_name
+        self.camera_ids = list(camera_ids)
+        self.alert_queue = alert_queue
+        self.frame_dict = frame_dict # FrameSlots written by this node's CameraProcessors
+        self.frame_interval = 1.0 / frame_fps if frame_fps > 0 else None
+        self.jpeg_quality = jpeg_quality
+        self.snapshot_dir = snapshot_dir
+        self.token = token or ""
+        self.running = False
+        self.sock = None
+        self.sent_versions = {} # { camera_id: FrameSlot seq last sent }
+
+    def connect(self):
+        sock = socket.create_connection(self.central, timeout=10.0)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        hello = json.dumps({"node": self.node_name, "token": self.token, "cameras": self.camera_ids}).encode("utf-8")
+        sock.sendall(encode_message(MSG_HELLO, payload=hello))
+        print(f"[Edge] Connected to central node {self.central[0]}:{self.central[1]} as '{self.node_name}'.")
+        return sock
+
+    def run(self):
+        self.running = True
+        backoff = 1.0
+        while self.running:
+            try:
+                self.sock = self.connect()
+                backoff = 1.0
+                self.sent_versions = {}
+                self.pump()
+            except (OSError, ConnectionError) as e:
+                print(f"[Edge] Connection to central node lost/failed: {e}. Retrying in {backoff:.0f}s...")
+            finally:
+                if self.sock:
+                    try: self.sock.close()
+                    except OSError: pass
+                    self.sock = None
+            if self.running:
+                time.sleep(backoff * random.uniform(0.8, 1.2))
+                backoff = min(backoff * 2, 30.0)
+
+    def pump(self):
+        next_frame_time = 0.0
+        last_send = time.time()
+        while self.running:
+            # Detections first: they are small and latency-sensitive
+            try:
+                detection = self.alert_queue.get(timeout=0.02)
+                self.send_detection(detection)
+                last_send = time.time()
+                continue
+            except queue.Empty:
+                pass
+
+            now = time.time()
+            if self.frame_interval and now >= next_frame_time:
+                next_frame_time = now + self.frame_interval
+                for camera_id in self.camera_ids:
+                    version, _, frame = self.frame_dict.read(camera_id)
+                    if frame is None or self.sent_versions.get(camera_id) == version:
+                        continue # Nothing new; never resend stale frames
+                    ret, buffer = cv2.imencode('.jpg', frame, [int(cv2.IMWRITE_JPEG_QUALITY), self.jpeg_quality])
+                    if ret and self.frame_dict.still_valid(camera_id, version): # Not overwritten mid-encode
+                        self.sock.sendall(encode_message(MSG_FRAME, camera_id, buffer.tobytes()))
+                        self.sent_versions[camera_id] = version
+                        last_send = now
+            if now - last_send > 5.0:
+                self.sock.sendall(encode_message(MSG_HEARTBEAT))
+                last_send = now
+
+    def send_detection(self, detection):
+        camera_id = int(detection.get('camera_id', 0))
+        snapshot_file = detection.get('snapshot_file')
+        if snapshot_file:
+            # Ship the snapshot so the dashboard can show it; prefix with the node to avoid name clashes
+            remote_name = f"{self.node_name}_{snapshot_file}"
+            try:
+                with open(os.path.join(self.snapshot_dir, snapshot_file), 'rb') as f:
+                    self.sock.sendall(encode_message(MSG_SNAPSHOT, camera_id,
+                                                     encode_snapshot_payload(remote_name, f.read())))
+                detection = dict(detection, snapshot_file=remote_name)
+            except OSError as e:
+                print(f"[Edge] Could not read snapshot '{snapshot_file}': {e}")
+                detection = dict(detection, snapshot_file=None)
+        payload = json.dumps(detection, default=float).encode("utf-8")
+        self.sock.sendall(encode_message(MSG_DETECTION, camera_id, payload, detection.get('timestamp')))
+
+    def stop(self):
+        self.running = False
+
+
+# --- Central Side ---
+class EdgeReceiver(threading.Thread):
+    """ Accepts edge worker connections and merges their frames/detections into the local pipeline. """
+    def __init__(self, host, port, alert_queue, frame_dict, camera_registry,
+                 snapshot_dir=Config.SNAPSHOT_DIR, token=Config.EDGE_AUTH_TOKEN):
+        super().__init__(name="EdgeReceiver", daemon=True)
+        self.address = (host, port)
+        self.alert_queue = alert_queue
+        self.frame_dict = frame_dict
+        self.camera_registry = camera_registry
+        self.snapshot_dir = snapshot_dir
+        self.token = token or ""
+        self.running = False
+        self.server = None
+        self.lock = threading.Lock() # Guards `nodes` (one handler thread per connection)
+        self.nodes = {} # { node_name: {"address", "connected_at", "last_seen", "cameras", "session"} }
+
+    @staticmethod
+    def remote_camera_id(node_name, camera_id):
+        return f"{node_name}-{camera_id}"
+
+    def run(self):
+        if not self.token:
+            # Without a shared secret anyone who can reach the port could inject detections and files
+            print("[EdgeRecv] Error: EDGE_AUTH_TOKEN is not set; refusing to accept edge workers.")
+            return
+        self.running = True
+        self.server = socket.create_server(self.address)
+        self.server.settimeout(1.0)
+        print(f"[EdgeRecv] Listening for edge workers on {self.address[0]}:{self.address[1]}")
+        while self.running:
+            try:
+                conn, address = self.server.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            threading.Thread(target=self.handle_connection, args=(conn, address),
+                             name=f"EdgeConn-{address[0]}", daemon=True).start()
+        print("[EdgeRecv] Stopped.")
+
+    def handle_connection(self, conn, address):
+        node_name = None
+        session = object() # Identifies this connection's entry in `nodes` (a node may reconnect before we notice)
+        snapshot = None # Last accepted snapshot; EdgeSender sends it right before the detection that uses it
+        try:
+            conn.settimeout(30.0) # Workers heartbeat every 5s; silence means the link is dead
+            msg_type, _, _, payload = read_message(conn)
+            if msg_type != MSG_HELLO:
+                raise ProtocolError("Expected HELLO")
+            hello = json.loads(payload.decode("utf-8"))
+            if not isinstance(hello, dict):
+                raise ProtocolError("HELLO payload is not an object")
+            if not self.check_token(hello.get("token")):
+                raise ProtocolError("Invalid token")
+            node_name = str(hello["node"]).replace("/", "_")
+            node = self.register_node(node_name, address, hello.get("cameras", []), session)
+
+            while self.running:
+                msg_type, camera_id, timestamp, payload = read_message(conn)
+                node["last_seen"] = time.time()
+                remote_id = self.remote_camera_id(node_name, camera_id)
+                if msg_type == MSG_FRAME:
+                    frame = cv2.imdecode(np.frombuffer(payload, dtype=np.uint8), cv2.IMREAD_COLOR)
+                    if frame is not None:
+                        self.frame_dict[remote_id] = frame
+                elif msg_type == MSG_DETECTION:
+                    detection = json.loads(payload.decode("utf-8"))
+                    if not isinstance(detection, dict):
+                        raise ProtocolError("DETECTION payload is not an object")
+                    snapshot_file = detection.get('snapshot_file')
+                    if snapshot_file is not None and snapshot_file != snapshot:
+                        detection['snapshot_file'] = None # Rejected or never sent: don't link a file we don't have
+                    snapshot = None
+                    detection['camera_id'] = remote_id
+                    detection['edge_node'] = node_name
+                    try:
+                        self.alert_queue.put(detection, block=False)
+                    except queue.Full:
+                        pass
+                elif msg_type == MSG_SNAPSHOT:
+                    snapshot = None
+                    filename, jpeg_bytes = decode_snapshot_payload(payload)
+                    if not self.valid_snapshot(node_name, filename, jpeg_bytes):
+                        print(f"[EdgeRecv] Rejected snapshot {filename!r} from '{node_name}'.")
+                        continue
+                    with open(os.path.join(self.snapshot_dir, filename), 'wb') as f:
+                        f.write(jpeg_bytes)
+                    snapshot = filename
+                elif msg_type == MSG_HEARTBEAT:
+                    pass
+                else:
+                    print(f"[EdgeRecv] Ignoring unknown message type {msg_type} from '{node_name}'.")
+        except (ConnectionError, socket.timeout, OSError, ProtocolError, ValueError, KeyError,
+                TypeError, struct.error) as e:
+            print(f"[EdgeRecv] Connection from {address[0]} ({node_name or 'unknown'}) closed: {e}")
+        finally:
+            try: conn.close()
+            except OSError: pass
+            if node_name:
+                self.unregister_node(node_name, session)
+
+    def check_token(self, token):
+        if not self.token or not isinstance(token, str):
+            return False
+        return hmac.compare_digest(token.encode("utf-8"), self.token.encode("utf-8"))
+
+    @staticmethod
+    def valid_snapshot(node_name, filename, jpeg_bytes):
+        """ Only "<node>_<name>.jpg" in the snapshot directory itself, and only if it really is a JPEG. """
+        if not SNAPSHOT_NAME.fullmatch(filename) or not filename.startswith(f"{node_name}_"):
+            return False
+        image = cv2.imdecode(np.frombuffer(jpeg_bytes, dtype=np.uint8), cv2.IMREAD_COLOR)
+        return image is not None and jpeg_bytes[:3] == b"\xff\xd8\xff"
+
+    def register_node(self, node_name, address, camera_ids, session):
+        """ Registers a connected node; a reconnect under the same name replaces the old session. """
+        camera_ids = [int(camera_id) for camera_id in camera_ids]
+        node = {"address": address[0], "connected_at": time.time(), "last_seen": time.time(),
+                "cameras": camera_ids, "session": session, "entries": {}}
+        with self.lock:
+            previous = self.nodes.get(node_name)
+            self.nodes[node_name] = node
+            for camera_id in camera_ids:
+                remote_id = self.remote_camera_id(node_name, camera_id)
+                node["entries"][remote_id] = self.camera_registry.register_remote(remote_id, f"edge://{node_name}/{camera_id}")
+            if previous:
+                for remote_id, entry in previous["entries"].items():
+                    if remote_id not in node["entries"]: # Camera dropped from the worker's new config
+                        self.camera_registry.remove(remote_id, expected=entry)
+        print(f"[EdgeRecv] Edge node '{node_name}' connected from {address[0]} with cameras {camera_ids}"
+              f"{' (replacing previous session)' if previous else ''}.")
+        return node
+
+    def unregister_node(self, node_name, session):
+        """ Removes the node's cameras, unless a newer connection from the same node has taken over. """
+        with self.lock:
+            node = self.nodes.get(node_name)
+            if not node or node["session"] is not session:
+                return
+            del self.nodes[node_name]
+            for remote_id, entry in node["entries"].items():
+                self.camera_registry.remove(remote_id, expected=entry)
+        print(f"[EdgeRecv] Edge node '{node_name}' disconnected.")
+
+    def stop(self):
+        self.running = False
+        if self.server:
+            try: self.server.close()
+            except OSError: pass
+
+
+# --- Worker Mode Entry Point ---
+def run_worker(central_host, central_port, node_name, sources):
+    from camera_processor import CameraProcessor, ThreatDetector # Heavy imports only in worker mode
+
+    alert_queue = queue.Queue(maxsize=1000)
+    frames = FrameSlots()
+    detector = ThreatDetector.from_config(Config)
+    processors = []
+    for camera_id, source in enumerate(sources):
+        processor = CameraProcessor(camera_id, source, Config, alert_queue, frames, detector=detector)
+        processor.always_publish = True # Viewers are on the central node
+        processors.append(processor)
+        processor.start()
+
+    sender = EdgeSender(central_host, central_port, node_name, range(len(sources)), alert_queue, frames)
+    sender.start()
+    print(f"[Edge] Worker '{node_name}' running {len(processors)} camera(s). Press Ctrl+C to stop.")
+    try:
+        while any(p.is_alive() for p in processors):
+            time.sleep(1.0)
+    except KeyboardInterrupt:
+        print("\n[Edge] Ctrl+C received. Stopping...")
+    finally:
+        sender.stop()
+        for processor in processors:
+            processor.stop()
+        for processor in processors:
+            processor.join(timeout=5.0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run only the detection pipeline and feed a central SentryVision node")
+    parser.add_argument("--central", default=f"{Config.EDGE_CENTRAL_HOST}:{Config.EDGE_LISTEN_PORT or 5001}",
+                        help="host:port of the central node's edge listener")
+    parser.add_argument("--node", default=Config.EDGE_NODE_NAME or socket.gethostname(), help="Unique name for this worker")
+    parser.add_argument("--source", action="append", help="Camera source (repeatable); defaults to Config.CAMERA_SOURCES")
+    args = parser.parse_args()
+
+    host, _, port = args.central.rpartition(":")
+    sources = [int(s) if s.isdigit() else s for s in args.source] if args.source else list(Config.CAMERA_SOURCES)
+    run_worker(host or "127.0.0.1", int(port), args.node, sources)
+
+
+"""
+edge_worker.py
+
+Distributed edge-worker mode. An edge worker runs only the CameraProcessor pipeline (no Flask,
+no database) and streams its results to a central dashboard node over plain TCP. The central node
+(`main.py` with `EDGE_LISTEN_PORT` set) merges every worker's detections into its own
+`alert_queue`, so they land in `alert_history`, MQTT and email like local ones.
+
+Running:
+--------
+    # Central node (dashboard):
+    EDGE_LISTEN_PORT=5001 EDGE_AUTH_TOKEN=secret python main.py
+    # Each inference box:
+    EDGE_AUTH_TOKEN=secret python edge_worker.py --central dashboard-host:5001 --node gate --source rtsp://...
+
+Wire Protocol (version 1):
+--------
+Every message is a fixed 20-byte big-endian header followed by `payload_len` bytes:
+
+    offset size type     field
+    0      2    bytes    magic = b"SV"
+    2      1    uint8    version = 1
+    3      1    uint8    msg_type
+    4      4    uint32   camera_id (worker-local camera index; 0 for connection-level messages)
+    8      8    float64  timestamp (sender clock, Unix seconds)
+    16     4    uint32   payload_len (max 16 MiB)
+
+    msg_type  name       payload
+    1         HELLO      UTF-8 JSON {"node": str, "token": str, "cameras": [int]} - must be first
+    2         FRAME      JPEG-encoded annotated frame (sent at most EDGE_FRAME_FPS per camera, newest only)
+    3         DETECTION  UTF-8 JSON detection dict (class, confidence, is_primary_threat, bbox, timestamp, ...)
+    4         HEARTBEAT  empty; sent after 5s without traffic (central drops silent links after 30s)
+    5         SNAPSHOT   uint16 name_len + UTF-8 file name + JPEG bytes; precedes the DETECTION that references it
+
+On the central node, camera `<n>` of worker `<node>` appears as camera ID `"<node>-<n>"` in the
+camera registry (remote entries cannot be paused/reconfigured from the dashboard). Workers reconnect
+with jittered exponential backoff; the protocol can be exercised entirely on localhost.
+
+Classes:
+--------
+- EdgeSender: worker-side connection (frames, detections, snapshots, heartbeats).
+- EdgeReceiver: central-side listener; one thread per connected worker. Refuses to run without
+  EDGE_AUTH_TOKEN (compared in constant time). A node that reconnects under the same name replaces
+  its previous session, and the stale connection's cleanup leaves the new session's cameras alone.
+  SNAPSHOT names must be "<node>_<name>.jpg" and the payload must decode as a JPEG.
+Worker cameras publish into `FrameSlots`; the sender compares slot sequence numbers so unchanged
+frames are never resent.
+"""
@@ -0,0 +1,350 @@
+# event_log.py
+import os
+import json
+import time
+import shutil
+import threading
+
+import numpy as np
+
+# Column name -> (dtype, per-row shape)
+COLUMNS = {
+    "timestamp": (np.float64, ()),
+    "camera": (np.int32, ()),
+    "class_id": (np.int16, ()),
+    "confidence": (np.float32, ()),
+    "bbox": (np.float32, (4,)), # Normalized [xmin, ymin, xmax, ymax] (bbox_norm), resolution independent
+}
+
+
+class Segment:
+    """ One time-bounded chunk of the log: a memory-mapped file per column plus a small meta.json. """
+    def __init__(self, path, start_time, capacity, create=False):
+        self.path = path
+        self.start_time = start_time
+        self.capacity = capacity
+        mode = "r+"
+        if create:
+            os.makedirs(path, exist_ok=True)
+            self.count = 0
+            self.min_time = start_time
+            self.end_time = start_time
+            mode = "w+"
+        else:
+            with open(os.path.join(path, "meta.json")) as f:
+                meta = json.load(f)
+            self.count = meta["count"]
+            self.min_time = meta.get("min_time", self.start_time)
+            self.end_time = meta["end_time"]
+            self.capacity = meta["capacity"]
+        self.columns = {
+            name: np.memmap(os.path.join(path, f"{name}.bin"), dtype=dtype, mode=mode, shape=(self.capacity,) + shape)
+            for name, (dtype, shape) in COLUMNS.items()
+        }
+        if create:
+            self.flush()
+
+    @classmethod
+    def open_readonly(cls, path):
+        segment = cls.__new__(cls)
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        segment.path = path
+        segment.start_time = meta["start_time"]
+        segment.min_time = meta.get("min_time", segment.start_time)
+        segment.end_time = meta["end_time"]
+        segment.capacity = meta["capacity"]
+        segment.count = meta["count"]
+        segment.columns = {
+            name: np.memmap(os.path.join(path, f"{name}.bin"), dtype=dtype, mode="r", shape=(segment.capacity,) + shape)
+            for name, (dtype, shape) in COLUMNS.items()
+        } if segment.count else {}
+        return segment
+
+    def is_full(self):
+        return self.count >= self.capacity
+
+    def append(self, timestamp, camera, class_id, confidence, bbox):
+        row = self.count
+        self.columns["timestamp"][row] = timestamp
+        self.columns["camera"][row] = camera
+        self.columns["class_id"][row] = class_id
+        self.columns["confidence"][row] = confidence
+        self.columns["bbox"][row] = bbox
+        self.count = row + 1 # Publish the row only after all columns are written
+        self.min_time = min(self.min_time, timestamp) # Late rows can predate the segment's start
+        self.end_time = max(self.end_time, timestamp)
+
+    def flush(self):
+        for column in self.columns.values():
+            column.flush()
+        meta_path = os.path.join(self.path, "meta.json")
+        with open(meta_path + ".tmp", "w") as f:
+            json.dump({"start_time": self.start_time, "min_time": self.min_time, "end_time": self.end_time,
+                       "count": self.count, "capacity": self.capacity}, f)
+        os.replace(meta_path + ".tmp", meta_path) # Atomic, so readers never see a half-written meta
+
+    def view(self, count=None):
+        """ Read-only column views of the first `count` rows (no copy). """
+        count = self.count if count is None else count
+        return {name: column[:count] for name, column in self.columns.items()}
+
+
+class DetectionEventLog:
+    """
+    Append-only columnar log of every detection, split into time-based memory-mapped segments.
+    Appends come from one thread (the alert processor); queries can run from any thread.
+    """
+    def __init__(self, directory, segment_seconds=3600, segment_capacity=1_000_000,
+                 flush_interval=5.0, retention_days=30):
+        self.directory = directory
+        self.segment_seconds = segment_seconds
+        self.segment_capacity = segment_capacity
+        self.flush_interval = flush_interval
+        self.retention_days = retention_days
+        self.lock = threading.Lock()
+        self.active = None # Segment being written
+        self.min_times = {} # { closed segment name: earliest row timestamp } (see _min_time)
+        self.last_flush = time.time()
+        os.makedirs(directory, exist_ok=True)
+        # Strings (camera IDs like "gate-0", class names) are interned to small ints
+        self.dictionary_path = os.path.join(directory, "dictionary.json")
+        self.cameras, self.classes = {}, {}
+        if os.path.exists(self.dictionary_path):
+            with open(self.dictionary_path) as f:
+                saved = json.load(f)
+            self.cameras, self.classes = saved.get("cameras", {}), saved.get("classes", {})
+        self.camera_names = {code: name for name, code in self.cameras.items()}
+        self.class_names = {code: name for name, code in self.classes.items()}
+
+    # --- Writing ---
+    def _intern(self, table, reverse, value):
+        key = str(value)
+        code = table.get(key)
+        if code is None:
+            code = len(table)
+            table[key] = code
+            reverse[code] = key
+            self._save_dictionary()
+        return code
+
+    def _save_dictionary(self):
+        with open(self.dictionary_path + ".tmp", "w") as f:
+            json.dump({"cameras": self.cameras, "classes": self.classes}, f)
+        os.replace(self.dictionary_path + ".tmp", self.dictionary_path)
+
+    def _segment_for(self, timestamp):
+        active = self.active
+        if active is not None and not active.is_full() and timestamp < active.start_time + self.segment_seconds:
+            # Segments only roll forward. A late row (edge worker clock, queued across an hour
+            # boundary) goes into the active segment; its meta min_time keeps queries correct.
+            return active
+        if active is not None:
+            active.flush()
+        # A full segment's overflow continues in the same period; late rows never reopen an old one
+        segment_start = int(max(timestamp, active.start_time if active is not None else timestamp)
+                            // self.segment_seconds * self.segment_seconds)
+        # Name = start time (+ sequence if an hour overflows its capacity), so directory order = time order
+        sequence = 0
+        while True:
+            path = os.path.join(self.directory, f"{segment_start:012d}_{sequence:03d}")
+            if not os.path.exists(path):
+                break
+            sequence += 1
+        self.active = Segment(path, segment_start, self.segment_capacity, create=True)
+        self._apply_retention()
+        return self.active
+
+    def append(self, detection):
+        """ Appends one detection dict (as produced by CameraProcessor). """
+        timestamp = float(detection.get("timestamp") or time.time())
+        bbox = detection.get("bbox_norm") or (0.0, 0.0, 0.0, 0.0)
+        with self.lock:
+            camera = self._intern(self.cameras, self.camera_names, detection.get("camera_id"))
+            class_code = self._intern(self.classes, self.class_names, detection.get("class"))
+            self._segment_for(timestamp).append(timestamp, camera, class_code, float(detection.get("confidence", 0.0)), bbox)
+            if time.time() - self.last_flush >= self.flush_interval:
+                self.active.flush()
+                self.last_flush = time.time()
+
+    def flush(self):
+        with self.lock:
+            if self.active is not None:
+                self.active.flush()
+                self.last_flush = time.time()
+
+    def _apply_retention(self):
+        if not self.retention_days:
+            return
+        cutoff = time.time() - self.retention_days * 86400
+        for name in self._segment_names():
+            start = int(name.split("_")[0])
+            if start + self.segment_seconds < cutoff and os.path.join(self.directory, name) != self.active.path:
+                shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
+                self.min_times.pop(name, None)
+
+    # --- Reading ---
+    def _segment_names(self):
+        return sorted(n for n in os.listdir(self.directory) if os.path.isdir(os.path.join(self.directory, n)))
+
+    def _min_time(self, name, path):
+        """ Earliest row timestamp of a closed segment (late rows can predate its name); cached, they never change. """
+        min_time = self.min_times.get(name)
+        if min_time is None:
+            try:
+                with open(os.path.join(path, "meta.json")) as f:
+                    meta = json.load(f)
+            except (OSError, ValueError):
+                return None
+            min_time = self.min_times[name] = meta.get("min_time", meta["start_time"])
+        return min_time
+
+    def _segments(self, start, end, newest_first=False):
+        """ Yields (segment_start, column views) of every segment overlapping [start, end). """
+        with self.lock:
+            active = self.active
+            active_count = active.count if active is not None else 0
+            active_min = active.min_time if active is not None else None
+        names = self._segment_names()
+        for name in (reversed(names) if newest_first else names):
+            segment_start = int(name.split("_")[0])
+            if segment_start + self.segment_seconds <= start:
+                continue # Pruned by name alone: rows are never later than their segment's period
+            path = os.path.join(self.directory, name)
+            if active is not None and active.path == path:
+                if active_count and active_min < end:
+                    yield segment_start, active.view(active_count)
+                continue
+            if segment_start >= end:
+                min_time = self._min_time(name, path)
+                if min_time is None or min_time >= end:
+                    continue # No late rows reaching back into the window
+            try:
+                segment = Segment.open_readonly(path)
+            except (OSError, ValueError):
+                continue
+            if segment.count:
+                yield segment_start, segment.view()
+
+    def _mask(self, columns, start, end, camera_code, class_code, min_confidence):
+        timestamps = columns["timestamp"]
+        mask = (timestamps >= start) & (timestamps < end)
+        if camera_code is not None:
+            mask &= columns["camera"] == camera_code
+        if class_code is not None:
+            mask &= columns["class_id"] == class_code
+        if min_confidence is not None:
+            mask &= columns["confidence"] >= min_confidence
+        return mask
+
+    def _codes(self, camera, class_name):
+        camera_code = self.cameras.get(str(camera)) if camera is not None else None
+        class_code = self.classes.get(str(class_name)) if class_name is not None else None
+        unknown = (camera is not None and camera_code is None) or (class_name is not None and class_code is None)
+        return camera_code, class_code, unknown
+
+    def query(self, start=0.0, end=None, camera=None, class_name=None, min_confidence=None, limit=None):
+        """
+        Matching rows as a dict of numpy columns (camera/class decoded to strings), ordered by segment/time.
+        With a `limit`, the newest `limit` rows in timestamp order.
+        """
+        end = time.time() + 1 if end is None else end
+        camera_code, class_code, unknown = self._codes(camera, class_name)
+        parts = {name: [] for name in COLUMNS}
+        total = 0
+        cutoff = None # Timestamp of the limit-th newest row collected so far
+        if not unknown:
+            # Newest segments first, so the limit keeps the most recent rows
+            for segment_start, columns in self._segments(start, end, newest_first=limit is not None):
+                if cutoff is not None and segment_start + self.segment_seconds <= cutoff:
+                    break # This and all older segments only hold rows older than the ones kept
+                mask = self._mask(columns, start, end, camera_code, class_code, min_confidence)
+                for name in COLUMNS:
+                    parts[name].append(columns[name][mask])
+                total += int(mask.sum())
+                if limit is not None and total >= limit > 0:
+                    # Late rows can make a newer segment hold older rows, so keep going while they could matter
+                    cutoff = np.partition(np.concatenate(parts["timestamp"]), total - limit)[total - limit]
+        result = {}
+        for name, (dtype, shape) in COLUMNS.items():
+            result[name] = np.concatenate(parts[name]) if parts[name] else np.empty((0,) + shape, dtype=dtype)
+        if limit is not None:
+            keep = np.argsort(result["timestamp"], kind="stable")[max(len(result["timestamp"]) - limit, 0):]
+            for name in COLUMNS:
+                result[name] = result[name][keep]
+        result["camera_id"] = np.array([self.camera_names[c] for c in result["camera"]], dtype=object)
+        result["class"] = np.array([self.class_names[c] for c in result["class_id"]], dtype=object)
+        return result
+
+    def count(self, start=0.0, end=None, camera=None, class_name=None, min_confidence=None):
+        end = time.time() + 1 if end is None else end
+        camera_code, class_code, unknown = self._codes(camera, class_name)
+        if unknown:
+            return 0
+        return sum(int(self._mask(columns, start, end, camera_code, class_code, min_confidence).sum())
+                   for _, columns in self._segments(start, end))
+
+    def hourly_counts(self, start=0.0, end=None, camera=None, min_confidence=None):
+        """ { hour_start_epoch: { class_name: count } } over [start, end). """
+        end = time.time() + 1 if end is None else end
+        camera_code, _, unknown = self._codes(camera, None)
+        totals = {}
+        if unknown:
+            return totals
+        num_classes = max(len(self.classes), 1)
+        for _, columns in self._segments(start, end):
+            mask = self._mask(columns, start, end, camera_code, None, min_confidence)
+            hours = (columns["timestamp"][mask] // 3600).astype(np.int64)
+            if not len(hours):
+                continue
+            # One combined key per (hour, class) so a single np.unique does the group-by
+            keys = hours * num_classes + columns["class_id"][mask].astype(np.int64)
+            unique_keys, counts = np.unique(keys, return_counts=True)
+            for key, count in zip(unique_keys.tolist(), counts.tolist()):
+                hour, class_code = divmod(key, num_classes)
+                bucket = totals.setdefault(hour * 3600, {})
+                class_name = self.class_names[class_code]
+                bucket[class_name] = bucket.get(class_name, 0) + count
+        return dict(sorted(totals.items()))
+
+    def close(self):
+        self.flush()
+
+
+"""
+event_log.py
+
+Columnar, memory-mapped log of every raw detection (not just the throttled alerts kept in
+`alert_history`), for historical analytics.
+
+Storage layout (`Config.EVENT_LOG_DIR`):
+--------
+    dictionary.json                 camera ID / class name -> small int codes
+    <segment_start>_<seq>/          one directory per time segment (default: 1 hour)
+        meta.json                   start_time, min_time, end_time, count, capacity (replaced atomically)
+        timestamp.bin   float64     detection time (Unix seconds)
+        camera.bin      int32       camera code
+        class_id.bin    int16       class code
+        confidence.bin  float32
+        bbox.bin        float32 x4  normalized [xmin, ymin, xmax, ymax]
+
+Each column file is preallocated to `segment_capacity` rows (sparse on disk) and memory-mapped;
+a segment rolls over when a row past its hour arrives or it fills up. Segments only roll forward:
+a late row (an edge worker's clock, a detection queued across the hour boundary) is written to the
+active segment, whose `min_time` records how far back it reaches. `count` in meta.json is flushed every
+`flush_interval` seconds, so a crash loses at most that much. Segments older than
+`retention_days` are deleted on rollover.
+
+class DetectionEventLog:
+
+    Methods:
+        append(detection): Add one detection (called from alert_processor_thread for every detection).
+        query(start, end, camera, class_name, min_confidence, limit): Matching rows as numpy columns,
+            e.g. all knife detections on camera 3 between T1 and T2. `limit` keeps the newest rows.
+        count(...): Number of matching rows.
+        hourly_counts(start, end, camera): Per-hour, per-class counts.
+
+Queries skip segments by name (time range, plus the cached `min_time` of later segments), then
+run vectorized numpy masks over the mapped columns, so scanning millions of rows touches only the
+needed pages and takes milliseconds.
+"""
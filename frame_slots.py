@@ -0,0 +1,137 @@
+# frame_slots.py
+import time
+import threading
+
+import numpy as np
+
+
+class FrameSlot:
+    """
+    Latest-frame handoff for one camera: a preallocated double buffer, a sequence number and a
+    timestamp. One writer (the camera thread), any number of readers, no lock.
+    """
+    def __init__(self, start_seq=0):
+        self.buffers = [None, None]
+        self.timestamps = [0.0, 0.0]
+        self.start_seq = start_seq # Nothing published yet while seq == start_seq
+        self.seq = start_seq # Published frame; it lives in buffers[seq % 2]
+        self.writing = start_seq # Frame being written (== seq when idle)
+        self.stats = {"writes": 0, "allocations": 0}
+
+    def begin_write(self, shape, dtype=np.uint8):
+        """ Returns the back buffer to fill; it is not visible to readers until `commit()`. """
+        next_seq = self.seq + 1
+        index = next_seq % 2
+        buffer = self.buffers[index]
+        if buffer is None or buffer.shape != tuple(shape) or buffer.dtype != dtype:
+            buffer = np.empty(shape, dtype=dtype) # Only on the first frames / resolution changes
+            self.buffers[index] = buffer
+            self.stats["allocations"] += 1
+        self.writing = next_seq # Marks the buffer of `seq - 1` as being overwritten
+        return buffer
+
+    def commit(self, timestamp=None):
+        """ Publishes the back buffer (swap). """
+        self.timestamps[self.writing % 2] = time.time() if timestamp is None else timestamp
+        self.seq = self.writing # Single attribute store: readers see the old or the new frame, never half
+        self.stats["writes"] += 1
+
+    def write(self, frame, timestamp=None):
+        """ Copies an externally produced frame into the back buffer and publishes it. """
+        np.copyto(self.begin_write(frame.shape, frame.dtype), frame)
+        self.commit(timestamp)
+
+    def read(self):
+        """
+        (seq, timestamp, read-only view) of the newest frame, or (0, 0.0, None). No copy: the view
+        stays intact until the writer starts the frame after next; check `still_valid(seq)` after
+        using it (or copy it) if that matters.
+        """
+        seq = self.seq
+        if seq == self.start_seq:
+            return 0, 0.0, None
+        index = seq % 2
+        view = self.buffers[index].view()
+        view.flags.writeable = False
+        return seq, self.timestamps[index], view
+
+    def still_valid(self, seq):
+        """ True if the buffer read at `seq` has not started being overwritten. """
+        return self.writing < seq + 2
+
+
+class FrameSlots:
+    """
+    Per-camera FrameSlot map replacing `latest_frames` + the global `frame_lock`. Keeps the dict-like
+    interface (`get`, `[]=`, `pop`, `in`) used by the other frame stores.
+    """
+    def __init__(self):
+        self.slots = {} # { camera_id: FrameSlot }
+        self.last_seq = {} # { camera_id: seq of a popped slot }, so a recreated slot never reuses a seq
+        self.create_lock = threading.Lock() # Only taken when a camera's slot is created or popped
+
+    def slot(self, camera_id):
+        slot = self.slots.get(camera_id)
+        if slot is None:
+            with self.create_lock:
+                slot = self.slots.get(camera_id)
+                if slot is None:
+                    slot = self.slots[camera_id] = FrameSlot(self.last_seq.get(camera_id, 0))
+        return slot
+
+    def read(self, camera_id):
+        slot = self.slots.get(camera_id)
+        return slot.read() if slot is not None else (0, 0.0, None)
+
+    def still_valid(self, camera_id, seq):
+        slot = self.slots.get(camera_id)
+        return slot is not None and slot.still_valid(seq)
+
+    def get(self, camera_id, default=None):
+        frame = self.read(camera_id)[2]
+        return frame if frame is not None else default
+
+    def __setitem__(self, camera_id, frame):
+        self.slot(camera_id).write(frame)
+
+    def __contains__(self, camera_id):
+        return camera_id in self.slots
+
+    def pop(self, camera_id, default=None):
+        with self.create_lock:
+            slot = self.slots.pop(camera_id, None)
+            if slot is not None:
+                # Readers compare seqs (e.g. the broadcaster's encoded_seq); a reopened camera continues
+                # the count instead of restarting at 1 and looking like a frame that was already encoded
+                self.last_seq[camera_id] = max(slot.seq, slot.writing)
+        return slot if slot is not None else default
+
+    def get_stats(self):
+        return {camera_id: dict(slot.stats, seq=slot.seq) for camera_id, slot in list(self.slots.items())}
+
+
+"""
+frame_slots.py
+
+Lock-free latest-frame handoff between camera threads and stream readers.
+
+Before, every camera wrote into the `latest_frames` dict and every stream client read from it under one
+global `frame_lock`, and the stream renderer copied each frame into its own buffer before it was stored.
+
+class FrameSlot:
+
+    Two preallocated buffers per camera. The writer fills the back buffer (`begin_write` -> draw/copy ->
+    `commit`) and publishing is a single attribute store of the sequence number, so readers never need a
+    lock and always see a complete frame. `read()` returns a read-only view (no per-frame copy) with its
+    sequence number and capture timestamp; since the writer only touches that buffer again two frames
+    later, readers that hold on to it longer (e.g. while JPEG-encoding) confirm with `still_valid(seq)`.
+    Readers can also skip work when `seq` hasn't changed.
+
+    CameraProcessor renders stream annotations straight into `begin_write()`'s buffer, so the copy that
+    used to go into the renderer's own buffer is the only one.
+
+class FrameSlots:
+
+    camera_id -> FrameSlot. Also dict-like (`frames[camera_id] = frame` copies into the slot) so code
+    handing over frames it produced elsewhere (edge receiver) works unchanged.
+"""
@@ -4,25 +4,24 @@ import threading
 import queue
 import time
 import json
-import smtplib
-from email.message import EmailMessage
-from flask import Flask, render_template, Response, request, flash, redirect, url_for, jsonify, session
-from flask_sqlalchemy import SQLAlchemy
+from flask import Flask, render_template, Response, request, flash, redirect, url_for, jsonify
 from flask_login import LoginManager, current_user, login_user, logout_user, login_required
 from flask_migrate import Migrate
 import paho.mqtt.client as mqtt
-import cv2 # Still needed for encoding frames for streaming
 
 # Import local modules
 from config import Config
-from models import db, User
+from models import db, User, AlertSubscription, ALERT_CHANNELS
 from forms import LoginForm, RegistrationForm
-from camera_processor import CameraProcessor
-
-from ultralytics import YOLO
-
-# Load the medium model (YOLOv8m)
-# model = YOLO('yolov8m.pt')  
+from camera_registry import CameraRegistry, CameraBusyError, parse_bool
+from camera_supervisor import CameraSupervisor
+from edge_worker import EdgeReceiver
+from profiler import SamplingProfiler, parse_thread_prefixes
+from notifications import SubscriptionIndex, EmailDispatcher, backfill_default_subscriptions
+from user_cache import UserCache, CachedUser
+from streaming import FrameBroadcaster, WAITING_MESSAGE, status_part, select_stream
+from frame_slots import FrameSlots
+from event_log import DetectionEventLog
 
 
 # from dotenv import load_dotenv
@@ -40,12 +39,19 @@ login.login_view = 'login' # Redirect to 'login' view if user not logged in
 
 # Shared data structures (thread-safe access needed)
 alert_queue = queue.Queue(maxsize=100) # Queue for detections from cameras
-latest_frames = {} # Dictionary to hold latest frames {camera_id: frame}
-frame_lock = threading.Lock() # Lock for accessing latest_frames
+latest_frames = FrameSlots() # Per-camera double-buffered latest frame; no global lock
 alert_history = [] # In-memory history of processed alerts
 alert_history_lock = threading.Lock() # Lock for accessing alert_history
-camera_threads = {} # Dictionary to hold camera processor threads {camera_id: thread}
+frame_broadcaster = FrameBroadcaster(latest_frames, fps=Config.STREAM_FPS,
+                                     jpeg_quality=Config.STREAM_JPEG_QUALITY) # One JPEG encode per frame, shared by all viewers
+camera_registry = CameraRegistry(Config, alert_queue, latest_frames, viewer_count=frame_broadcaster.viewers,
+                                 drop_streams=frame_broadcaster.drop) # Cameras + their threads
+frame_broadcaster.health_source = camera_registry.stream_health # Offline frame follows the camera's current thread
 app_shutdown_event = threading.Event() # Event to signal threads to stop
+app_start_time = time.time()
+event_log = DetectionEventLog(Config.EVENT_LOG_DIR, segment_seconds=Config.EVENT_LOG_SEGMENT_SECONDS,
+                              segment_capacity=Config.EVENT_LOG_SEGMENT_CAPACITY,
+                              retention_days=Config.EVENT_LOG_RETENTION_DAYS) if Config.EVENT_LOG_ENABLED else None
 
 # Security mode state (protected by lock)
 is_full_security_mode = False
@@ -55,19 +61,35 @@ mode_lock = threading.Lock()
 last_email_sent_time = {} # { (camera_id, class_name): timestamp }
 email_lock = threading.Lock()
 
-# Currently logged-in user's email for alerts (simple approach, needs lock)
-# WARNING: This assumes only one user's preference matters system-wide.
-# A better system would store preferences per user in the DB.
-alert_recipient_email = None
-recipient_lock = threading.Lock()
+# Per-user alert subscriptions (in-memory index) and batched email delivery
+subscription_index = SubscriptionIndex(app, refresh_interval=Config.SUBSCRIPTION_REFRESH_SECONDS)
+email_dispatcher = EmailDispatcher(Config, batch_seconds=Config.MAIL_BATCH_SECONDS)
 
 # MQTT Client (optional)
 mqtt_client = None
 
+# Worker-process supervisor (only when Config.CAMERA_WORKER_PROCESSES > 0)
+camera_supervisor = None
+
+# Listener for remote edge workers (only when Config.EDGE_LISTEN_PORT is set)
+edge_receiver = None
+
+# On-demand sampling profiler (see /api/profiler/*)
+profiler = SamplingProfiler()
+
 # --- Flask-Login User Loader ---
+def _load_user_snapshot(user_id):
+    return CachedUser.from_model(User.query.get(user_id))
+
+user_cache = UserCache(_load_user_snapshot, max_size=Config.USER_CACHE_MAX_SIZE, ttl=Config.USER_CACHE_TTL_SECONDS)
+user_cache.listen(User) # Invalidate on user update/delete
+
 @login.user_loader
 def load_user(id):
-    return User.query.get(int(id))
+    try:
+        return user_cache.get(int(id)) # Snapshot, not an ORM object: no DB query on a cache hit
+    except ValueError:
+        return None
 
 # --- MQTT Callbacks (If using MQTT) ---
 def setup_mqtt():
@@ -102,67 +124,6 @@ def setup_mqtt():
         print(f"[MQTT] CRITICAL: Error connecting: {e}. MQTT disabled.")
         return None
 
-# --- Email Sending Function ---
-def send_alert_email(alert_data):
-    global alert_recipient_email, recipient_lock
-
-    with recipient_lock:
-        recipient = alert_recipient_email # Get current recipient
-
-    if not Config.MAIL_ENABLED or not recipient:
-        # print("[Email] Disabled or no recipient set.") # Debug
-        return False
-    if not Config.MAIL_USERNAME or not Config.MAIL_PASSWORD:
-        print("[Email] Error: Username or Password not configured.")
-        return False
-
-    print(f"[Email] Attempting to send alert email to {recipient}")
-
-    subject = f"Security Alert: {alert_data['alert_type']} - {alert_data['class']} Detected"
-    body = f"""
-    Security Alert Details:
-    -----------------------
-    Timestamp: {alert_data['timestamp_str']}
-    Camera:    {alert_data['camera_id']}
-    Type:      {alert_data['alert_type']}
-    Class:     {alert_data['class']}
-    Confidence:{alert_data['confidence']:.2f}
-
-    Check the dashboard for more details and snapshot (if available).
-    """
-    # Note: Attaching snapshots would add complexity (reading file, MIME types)
-
-    msg = EmailMessage()
-    msg.set_content(body)
-    msg['Subject'] = subject
-    msg['From'] = Config.MAIL_SENDER
-    msg['To'] = recipient
-
-    try:
-        server = None
-        if Config.MAIL_USE_TLS:
-            server = smtplib.SMTP(Config.MAIL_SERVER, Config.MAIL_PORT)
-            server.starttls()
-        else: # Assuming SSL if not TLS
-             # Use SMTP_SSL for implicit SSL (usually port 465)
-            server = smtplib.SMTP_SSL(Config.MAIL_SERVER, Config.MAIL_PORT)
-
-        server.login(Config.MAIL_USERNAME, Config.MAIL_PASSWORD)
-        server.send_message(msg)
-        server.quit()
-        print(f"[Email] Alert email sent successfully to {recipient}.")
-        return True
-    except smtplib.SMTPAuthenticationError:
-        print("[Email] Error: Authentication failed. Check MAIL_USERNAME/MAIL_PASSWORD (App Password?).")
-    except smtplib.SMTPServerDisconnected:
-        print("[Email] Error: Server disconnected unexpectedly.")
-    except smtplib.SMTPException as e:
-        print(f"[Email] Error sending email: {e}")
-    except Exception as e:
-         print(f"[Email] Unexpected error during email sending: {e}")
-    return False
-
-
 # --- Background Alert Processor Thread ---
 # main.py
 
@@ -176,6 +137,11 @@ def alert_processor_thread():
     while not app_shutdown_event.is_set():
         try:
             detection_data = alert_queue.get(timeout=1.0)
+            if event_log:
+                try:
+                    event_log.append(detection_data) # Every detection, before any throttling
+                except Exception as e:
+                    print(f"[AlertProc] Error appending to event log: {e}")
 
             current_time = detection_data['timestamp']
             cam_id = detection_data['camera_id']
@@ -223,7 +189,8 @@ def alert_processor_thread():
                 "timestamp": current_time,
                 "timestamp_str": timestamp_str,
                 "camera_id": cam_id,
-                "bbox": detection_data["bbox"],
+                "bbox": detection_data["bbox"], # Source-camera pixels
+                "bbox_norm": detection_data.get("bbox_norm"), # Fractions of the source frame size
                 "snapshot_file": snapshot_filename # Use the value from queue
             }
 
@@ -242,18 +209,30 @@ def alert_processor_thread():
                 except Exception as e:
                     print(f"[AlertProc] Error publishing to MQTT: {e}")
 
-            # --- Email Throttling & Sending (remains the same) ---
+            # --- Per-user fan-out (in-memory index, no DB access) ---
+            recipients = subscription_index.recipients(cam_id, det_class, current_time)
+            if recipients and mqtt_client and mqtt_client.is_connected():
+                user_payload = json.dumps({k: v for k, v in alert_data.items() if k != 'timestamp'})
+                for user_id, (_, channels) in recipients.items():
+                    if "mqtt" in channels:
+                        try:
+                            mqtt_client.publish(f"iot/alerts/user/{user_id}", user_payload)
+                        except Exception as e:
+                            print(f"[AlertProc] Error publishing to MQTT for user {user_id}: {e}")
+
+            # --- Email Throttling & Dispatch ---
             send_email_now = False
-            # ... (Email logic) ...
-            with email_lock:
-                last_email_time = last_email_sent_time.get(alert_key, 0)
-                if (current_time - last_email_time) >= Config.MAIL_ALERT_INTERVAL_SECONDS:
-                    send_email_now = True
-                    last_email_sent_time[alert_key] = current_time
+            if Config.MAIL_ENABLED and any("email" in channels for _, channels in recipients.values()):
+                with email_lock:
+                    last_email_time = last_email_sent_time.get(alert_key, 0)
+                    if (current_time - last_email_time) >= Config.MAIL_ALERT_INTERVAL_SECONDS:
+                        send_email_now = True
+                        last_email_sent_time[alert_key] = current_time
 
             if send_email_now:
-                 email_thread = threading.Thread(target=send_alert_email, args=(alert_data,), daemon=True)
-                 email_thread.start()
+                for email, channels in recipients.values():
+                    if "email" in channels:
+                        email_dispatcher.submit(email, alert_data) # Batched and sent by the EmailSender thread
 
             alert_queue.task_done()
 
@@ -280,12 +259,6 @@ def login():
             flash('Invalid email or password')
             return redirect(url_for('login'))
         login_user(user, remember=form.remember_me.data)
-        # --- Store email for alerts (simple approach) ---
-        with recipient_lock:
-            global alert_recipient_email
-            alert_recipient_email = user.email
-            print(f"[Auth] Set alert recipient: {alert_recipient_email}")
-        # ---
         next_page = request.args.get('next')
         if not next_page or urlparse(next_page).netloc != '':
             next_page = url_for('index')
@@ -294,12 +267,6 @@ def login():
 
 @app.route('/logout')
 def logout():
-    # --- Clear alert recipient ---
-    with recipient_lock:
-        global alert_recipient_email
-        print(f"[Auth] Clearing alert recipient: {alert_recipient_email}")
-        alert_recipient_email = None
-    # ---
     logout_user()
     return redirect(url_for('index'))
 
@@ -312,16 +279,12 @@ def register():
         user = User(email=form.email.data)
         user.set_password(form.password.data)
         db.session.add(user)
+        # New users get email alerts for everything; narrow it down via /api/subscriptions
+        db.session.add(AlertSubscription(user=user, channels="email"))
         db.session.commit()
         flash('Congratulations, you are now a registered user!')
         # Log user in immediately after registration
         login_user(user)
-        # --- Store email for alerts ---
-        with recipient_lock:
-            global alert_recipient_email
-            alert_recipient_email = user.email
-            print(f"[Auth] Set alert recipient: {alert_recipient_email}")
-        # ---
         return redirect(url_for('index'))
     return render_template('register.html', title='Register', form=form)
 
@@ -331,67 +294,47 @@ def register():
 def index():
     """ Serves the main dashboard page. """
     # Pass camera IDs to the template for generating video feed URLs/elements
-    camera_ids = list(Config.CAMERA_SOURCES) # Or use keys if CAMERA_SOURCES is a dict
+    camera_ids = camera_registry.ids()
     return render_template('index.html', camera_ids=camera_ids)
 
 @app.route('/video_feed/<camera_id>')
 @login_required
 def video_feed(camera_id):
     """ Streams the processed video feed for a specific camera. """
-    # Convert camera_id from URL string if necessary (e.g., if it's an index)
-    try:
-        # Attempt to find the camera_id as configured (could be int or str)
-        # This logic might need adjustment based on how CAMERA_SOURCES stores IDs
-        req_cam_id = camera_id
-        found = False
-        for idx, source in enumerate(Config.CAMERA_SOURCES):
-             current_cam_id = idx # Assuming simple index for now
-             if str(current_cam_id) == str(req_cam_id):
-                 req_cam_id = current_cam_id
-                 found = True
-                 break
-        if not found:
-             print(f"Warning: Requested camera_id '{camera_id}' not found in configured sources.")
-             # Return a placeholder image or 404?
-             return "Camera not found", 404
-
-    except ValueError:
-        return "Invalid camera ID format", 400
-
-    return Response(generate_frames(req_cam_id), mimetype='multipart/x-mixed-replace; boundary=frame')
-
-def generate_frames(camera_id):
+    entry = camera_registry.get(camera_id) # O(1) lookup
+    if entry is None:
+        print(f"Warning: Requested camera_id '{camera_id}' not found in camera registry.")
+        return "Camera not found", 404
+
+    # ?quality=full: full-resolution main stream of a dual-stream camera (detection stream otherwise)
+    stream_key = select_stream(entry.camera_id, entry.processor, request.args.get('quality'))
+    # Authenticated once above; release this thread's DB session so the stream doesn't hold it
+    db.session.remove()
+    return Response(generate_frames(stream_key), mimetype='multipart/x-mixed-replace; boundary=frame')
+
+def generate_frames(stream_key):
     """ Generator function to yield annotated frames for a specific camera stream. """
-    global latest_frames, frame_lock
-    while True:
-        frame_to_yield = None
-        with frame_lock:
-            frame_to_yield = latest_frames.get(camera_id) # Get frame for specific camera
-
-        if frame_to_yield is None:
-            # If no frame ready, send placeholder or wait? Sending wait message for now.
-            # Placeholder could be a static image: cv2.imread('static/loading.jpg')
-            placeholder = b"Waiting for camera feed..."
-            yield (b'--frame\r\n'
-                   b'Content-Type: text/plain\r\n\r\n' + placeholder + b'\r\n')
-            time.sleep(0.5) # Wait before checking again
+    # Each stream runs in its own request thread; name it so the profiler can attribute it
+    name = stream_key if not isinstance(stream_key, tuple) else "-".join(map(str, stream_key))
+    threading.current_thread().name = f"Stream-{name}"
+    # Count the viewer; the camera (or main stream) polls the count and only renders stream frames while watched
+    frame_broadcaster.subscribe(stream_key)
+    try:
+        yield from _stream_frames(stream_key)
+    finally:
+        frame_broadcaster.unsubscribe(stream_key) # Runs when the client disconnects (generator closed)
+
+def _stream_frames(camera_id):
+    version = None
+    while not app_shutdown_event.is_set() and frame_broadcaster.is_watched(camera_id): # Ends when the camera is removed
+        current = frame_broadcaster.wait_for(camera_id, version, timeout=0.5)
+        if current is None:
+            if version is None:
+                yield status_part(WAITING_MESSAGE) # No frame yet: cached "waiting" image
             continue
-
-        try:
-            ret, buffer = cv2.imencode('.jpg', frame_to_yield, [int(cv2.IMWRITE_JPEG_QUALITY), 80])
-            if not ret:
-                print(f"Error encoding frame for stream (Cam {camera_id})")
-                time.sleep(0.1)
-                continue
-            frame_bytes = buffer.tobytes()
-            yield (b'--frame\r\n'
-                   b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
-        except Exception as e:
-            print(f"Error in generate_frames (Cam {camera_id}): {e}")
-            time.sleep(0.5)
-
-        # Control the streaming rate (adjust as needed)
-        time.sleep(0.03)
+        # Always the newest pre-encoded frame; a slow client skips frames rather than queueing them
+        version, chunk = current
+        yield chunk
 
 
 @app.route('/api/alerts')
@@ -426,6 +369,246 @@ def security_mode_api(): # Renamed to avoid conflict with variable
             current_mode = is_full_security_mode
         return jsonify({"status": "success", "mode_enabled": current_mode})
 
+# --- Camera Management API ---
+@app.route('/api/cameras', methods=['GET', 'POST'])
+@login_required
+def cameras_api():
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        if data.get('source') in (None, ''):
+            return jsonify({"status": "error", "message": "Missing 'source' field"}), 400
+        try:
+            entry = camera_registry.add(data['source'], settings=data.get('settings'), camera_id=data.get('id'),
+                                        paused=parse_bool(data.get('paused', False), "paused"))
+        except (ValueError, TypeError) as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
+        except CameraBusyError as e:
+            return jsonify({"status": "error", "message": str(e)}), 409
+        except Exception as e:
+            print(f"Error adding camera via API: {e}")
+            return jsonify({"status": "error", "message": "Failed to start camera"}), 500
+        return jsonify({"status": "success", "camera": entry.to_dict()}), 201
+    return jsonify({"status": "success", "cameras": camera_registry.list()})
+
+@app.route('/api/cameras/<camera_id>', methods=['GET', 'PATCH', 'DELETE'])
+@login_required
+def camera_api(camera_id):
+    if request.method == 'DELETE':
+        entry = camera_registry.remove(camera_id)
+    elif request.method == 'PATCH':
+        data = request.get_json(silent=True) or {}
+        try:
+            entry = camera_registry.reconfigure(camera_id, source=data.get('source'), settings=data.get('settings'))
+        except (ValueError, TypeError) as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
+        except CameraBusyError as e:
+            return jsonify({"status": "error", "message": str(e)}), 409
+    else:
+        entry = camera_registry.get(camera_id)
+    if entry is None:
+        return jsonify({"status": "error", "message": "Camera not found"}), 404
+    return jsonify({"status": "success", "camera": entry.to_dict()})
+
+@app.route('/api/cameras/<camera_id>/pause', methods=['POST'])
+@login_required
+def camera_pause_api(camera_id):
+    try:
+        entry = camera_registry.pause(camera_id)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    if entry is None:
+        return jsonify({"status": "error", "message": "Camera not found"}), 404
+    return jsonify({"status": "success", "camera": entry.to_dict()})
+
+@app.route('/api/cameras/<camera_id>/resume', methods=['POST'])
+@login_required
+def camera_resume_api(camera_id):
+    try:
+        entry = camera_registry.resume(camera_id)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    except CameraBusyError as e:
+        return jsonify({"status": "error", "message": str(e)}), 409
+    if entry is None:
+        return jsonify({"status": "error", "message": "Camera not found"}), 404
+    return jsonify({"status": "success", "camera": entry.to_dict()})
+
+@app.route('/api/detector/stats')
+@login_required
+def detector_stats_api():
+    """ Cascade stage counters and hit rates of the shared detector. """
+    if camera_registry.detector is None:
+        return jsonify({"status": "error", "message": "Detector not loaded"}), 404
+    return jsonify({"status": "success", "stats": camera_registry.detector.get_stats()})
+
+# --- Alert Subscription API (per user) ---
+def _parse_minutes(value):
+    """ "HH:MM" -> minutes after midnight (None passes through). """
+    if value in (None, ""):
+        return None
+    hours, minutes = (int(part) for part in str(value).split(":"))
+    if not (0 <= hours < 24 and 0 <= minutes < 60):
+        raise ValueError(f"Invalid time: {value}")
+    return hours * 60 + minutes
+
+def _apply_subscription_fields(subscription, data):
+    """ Validates and copies request fields onto a subscription. Raises ValueError on bad input. """
+    if 'camera_id' in data:
+        subscription.camera_id = None if data['camera_id'] in (None, "", "*") else str(data['camera_id'])
+    if 'class' in data:
+        subscription.class_name = None if data['class'] in (None, "", "*") else str(data['class'])
+    if 'channels' in data:
+        channels = data['channels'] if isinstance(data['channels'], list) else str(data['channels']).split(",")
+        channels = [c.strip() for c in channels if c.strip()]
+        unknown = set(channels) - set(ALERT_CHANNELS)
+        if not channels or unknown:
+            raise ValueError(f"channels must be a non-empty subset of {list(ALERT_CHANNELS)}")
+        subscription.channels = ",".join(dict.fromkeys(channels))
+    if 'quiet_start' in data or 'quiet_end' in data:
+        subscription.quiet_start = _parse_minutes(data.get('quiet_start'))
+        subscription.quiet_end = _parse_minutes(data.get('quiet_end'))
+        if (subscription.quiet_start is None) != (subscription.quiet_end is None):
+            raise ValueError("quiet_start and quiet_end must be given together")
+    if 'enabled' in data:
+        subscription.enabled = bool(data['enabled'])
+
+@app.route('/api/subscriptions', methods=['GET'])
+@login_required
+def subscriptions_list_api():
+    subscriptions = AlertSubscription.query.filter_by(user_id=current_user.id).order_by(AlertSubscription.id).all()
+    return jsonify({"status": "success", "subscriptions": [s.to_dict() for s in subscriptions]})
+
+@app.route('/api/subscriptions', methods=['POST'])
+@login_required
+def subscriptions_add_api():
+    """ Body: {"camera_id": "3"|null, "class": "knife"|null, "channels": ["email"], "quiet_start": "22:00", "quiet_end": "07:00"} """
+    subscription = AlertSubscription(user_id=current_user.id, channels="email")
+    try:
+        _apply_subscription_fields(subscription, request.get_json(silent=True) or {})
+    except (TypeError, ValueError) as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    db.session.add(subscription)
+    db.session.commit() # Commit hook refreshes the in-memory index
+    return jsonify({"status": "success", "subscription": subscription.to_dict()}), 201
+
+@app.route('/api/subscriptions/<int:subscription_id>', methods=['PATCH', 'DELETE'])
+@login_required
+def subscription_api(subscription_id):
+    subscription = AlertSubscription.query.filter_by(id=subscription_id, user_id=current_user.id).first()
+    if subscription is None:
+        return jsonify({"status": "error", "message": "Subscription not found"}), 404
+    if request.method == 'DELETE':
+        db.session.delete(subscription)
+        db.session.commit()
+        return jsonify({"status": "success"})
+    try:
+        _apply_subscription_fields(subscription, request.get_json(silent=True) or {})
+    except (TypeError, ValueError) as e:
+        db.session.rollback()
+        return jsonify({"status": "error", "message": str(e)}), 400
+    db.session.commit()
+    return jsonify({"status": "success", "subscription": subscription.to_dict()})
+
+# --- Detection Event Log API ---
+def _time_range_args():
+    """ start/end query args (Unix seconds); defaults to the last 24 hours. """
+    end = request.args.get('end', type=float) or time.time()
+    start = request.args.get('start', type=float)
+    return (end - 86400 if start is None else start), end
+
+@app.route('/api/events')
+@login_required
+def events_api():
+    """ Raw detections, e.g. /api/events?camera=3&class=knife&start=T1&end=T2 """
+    if event_log is None:
+        return jsonify({"status": "error", "message": "Event log disabled"}), 404
+    start, end = _time_range_args()
+    limit = min(request.args.get('limit', 1000, type=int), Config.EVENT_LOG_MAX_QUERY_ROWS)
+    rows = event_log.query(start, end, camera=request.args.get('camera'), class_name=request.args.get('class'),
+                           min_confidence=request.args.get('min_confidence', type=float), limit=limit)
+    events = [
+        {"timestamp": ts, "camera_id": cam, "class": cls, "confidence": round(conf, 4), "bbox_norm": [round(v, 4) for v in bbox]}
+        for ts, cam, cls, conf, bbox in zip(rows["timestamp"].tolist(), rows["camera_id"].tolist(), rows["class"].tolist(),
+                                            rows["confidence"].tolist(), rows["bbox"].tolist())
+    ]
+    return jsonify({"status": "success", "count": len(events), "events": events})
+
+@app.route('/api/events/hourly')
+@login_required
+def events_hourly_api():
+    """ Per-hour detection counts by class, optionally for one camera. """
+    if event_log is None:
+        return jsonify({"status": "error", "message": "Event log disabled"}), 404
+    start, end = _time_range_args()
+    counts = event_log.hourly_counts(start, end, camera=request.args.get('camera'),
+                                     min_confidence=request.args.get('min_confidence', type=float))
+    return jsonify({"status": "success", "hours": [{"hour": hour, "counts": by_class} for hour, by_class in counts.items()]})
+
+# --- Health Probes (no login: used by load balancers / orchestrators) ---
+READY_STATES = ("connecting", "streaming") # Model loaded and warmed up
+
+def camera_states():
+    return {str(entry["id"]): entry["state"] for entry in camera_registry.list()}
+
+@app.route('/healthz')
+def healthz():
+    """ Liveness: the web tier is up. Reports per-camera pipeline state and source connection health. """
+    entries = camera_registry.list()
+    return jsonify({"status": "ok", "uptime": round(time.time() - app_start_time, 1),
+                    "cameras": {str(entry["id"]): entry["state"] for entry in entries},
+                    "camera_health": {str(entry["id"]): entry["health"] for entry in entries if entry["health"]}})
+
+@app.route('/readyz')
+def readyz():
+    """ Readiness: 200 once every active camera has its model loaded and warmed up. """
+    states = camera_states()
+    active = [state for state in states.values() if state not in ("paused", "stopped")]
+    ready = all(state in READY_STATES for state in active)
+    return jsonify({"status": "ready" if ready else "not_ready", "cameras": states}), (200 if ready else 503)
+
+# --- Profiling API ---
+@app.route('/api/profiler/start', methods=['POST'])
+@login_required
+def profiler_start():
+    """ Starts a sampling profiler session over the camera/alert/stream threads. """
+    data = request.get_json(silent=True) or {}
+    try:
+        duration = float(data.get('duration', 30))
+        interval_ms = float(data.get('interval_ms', Config.PROFILER_DEFAULT_INTERVAL_MS))
+    except (TypeError, ValueError):
+        return jsonify({"status": "error", "message": "Invalid duration or interval_ms"}), 400
+    if not (0 < duration <= Config.PROFILER_MAX_DURATION_SECONDS) or interval_ms < 1:
+        return jsonify({"status": "error",
+                        "message": f"duration must be in (0, {Config.PROFILER_MAX_DURATION_SECONDS}] and interval_ms >= 1"}), 400
+    try:
+        threads = parse_thread_prefixes(data.get('threads'))
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    if not profiler.start(duration, interval_ms / 1000.0, threads):
+        return jsonify({"status": "error", "message": "A profiling session is already running"}), 409
+    print(f"[Profiler] Session started by {current_user.email}")
+    return jsonify({"status": "success", "profiler": profiler.status()})
+
+@app.route('/api/profiler/stop', methods=['POST'])
+@login_required
+def profiler_stop():
+    """ Ends the running session early and returns its collapsed stacks. """
+    profiler.stop()
+    return profiler_result()
+
+@app.route('/api/profiler')
+@login_required
+def profiler_status():
+    return jsonify({"status": "success", "profiler": profiler.status()})
+
+@app.route('/api/profiler/result')
+@login_required
+def profiler_result():
+    """ Returns the last session as a collapsed-stack file (flamegraph.pl / speedscope). """
+    filename = f"sentryvision_{time.strftime('%Y%m%d_%H%M%S', time.localtime(profiler.started_at or time.time()))}.collapsed"
+    return Response(profiler.collapsed(), mimetype='text/plain',
+                    headers={"Content-Disposition": f"attachment; filename={filename}"})
+
 # --- Utility for Redirects (needed by Flask-Login) ---
 from urllib.parse import urlparse, urljoin
 def is_safe_url(target):
@@ -441,34 +624,18 @@ def start_camera_processors():
         return
 
     print("Starting camera processor threads...")
-    for i, source in enumerate(Config.CAMERA_SOURCES):
-        camera_id = i # Using index as ID for simplicity
-        print(f"  - Creating thread for Camera {camera_id} (Source: {source})")
-        thread = CameraProcessor(
-            camera_id=camera_id,
-            camera_source=source,
-            config=Config,
-            alert_queue=alert_queue,
-            frame_dict=latest_frames,
-            frame_lock=frame_lock
-        )
-        camera_threads[camera_id] = thread
-        thread.start()
-    print(f"Started {len(camera_threads)} camera threads.")
+    for source in Config.CAMERA_SOURCES:
+        try:
+            camera_registry.add(source) # IDs 0..n-1 for the configured sources, as before
+        except Exception as e:
+            print(f"  - Error starting camera (Source: {source}): {e}")
+    print(f"Started {len(camera_registry.ids())} camera threads.")
 
 def stop_camera_processors():
     print("Stopping camera processor threads...")
-    for cam_id, thread in camera_threads.items():
-        if thread.is_alive():
-            print(f"  - Stopping thread for Camera {cam_id}...")
-            thread.stop() # Signal the thread's loop to exit
-
-    # Wait briefly for threads to finish cleanup
-    for cam_id, thread in camera_threads.items():
-         if thread.is_alive():
-              thread.join(timeout=5.0) # Wait max 5 seconds per thread
-              if thread.is_alive():
-                   print(f"  - Warning: Thread for Camera {cam_id} did not stop gracefully.")
+    camera_registry.stop_all()
+    if camera_supervisor:
+        camera_supervisor.stop()
     print("Camera processor threads stopped.")
 
 def shutdown_app():
@@ -483,8 +650,24 @@ def shutdown_app():
             mqtt_client.disconnect()
         print("MQTT client stopped.")
 
+    # Stop accepting edge workers
+    if edge_receiver:
+        edge_receiver.stop()
+
+    # Stop profiler if a session is running
+    profiler.stop()
+
+    # Stop subscription refresh and email delivery
+    subscription_index.stop()
+    email_dispatcher.stop()
+
     # Stop camera processors
     stop_camera_processors()
+    frame_broadcaster.stop()
+
+    # Persist the event log's row counts
+    if event_log:
+        event_log.close()
 
     # Wait for alert processor
     # (It checks app_shutdown_event, let it finish naturally or join it)
@@ -502,20 +685,45 @@ if __name__ == "__main__":
 
     # Create database tables if they don't exist
     with app.app_context():
+        # Upgrading from a version without subscriptions: the table is about to be created
+        new_subscription_table = not db.inspect(db.engine).has_table(AlertSubscription.__tablename__)
         db.create_all()
         print("Database tables checked/created.")
+        if new_subscription_table:
+            added = backfill_default_subscriptions()
+            print(f"[Subscriptions] Gave {added} existing user(s) the default email subscription.")
+
+    # Load alert subscriptions and start email delivery
+    subscription_index.start()
+    email_dispatcher.start()
 
     # Setup MQTT
     mqtt_client = setup_mqtt()
 
     # Start background alert processor thread
-    alert_thread = threading.Thread(target=alert_processor_thread, daemon=True)
+    alert_thread = threading.Thread(target=alert_processor_thread, name="AlertProcessor", daemon=True)
     alert_thread.start()
 
+    # Shard cameras across worker processes if configured
+    if Config.CAMERA_WORKER_PROCESSES > 0:
+        camera_supervisor = CameraSupervisor(Config, Config.CAMERA_WORKER_PROCESSES, alert_queue)
+        camera_supervisor.start()
+        camera_registry.use_supervisor(camera_supervisor)
+        latest_frames = camera_supervisor.frames # Streams now read frames from shared memory
+        frame_broadcaster.frame_dict = latest_frames
+
     # Start camera processing threads
     start_camera_processors()
 
-    print(f"Starting Flask server on http://{Config.FLASK_HOST}:{Config.FLASK_PORT}")
+    # Accept frames/detections from edge workers
+    if Config.EDGE_LISTEN_PORT:
+        edge_receiver = EdgeReceiver(Config.EDGE_LISTEN_HOST, Config.EDGE_LISTEN_PORT,
+                                     alert_queue, latest_frames, camera_registry)
+        edge_receiver.start()
+
+    frame_broadcaster.start()
+
+    print(f"Starting Flask server on http://{Config.FLASK_HOST}:{Config.FLASK_PORT} (mode: {Config.SERVER_MODE})")
 
     # Register shutdown handler
     import atexit
@@ -523,7 +731,18 @@ if __name__ == "__main__":
 
     try:
         # Run Flask app (disable reloader in production or when managing threads manually)
-        app.run(host=Config.FLASK_HOST, port=Config.FLASK_PORT, threaded=True, use_reloader=False, debug=False)
+        use_async = Config.SERVER_MODE == "async"
+        if use_async:
+            # One event loop streams MJPEG to all viewers; other routes still run through Flask
+            from async_server import serve, ASYNC_AVAILABLE
+            if not ASYNC_AVAILABLE:
+                print("Warning: SERVER_MODE=async needs uvicorn and asgiref (pip install -r requirements-async.txt). "
+                      "Falling back to the threaded server.")
+                use_async = False
+        if use_async:
+            serve(app, frame_broadcaster, camera_registry, Config.FLASK_HOST, Config.FLASK_PORT)
+        else:
+            app.run(host=Config.FLASK_HOST, port=Config.FLASK_PORT, threaded=True, use_reloader=False, debug=False)
     except KeyboardInterrupt:
          print("\nCtrl+C received. Initiating shutdown...")
          # atexit handler will call shutdown_app()
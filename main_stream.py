@@ -0,0 +1,219 @@
+# main_stream.py
+import time
+import threading
+
+from camera_health import Backoff, TimedCapture, CameraHealth
+
+
+def split_source(source):
+    """
+    Camera sources are either a single source (used for everything, as before) or a dict
+    {"detect": substream, "main": main stream}. Returns (detect_source, main_source or None).
+    """
+    if isinstance(source, dict):
+        detect, main = source.get("detect"), source.get("main")
+        if detect is None:
+            detect, main = main, None
+        return detect, (main if main != detect else None)
+    return source, None
+
+
+def scale_detections(detections, width, height):
+    """ Copies of `detections` with "bbox" mapped from "bbox_norm" onto a width x height frame. """
+    scaled = []
+    for detection in detections:
+        norm = detection.get("bbox_norm")
+        if norm is None:
+            continue
+        x0, y0, x1, y1 = norm
+        scaled.append(dict(detection, bbox=[x0 * width, y0 * height, x1 * width, y1 * height]))
+    return scaled
+
+
+class MainStream:
+    """
+    High-resolution stream of a dual-stream camera, opened only while something needs it
+    (full-quality viewers, snapshots) and released after `idle_timeout` seconds without use.
+    """
+    def __init__(self, camera_id, source, capture_factory, frame_slots=None, renderer=None,
+                 idle_timeout=30.0, open_timeout=10.0, read_timeout=5.0, backoff=None, viewer_count=None):
+        self.camera_id = camera_id
+        self.source = source
+        self.capture_factory = capture_factory
+        self.frame_slots = frame_slots # Annotated frames for full-quality viewers go to slot `stream_key`
+        self.renderer = renderer
+        self.idle_timeout = idle_timeout
+        self.open_timeout = open_timeout
+        self.read_timeout = read_timeout
+        self.backoff = backoff or Backoff(base=1.0, maximum=60.0)
+        self.stream_key = (camera_id, "main")
+        self.lock = threading.Lock()
+        self.thread = None
+        self.exiting = False # Current thread decided to stop; the next touch() starts a new one
+        self.viewer_count = viewer_count or (lambda stream_key: 0) # FrameBroadcaster.viewers
+        self.last_used = 0.0
+        self.retry_at = 0.0 # No reconnect attempts before this (after a failure, see `_retry_later`)
+        self.closed = False
+        self.latest = None # (timestamp, frame) of the newest decoded frame; cap.read() allocates, so never mutated
+        self.detections = [] # Latest detections from the substream (bbox_norm is used)
+        self.state = "idle" # idle / opening / streaming / failed
+        self.health = CameraHealth(stall_timeout=read_timeout, capture_name=f"Capture-{camera_id}-main") # Offline frame for full-quality viewers, /healthz
+        self.health.released() # Not opened yet
+        self.stats = {"opens": 0, "open_failures": 0, "frames": 0}
+
+    # --- Demand ---
+    def touch(self):
+        """ Marks the stream as needed; opens it in the background if it isn't running. """
+        with self.lock:
+            self.last_used = time.time()
+            running = self.thread is not None and self.thread.is_alive() and not self.exiting
+            if self.closed or running or time.time() < self.retry_at:
+                return
+            self.exiting = False
+            self.thread = threading.Thread(target=self._run, name=f"MainStream-{self.camera_id}", daemon=True)
+            self.thread.start()
+
+    @property
+    def viewers(self):
+        """ Open full-quality streams (counted by the broadcaster under `stream_key`). """
+        return self.viewer_count(self.stream_key)
+
+    def set_detections(self, detections):
+        self.detections = detections
+
+    def latest_frame(self, max_age=1.0):
+        """ The newest full-resolution frame if one is fresher than `max_age`, else None (and the stream is opened). """
+        self.touch()
+        latest = self.latest
+        if latest is None or time.time() - latest[0] > max_age:
+            return None
+        return latest[1]
+
+    def close(self):
+        self.closed = True
+
+    # --- Capture thread ---
+    def _retry_later(self, reason, stalled=False):
+        delay = self.backoff.next_delay(self.health.connected_for())
+        self.retry_at = time.time() + delay
+        self.latest = None # Never hand a snapshot a frame from the dead connection
+        self.health.failed(reason, delay, stalled=stalled)
+        print(f"[Cam {self.camera_id}] Main stream: {reason}; retrying in {delay:.1f}s"
+              f"{' (viewers waiting)' if self.viewers > 0 else ' on demand'}.")
+
+    def _wait_for_retry(self):
+        """ While full-quality viewers are connected, waits out the backoff and returns True (retry now).
+        Returns False (thread exits, the next touch() retries) once nobody is watching or on close. """
+        while not self.closed:
+            with self.lock:
+                if self.viewers == 0:
+                    self.exiting = True # Decided under the lock, so a concurrent touch() starts a fresh thread
+                    return False
+            remaining = self.retry_at - time.time()
+            if remaining <= 0:
+                return True
+            time.sleep(min(remaining, 0.5))
+        return False
+
+    def _idle(self):
+        with self.lock:
+            if self.viewers > 0:
+                self.last_used = time.time() # Idle timeout starts when the last viewer leaves
+            elif time.time() - self.last_used > self.idle_timeout:
+                self.exiting = True # Decided under the lock, so a concurrent touch() starts a fresh thread
+            return self.exiting
+
+    def _run(self):
+        try:
+            # Reconnect in place while viewers wait for a picture; without viewers a failure ends the thread
+            while not self.closed and not self._stream() and self._wait_for_retry():
+                pass
+        finally:
+            with self.lock:
+                self.exiting = True
+                current = self.thread is threading.current_thread() # False if touch() already replaced us
+            if current:
+                self.latest = None
+                if self.frame_slots is not None:
+                    self.frame_slots.pop(self.stream_key, None)
+                if self.state != "failed":
+                    self.state = "idle"
+                    self.health.released()
+            print(f"[Cam {self.camera_id}] Main stream released.")
+
+    def _stream(self):
+        """ One connection: open, then decode until idle/closed (True) or until it fails (False). """
+        self.state = "opening"
+        self.health.reconnecting()
+        cap = None
+        connected = False
+        try:
+            # Timed open/read: a hung main stream never pins this thread (or blocks the next touch())
+            cap = TimedCapture(self.capture_factory, self.source, self.open_timeout, self.read_timeout,
+                               name=f"Capture-{self.camera_id}-main")
+            if not cap.open():
+                self.stats["open_failures"] += 1
+                self.state = "failed"
+                self._retry_later("could not be opened")
+                return False
+            connected = True
+            self.stats["opens"] += 1
+            self.state = "streaming"
+            self.health.connected()
+            print(f"[Cam {self.camera_id}] Main stream opened.")
+            while not self.closed and not self._idle():
+                ret, frame = cap.read()
+                if not ret or frame is None:
+                    self.state = "failed"
+                    self._retry_later("read failed")
+                    return False
+                timestamp = time.time()
+                self.latest = (timestamp, frame)
+                self.health.frame(timestamp)
+                self.stats["frames"] += 1
+                if self.viewers > 0 and self.frame_slots is not None and self.renderer is not None:
+                    detections = scale_detections(self.detections, frame.shape[1], frame.shape[0])
+                    slot = self.frame_slots.slot(self.stream_key)
+                    self.renderer.render(frame, detections, out=slot.begin_write(frame.shape, frame.dtype))
+                    slot.commit(timestamp)
+            return True
+        except Exception as e: # Includes TimeoutError from a hung open/read
+            if not connected:
+                self.stats["open_failures"] += 1
+            self.state = "failed"
+            self._retry_later(f"error: {e}", stalled=connected and isinstance(e, TimeoutError))
+            return False
+        finally:
+            if cap is not None:
+                try: cap.release()
+                except Exception: pass
+
+
+"""
+main_stream.py
+
+Dual-stream cameras.
+
+Most IP cameras offer a low-resolution substream next to the full-resolution main stream. A camera
+source may therefore be a dict:
+
+    {"detect": "rtsp://cam/sub", "main": "rtsp://cam/main"}
+
+CameraProcessor decodes only the "detect" substream continuously (inference, the default stream
+shown on the dashboard). The main stream is wrapped in a MainStream and only decoded on demand:
+
+    - full-resolution viewers: /video_feed/<id>?quality=full (FrameBroadcaster counts them as viewers;
+      frames are annotated with the substream detections scaled via "bbox_norm")
+    - snapshots: `latest_frame(max_age)` returns a fresh full-resolution frame, or None while the
+      stream is still opening (the snapshot then falls back to the substream frame)
+
+After `idle_timeout` seconds (`Config.MAIN_STREAM_IDLE_SECONDS`) without viewers or requests the
+connection is released. Opens and reads are timed (camera_health.TimedCapture). A failed connection
+is retried after a jittered exponential backoff: in place while full-quality viewers are connected,
+otherwise on the next demand. `health` (CameraHealth) tracks the connection, so viewers get the
+"Camera offline" frame during an outage, and /healthz can report it. A plain (non-dict) source
+behaves exactly as before.
+
+split_source(source): (detect_source, main_source or None).
+scale_detections(detections, w, h): Detections with "bbox" recomputed for another resolution.
+"""
@@ -21,6 +21,40 @@ class User(UserMixin, db.Model):
     def __repr__(self):
         return f'<User {self.email}>'
 
+ALERT_CHANNELS = ("email", "mqtt")
+
+class AlertSubscription(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), index=True, nullable=False)
+    camera_id = db.Column(db.String(64)) # None = all cameras
+    class_name = db.Column(db.String(64)) # None = all alerting classes
+    channels = db.Column(db.String(64), nullable=False, default="email") # Comma-separated ALERT_CHANNELS
+    quiet_start = db.Column(db.Integer) # Minutes after local midnight; None = no quiet hours
+    quiet_end = db.Column(db.Integer) # May be < quiet_start (quiet hours spanning midnight)
+    enabled = db.Column(db.Boolean, nullable=False, default=True)
+    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+
+    user = db.relationship('User', backref=db.backref('subscriptions', cascade='all, delete-orphan', lazy='dynamic'))
+
+    def channel_list(self):
+        return [c for c in (self.channels or "").split(",") if c]
+
+    def to_dict(self):
+        def hhmm(minutes):
+            return None if minutes is None else f"{minutes // 60:02d}:{minutes % 60:02d}"
+        return {
+            "id": self.id,
+            "camera_id": self.camera_id,
+            "class": self.class_name,
+            "channels": self.channel_list(),
+            "quiet_start": hhmm(self.quiet_start),
+            "quiet_end": hhmm(self.quiet_end),
+            "enabled": self.enabled,
+        }
+
+    def __repr__(self):
+        return f'<AlertSubscription user={self.user_id} camera={self.camera_id} class={self.class_name}>'
+
 # You might add an Alert model later if you want to persist alerts in the DB
 # class Alert(db.Model):
 #     id = db.Column(db.Integer, primary_key=True)
@@ -48,7 +82,12 @@ Models:
     - Includes methods to securely set and verify passwords.
     - Inherits from UserMixin to support Flask-Login functionality.
 
-2. Alert (Optional, currently commented out):
+2. AlertSubscription:
+    - Which alerts a user receives: camera (or all), class (or all), channels ("email", "mqtt")
+      and optional quiet hours (minutes after local midnight, may wrap past midnight).
+    - Loaded into an in-memory index by `notifications.SubscriptionIndex`; the alert path never queries it.
+
+3. Alert (Optional, currently commented out):
     - Represents a security alert (e.g., motion or threat detection).
     - Can be used to persist alerts in the database for logging and analytics.
     - Fields include timestamp, alert type, detected object class, confidence, camera ID, and snapshot file.
@@ -0,0 +1,279 @@
+# notifications.py
+import time
+import queue
+import smtplib
+import threading
+from collections import namedtuple
+from email.message import EmailMessage
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from models import db, User, AlertSubscription
+
+# One subscription, flattened for the alert path (no ORM objects leave the refresher thread)
+Recipient = namedtuple("Recipient", ["user_id", "email", "channels", "quiet_start", "quiet_end"])
+
+
+def in_quiet_hours(recipient, minute_of_day):
+    start, end = recipient.quiet_start, recipient.quiet_end
+    if start is None or end is None or start == end:
+        return False
+    if start < end:
+        return start <= minute_of_day < end
+    return minute_of_day >= start or minute_of_day < end # Wraps past midnight
+
+
+def backfill_default_subscriptions():
+    """
+    Gives every user without a subscription the catch-all email subscription /register creates.
+    Run once, when the subscription table is first created, so existing users keep getting alert
+    emails after an upgrade (users who later delete all their subscriptions stay unsubscribed).
+    """
+    has_subscription = db.session.query(AlertSubscription.id).filter(AlertSubscription.user_id == User.id).exists()
+    users = User.query.filter(~has_subscription).all()
+    for user in users:
+        db.session.add(AlertSubscription(user_id=user.id, channels="email"))
+    db.session.commit()
+    return len(users)
+
+
+class SubscriptionIndex:
+    """
+    In-memory index of enabled subscriptions keyed by (camera_id, class), with None as the
+    wildcard. Rebuilt by a background thread whenever a subscription (or user) change is committed.
+    """
+    def __init__(self, app, refresh_interval=300.0):
+        self.app = app
+        self.refresh_interval = refresh_interval # Full reload as a safety net (e.g. edits from another process)
+        self.by_key = {} # Replaced wholesale on refresh, so readers need no lock
+        self.changed = threading.Event()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.loaded_at = None
+        self._listen()
+
+    # --- Change tracking ---
+    def _listen(self):
+        def mark(mapper, connection, target):
+            session = object_session(target)
+            if session is not None:
+                session.info["subscriptions_changed"] = True
+
+        for model in (AlertSubscription, User):
+            for name in ("after_insert", "after_update", "after_delete"):
+                event.listen(model, name, mark)
+
+        def after_commit(session):
+            if session.info.pop("subscriptions_changed", False):
+                self.changed.set()
+
+        def after_rollback(session):
+            session.info.pop("subscriptions_changed", None)
+
+        event.listen(Session, "after_commit", after_commit)
+        event.listen(Session, "after_soft_rollback", lambda session, previous: after_rollback(session))
+
+    # --- Loading ---
+    def refresh(self):
+        with self.app.app_context():
+            try:
+                rows = (db.session.query(AlertSubscription, User.email)
+                        .join(User, AlertSubscription.user_id == User.id)
+                        .filter(AlertSubscription.enabled.is_(True))
+                        .all())
+                by_key = {}
+                for subscription, email in rows:
+                    key = (subscription.camera_id, subscription.class_name)
+                    by_key.setdefault(key, []).append(Recipient(
+                        subscription.user_id, email, frozenset(subscription.channel_list()),
+                        subscription.quiet_start, subscription.quiet_end))
+            finally:
+                db.session.remove()
+        self.by_key = {key: tuple(recipients) for key, recipients in by_key.items()}
+        self.loaded_at = time.time()
+        print(f"[Subscriptions] Index loaded: {len(rows)} subscription(s), {len(self.by_key)} key(s).")
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            self.changed.wait(timeout=self.refresh_interval)
+            if self.stop_event.is_set():
+                break
+            self.changed.clear()
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"[Subscriptions] Error refreshing index: {e}")
+
+    def start(self):
+        self.refresh()
+        self.thread = threading.Thread(target=self._run, name="SubscriptionIndex", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        self.changed.set()
+
+    # --- Lookup (alert path) ---
+    def recipients(self, camera_id, class_name, when=None):
+        """ {user_id: (email, channels)} for an alert, honouring quiet hours. Four dict lookups, no DB access. """
+        by_key = self.by_key
+        camera_id = str(camera_id)
+        local = time.localtime(when)
+        minute_of_day = local.tm_hour * 60 + local.tm_min
+        matched = {}
+        for key in ((camera_id, class_name), (camera_id, None), (None, class_name), (None, None)):
+            for recipient in by_key.get(key, ()):
+                if in_quiet_hours(recipient, minute_of_day):
+                    continue
+                email, channels = matched.get(recipient.user_id, (recipient.email, frozenset()))
+                matched[recipient.user_id] = (email, channels | recipient.channels)
+        return matched
+
+
+class EmailDispatcher:
+    """
+    Delivers alert emails off the alert thread. Alerts are collected for `batch_seconds`, grouped
+    per recipient into one message each, and sent over a single SMTP connection per batch.
+    """
+    def __init__(self, config, batch_seconds=5.0, max_queue=1000):
+        self.config = config
+        self.batch_seconds = batch_seconds
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.stats = {"queued": 0, "dropped": 0, "sent": 0, "failed": 0}
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="EmailSender", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def submit(self, recipient, alert_data):
+        try:
+            self.queue.put_nowait((recipient, alert_data))
+            self.stats["queued"] += 1
+        except queue.Full:
+            self.stats["dropped"] += 1
+            print(f"[Email] Dispatch queue full, dropping alert for {recipient}")
+
+    def _collect(self):
+        """ Blocks for the first alert, then gathers whatever else arrives within the batch window. """
+        try:
+            first = self.queue.get(timeout=1.0)
+        except queue.Empty:
+            return {}
+        by_recipient = {first[0]: [first[1]]}
+        deadline = time.time() + self.batch_seconds
+        while True:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                recipient, alert_data = self.queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            by_recipient.setdefault(recipient, []).append(alert_data)
+        return by_recipient
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            batch = self._collect()
+            if batch:
+                self._send(batch)
+
+    def _build_message(self, recipient, alerts):
+        msg = EmailMessage()
+        if len(alerts) == 1:
+            alert = alerts[0]
+            msg['Subject'] = f"Security Alert: {alert['alert_type']} - {alert['class']} Detected"
+        else:
+            msg['Subject'] = f"Security Alert: {len(alerts)} alerts"
+        details = "\n".join(
+            f"""
+    Timestamp: {alert['timestamp_str']}
+    Camera:    {alert['camera_id']}
+    Type:      {alert['alert_type']}
+    Class:     {alert['class']}
+    Confidence:{alert['confidence']:.2f}
+""" for alert in alerts)
+        msg.set_content(f"""
+    Security Alert Details:
+    -----------------------{details}
+    Check the dashboard for more details and snapshot (if available).
+    """)
+        msg['From'] = self.config.MAIL_SENDER
+        msg['To'] = recipient
+        return msg
+
+    def _send(self, batch):
+        config = self.config
+        if not config.MAIL_USERNAME or not config.MAIL_PASSWORD:
+            print("[Email] Error: Username or Password not configured.")
+            self.stats["failed"] += len(batch)
+            return
+        server = None
+        try:
+            if config.MAIL_USE_TLS:
+                server = smtplib.SMTP(config.MAIL_SERVER, config.MAIL_PORT)
+                server.starttls()
+            else: # Assuming SSL if not TLS
+                server = smtplib.SMTP_SSL(config.MAIL_SERVER, config.MAIL_PORT)
+            server.login(config.MAIL_USERNAME, config.MAIL_PASSWORD)
+            for recipient, alerts in batch.items():
+                try:
+                    server.send_message(self._build_message(recipient, alerts))
+                    self.stats["sent"] += 1
+                except smtplib.SMTPRecipientsRefused as e:
+                    self.stats["failed"] += 1
+                    print(f"[Email] Recipient refused ({recipient}): {e}")
+            print(f"[Email] Batch sent: {len(batch)} message(s), {sum(len(a) for a in batch.values())} alert(s).")
+        except smtplib.SMTPAuthenticationError:
+            self.stats["failed"] += len(batch)
+            print("[Email] Error: Authentication failed. Check MAIL_USERNAME/MAIL_PASSWORD (App Password?).")
+        except smtplib.SMTPServerDisconnected:
+            self.stats["failed"] += len(batch)
+            print("[Email] Error: Server disconnected unexpectedly.")
+        except smtplib.SMTPException as e:
+            self.stats["failed"] += len(batch)
+            print(f"[Email] Error sending email: {e}")
+        except Exception as e:
+            self.stats["failed"] += len(batch)
+            print(f"[Email] Unexpected error during email sending: {e}")
+        finally:
+            if server is not None:
+                try:
+                    server.quit()
+                except Exception:
+                    pass
+
+
+"""
+notifications.py
+
+Per-user alert delivery.
+
+backfill_default_subscriptions():
+
+    Upgrade step run by main.py when it creates the `alert_subscription` table: users registered
+    before subscriptions existed get the same catch-all email subscription new users get.
+
+class SubscriptionIndex:
+
+    Holds every enabled `AlertSubscription` (joined with the user's email) in a dict keyed by
+    (camera_id, class), where None in either position is a wildcard. For an alert,
+    `recipients(camera_id, class)` checks the four possible keys and drops subscriptions in their
+    quiet hours, so the alert thread never touches the database.
+
+    SQLAlchemy mapper events flag inserts/updates/deletes of subscriptions and users on the session;
+    the next commit wakes a background thread that rebuilds the index and swaps it in atomically.
+    A full reload also runs every `refresh_interval` seconds (`Config.SUBSCRIPTION_REFRESH_SECONDS`).
+
+class EmailDispatcher:
+
+    Queue + single "EmailSender" thread replacing one thread and one SMTP login per email.
+    Alerts arriving within `batch_seconds` (`Config.MAIL_BATCH_SECONDS`) are merged into one message
+    per recipient and sent over one SMTP connection.
+"""
@@ -0,0 +1,86 @@
+# preprocess.py
+import cv2
+import numpy as np
+
+LETTERBOX_PAD_VALUE = 114 # Grey padding, same as the YOLO training pipeline
+
+
+class Letterbox:
+    """
+    Aspect-preserving resize of camera frames into a fixed detection canvas, using buffers that
+    are allocated once per (source shape, canvas shape) and reused for every frame.
+    """
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.source_shape = None
+        self.canvas = None   # height x width x 3, padding filled once
+        self.resized = None  # Contiguous scratch buffer for cv2.resize(dst=...)
+        self.scale = 1.0
+        self.pad_x = 0
+        self.pad_y = 0
+
+    def _prepare(self, frame):
+        height, width = frame.shape[:2]
+        self.source_shape = frame.shape
+        self.scale = min(self.width / width, self.height / height)
+        new_w = max(1, int(round(width * self.scale)))
+        new_h = max(1, int(round(height * self.scale)))
+        self.pad_x = (self.width - new_w) // 2
+        self.pad_y = (self.height - new_h) // 2
+        channels = frame.shape[2] if frame.ndim == 3 else 1
+        self.canvas = np.full((self.height, self.width, channels), LETTERBOX_PAD_VALUE, dtype=frame.dtype)
+        self.resized = np.empty((new_h, new_w, channels), dtype=frame.dtype)
+
+    def __call__(self, frame):
+        """ Returns the letterboxed frame (a reused buffer, valid until the next call). """
+        if frame.shape != self.source_shape:
+            self._prepare(frame) # Camera resolution changed (or first frame)
+        new_h, new_w = self.resized.shape[:2]
+        if frame.ndim == 2:
+            frame = frame[:, :, None]
+        cv2.resize(frame, (new_w, new_h), dst=self.resized, interpolation=cv2.INTER_LINEAR)
+        self.canvas[self.pad_y:self.pad_y + new_h, self.pad_x:self.pad_x + new_w] = self.resized
+        return self.canvas
+
+    def to_native(self, bbox):
+        """ Maps a canvas-space [x0, y0, x1, y1] back to source-frame pixels (clipped to the frame). """
+        height, width = self.source_shape[:2]
+        x0, y0, x1, y1 = bbox
+        return [
+            min(max((x0 - self.pad_x) / self.scale, 0.0), width),
+            min(max((y0 - self.pad_y) / self.scale, 0.0), height),
+            min(max((x1 - self.pad_x) / self.scale, 0.0), width),
+            min(max((y1 - self.pad_y) / self.scale, 0.0), height),
+        ]
+
+
+def normalize_bbox(bbox, width, height):
+    """ Native-pixel [x0, y0, x1, y1] -> [0, 1] coordinates relative to the source frame. """
+    x0, y0, x1, y1 = bbox
+    return [x0 / width, y0 / height, x1 / width, y1 / height]
+
+
+"""
+preprocess.py
+
+Detection-input preprocessing for CameraProcessor.
+
+class Letterbox:
+
+    Replaces the old `cv2.resize(frame, (detect_w, detect_h))`, which stretched frames whose aspect
+    ratio differs from the detection size. The frame is scaled to fit inside `width x height` and the
+    rest of the canvas is grey padding, so objects keep their shape and the model gets the fixed input
+    shape it expects. The canvas (with its padding) and the resize buffer are allocated once per
+    camera resolution; each frame is resized into the scratch buffer and copied into the canvas.
+
+    Methods:
+        __call__(frame): Letterboxed frame (reused buffer).
+        to_native(bbox): Map a detection box from canvas space back to source-frame pixels.
+
+normalize_bbox(bbox, width, height):
+    Converts native-pixel boxes to normalized [0, 1] coordinates. Detections carry both:
+        "bbox"      [xmin, ymin, xmax, ymax] in source-camera pixels
+        "bbox_norm" [xmin, ymin, xmax, ymax] as fractions of the source frame size
+    so snapshots, zones and downstream consumers can place boxes at any resolution.
+"""
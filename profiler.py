@@ -0,0 +1,147 @@
+# profiler.py
+import os
+import sys
+import time
+import threading
+from collections import Counter
+
+DEFAULT_THREAD_PREFIXES = ("Camera", "AlertProcessor", "Stream")
+
+
+def parse_thread_prefixes(value):
+    """ Validates the `threads` field of a profiler request (None = defaults). Raises ValueError. """
+    if value is None:
+        return DEFAULT_THREAD_PREFIXES
+    if not isinstance(value, list) or not value or not all(isinstance(p, str) and p.strip() for p in value):
+        raise ValueError("threads must be a non-empty list of thread name prefixes")
+    return tuple(p.strip() for p in value)
+
+
+class SamplingProfiler:
+    """
+    Low-overhead wall-clock sampling profiler for the live app.
+    Periodically snapshots the stacks of selected threads (via `sys._current_frames()`)
+    and aggregates them into flame-graph compatible collapsed stacks.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.counts = Counter() # { "thread;frame;frame": samples }
+        self.samples_taken = 0
+        self.started_at = None
+        self.stopped_at = None
+        self.interval = 0.01
+        self.duration = 0
+        self.thread_prefixes = ()
+
+    def is_running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self, duration, interval=0.01, thread_prefixes=DEFAULT_THREAD_PREFIXES):
+        """ Starts sampling for `duration` seconds. Returns False if a session is already running. """
+        with self.lock:
+            if self.is_running():
+                return False
+            self.counts = Counter()
+            self.samples_taken = 0
+            self.started_at = time.time()
+            self.stopped_at = None
+            self.interval = interval
+            self.duration = duration
+            self.thread_prefixes = tuple(thread_prefixes)
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self._run, name="SamplingProfiler", daemon=True)
+            self.thread.start()
+        print(f"[Profiler] Started: {duration}s @ {interval * 1000:.0f}ms, threads {list(self.thread_prefixes)}")
+        return True
+
+    def stop(self):
+        """ Stops the current session (if any) and waits for the sampler thread. """
+        self.stop_event.set()
+        thread = self.thread
+        if thread and thread is not threading.current_thread():
+            thread.join(timeout=2.0)
+
+    def _run(self):
+        own_ident = threading.get_ident()
+        deadline = self.started_at + self.duration
+        while not self.stop_event.is_set() and time.time() < deadline:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            frames = sys._current_frames()
+            for ident, frame in frames.items():
+                if ident == own_ident:
+                    continue
+                name = names.get(ident)
+                if name is None or not name.startswith(self.thread_prefixes):
+                    continue
+                self.counts[self._collapse(name, frame)] += 1
+            self.samples_taken += 1
+            del frames # Don't keep other threads' frames alive between samples
+            self.stop_event.wait(self.interval)
+        self.stopped_at = time.time()
+        print(f"[Profiler] Stopped after {self.samples_taken} samples.")
+
+    @staticmethod
+    def _collapse(thread_name, frame):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+            frame = frame.f_back
+        stack.append(thread_name.replace(";", ":")) # Root = thread, for per-thread attribution
+        stack.reverse()
+        return ";".join(stack)
+
+    def collapsed(self):
+        """ Returns the profile in collapsed-stack format ("frame;frame;frame count" per line). """
+        counts = dict(self.counts)
+        return "".join(f"{stack} {count}\n" for stack, count in sorted(counts.items()))
+
+    def status(self):
+        per_thread = Counter()
+        for stack, count in dict(self.counts).items():
+            per_thread[stack.split(";", 1)[0]] += count
+        return {
+            "running": self.is_running(),
+            "started_at": self.started_at,
+            "stopped_at": self.stopped_at,
+            "duration": self.duration,
+            "interval_ms": self.interval * 1000,
+            "threads": list(self.thread_prefixes),
+            "samples": self.samples_taken,
+            "samples_per_thread": dict(per_thread),
+        }
+
+
+"""
+profiler.py
+
+On-demand sampling profiler used by the `/api/profiler/*` endpoints in `main.py`.
+
+class SamplingProfiler:
+
+    Samples the Python stacks of the camera, alert and streaming threads at a fixed interval
+    for a bounded time window, without restarting the app. Threads are selected by name prefix,
+    so the app names its threads accordingly:
+        - `Camera-<id>`        CameraProcessor threads (decode, inference, plot, snapshot)
+        - `AlertProcessor`     alert_processor_thread
+        - `Stream-<id>`        request threads serving /video_feed (waiting on shared encoded frames)
+        - `StreamEncoder`      FrameBroadcaster thread (imencode)
+
+    Output is the collapsed-stack format consumed by flamegraph.pl / speedscope / inferno:
+        Camera-0;run (camera_processor.py:150);detect (camera_processor.py:31) 42
+    The first frame of each stack is the thread name, giving per-thread attribution.
+
+    Overhead: one `sys._current_frames()` call per interval (default 10 ms) from a single
+    daemon thread. Nothing is installed into the sampled threads, so the pipeline keeps
+    running untouched and sampling stops automatically when the window ends.
+
+    parse_thread_prefixes(value): Validates the request's `threads` list (ValueError otherwise).
+
+    Methods:
+        start(duration, interval, thread_prefixes): Begin a session (False if one is running).
+        stop(): End the current session early.
+        collapsed(): Collapsed-stack text of the last/current session.
+        status(): Session metadata and per-thread sample counts.
+"""
@@ -0,0 +1,92 @@
+# renderer.py
+import cv2
+import numpy as np
+
+THREAT_COLOR = (0, 0, 255)   # BGR red
+PERSON_COLOR = (0, 200, 0)   # BGR green
+OTHER_COLOR = (255, 160, 0)  # BGR blue-ish
+
+
+class AnnotationRenderer:
+    """
+    Draws detection boxes onto a copy of a frame held in reusable buffers.
+    Replaces `results[0].plot()`, which allocated a fresh annotated image on every inference.
+    """
+    def __init__(self, primary_threat_classes, person_class_name, classes_to_draw=None, buffers=2):
+        self.primary_threat_classes = set(primary_threat_classes)
+        self.person_class_name = person_class_name
+        # None = draw primary threats + people (what alerts are about); otherwise an explicit set
+        self.classes_to_draw = set(classes_to_draw) if classes_to_draw else self.primary_threat_classes | {person_class_name}
+        self.buffers = [None] * max(1, buffers)
+        self.next_buffer = 0
+
+    def _buffer_for(self, frame):
+        index = self.next_buffer
+        self.next_buffer = (self.next_buffer + 1) % len(self.buffers)
+        buffer = self.buffers[index]
+        if buffer is None or buffer.shape != frame.shape or buffer.dtype != frame.dtype:
+            buffer = np.empty_like(frame) # Only reallocated when the camera resolution changes
+            self.buffers[index] = buffer
+        return buffer
+
+    def render(self, frame, detections, out=None):
+        """
+        Returns `frame` with boxes for the configured classes, drawn in one of the reusable buffers
+        (or into `out`, e.g. a FrameSlot back buffer, which must match the frame's shape).
+        Boxes are in `frame` pixels (native "bbox"). The returned buffer is reused `buffers` calls
+        later, so consumers must be done with it by then.
+        """
+        to_draw = [d for d in detections if d["class"] in self.classes_to_draw]
+        buffer = self._buffer_for(frame) if out is None else out
+        np.copyto(buffer, frame)
+        if not to_draw:
+            return buffer
+
+        thickness = max(1, int(round(frame.shape[1] / 640)))
+        font_scale = 0.5 * thickness
+        for detection in to_draw:
+            x0, y0, x1, y1 = detection["bbox"]
+            p0 = (int(x0), int(y0))
+            p1 = (int(x1), int(y1))
+            if detection["is_primary_threat"]:
+                color = THREAT_COLOR
+            elif detection["class"] == self.person_class_name:
+                color = PERSON_COLOR
+            else:
+                color = OTHER_COLOR
+            cv2.rectangle(buffer, p0, p1, color, thickness * 2)
+            label = f"{detection['class']} {detection['confidence']:.2f}"
+            (text_w, text_h), baseline = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, font_scale, thickness)
+            label_y = max(p0[1], text_h + baseline)
+            cv2.rectangle(buffer, (p0[0], label_y - text_h - baseline), (p0[0] + text_w, label_y), color, -1)
+            cv2.putText(buffer, label, (p0[0], label_y - baseline), cv2.FONT_HERSHEY_SIMPLEX,
+                        font_scale, (255, 255, 255), thickness, cv2.LINE_AA)
+        return buffer
+
+
+"""
+renderer.py
+
+Lightweight annotation renderer used by CameraProcessor.
+
+class AnnotationRenderer:
+
+    Detection (ThreatDetector, TiledInference) only returns raw detection dicts; pixels are drawn
+    separately and only when someone needs them:
+        - a client is watching the camera's stream (CameraProcessor viewer count > 0), or
+        - a snapshot is being saved for an interesting detection.
+
+    Only `classes_to_draw` are drawn (default: primary threat classes + person, i.e. what alerts
+    are about). Drawing happens on a copy of the frame held in a small pool of preallocated
+    buffers, so steady-state rendering allocates nothing.
+
+    Args:
+        primary_threat_classes (list[str]): Drawn in red.
+        person_class_name (str): Drawn in green.
+        classes_to_draw (list[str], optional): Explicit class filter (`Config.ANNOTATE_CLASSES`).
+        buffers (int): Size of the buffer pool (2 for streams so a frame being encoded isn't overwritten
+            by the very next render; 1 for synchronous snapshot writes).
+
+    Methods:
+        render(frame, detections, out=None): Annotated copy of `frame` in a reusable buffer (or `out`).
+"""
@@ -0,0 +1,234 @@
+# streaming.py
+import time
+import threading
+from functools import lru_cache
+
+import cv2
+import numpy as np
+
+PLACEHOLDER_PART = (b'--frame\r\n'
+                    b'Content-Type: text/plain\r\n\r\n' + b"Waiting for camera feed..." + b'\r\n')
+WAITING_MESSAGE = "Waiting for camera feed..."
+OFFLINE_MESSAGE = "Camera offline - reconnecting..."
+OFFLINE_SEQ = -1 # encoded_seq marker: the offline frame is what viewers currently have
+
+
+def mjpeg_part(jpeg_bytes):
+    return b'--frame\r\nContent-Type: image/jpeg\r\n\r\n' + jpeg_bytes + b'\r\n'
+
+
+@lru_cache(maxsize=8)
+def status_part(message, width=640, height=360):
+    """ Multipart JPEG of `message` on a dark frame, encoded once; the text placeholder if encoding fails. """
+    try:
+        image = np.full((height, width, 3), 32, dtype=np.uint8)
+        (text_w, text_h), _ = cv2.getTextSize(message, cv2.FONT_HERSHEY_SIMPLEX, 0.8, 2)
+        cv2.putText(image, message, ((width - text_w) // 2, (height + text_h) // 2),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, (200, 200, 200), 2, cv2.LINE_AA)
+        ret, buffer = cv2.imencode('.jpg', image)
+        if ret:
+            return mjpeg_part(buffer.tobytes())
+    except Exception as e:
+        print(f"Error rendering status frame '{message}': {e}")
+    return PLACEHOLDER_PART
+
+
+def select_stream(camera_id, processor, quality=None):
+    """
+    Stream key for a /video_feed request. `quality=full` picks a dual-stream camera's main stream
+    (opened while watched); otherwise, or when there is none, the detection stream.
+    """
+    main_stream = getattr(processor, "main_stream", None)
+    if quality == "full" and main_stream is not None and main_stream.frame_slots is not None:
+        return main_stream.stream_key
+    return camera_id
+
+
+class FrameBroadcaster:
+    """
+    Encodes each watched camera's latest frame to JPEG once per tick, however many clients are
+    watching it. Stream handlers (Flask threads or the async server) only pick up the bytes.
+    """
+    def __init__(self, frame_dict, fps=30, jpeg_quality=80, health_source=None):
+        self.frame_dict = frame_dict # FrameSlots (or the supervisor's shared-memory reader)
+        self.interval = 1.0 / max(fps, 1)
+        self.jpeg_quality = jpeg_quality
+        self.encoded = {} # { camera_id: (version, multipart_chunk) }
+        self.watchers = {} # { camera_id: viewer count }; cameras poll this through viewers()
+        # Callable(camera_id) -> the camera's current `health` (or None), looked up per tick so a
+        # restarted/reconfigured camera's new thread is used, never the one a viewer connected to
+        self.health_source = health_source
+        self.condition = threading.Condition()
+        self.listeners = [] # Callables(camera_id) run after each new frame (async server wake-ups)
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.encoded_seq = {} # { camera_id: source frame seq last encoded }
+        self.versions = {} # { camera_id: version of its last published chunk }; +1 per published chunk
+        self.stats = {"frames_encoded": 0, "encode_errors": 0, "torn_reads": 0}
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="StreamEncoder", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        with self.condition:
+            self.condition.notify_all()
+
+    def add_listener(self, callback):
+        self.listeners.append(callback)
+
+    # --- Viewers ---
+    def subscribe(self, camera_id):
+        """ Registers a viewer; the camera renders stream frames only while it has viewers. """
+        with self.condition:
+            self.watchers[camera_id] = self.watchers.get(camera_id, 0) + 1
+
+    def unsubscribe(self, camera_id):
+        with self.condition:
+            count = self.watchers.get(camera_id)
+            if count is None:
+                return
+            if count > 1:
+                self.watchers[camera_id] = count - 1
+            else:
+                del self.watchers[camera_id]
+                self.encoded.pop(camera_id, None) # Don't serve a stale frame to the next viewer
+                self.encoded_seq.pop(camera_id, None)
+
+    def drop(self, camera_id):
+        """ Ends every stream of a removed camera (its detection and main stream keys). """
+        keys = (camera_id, (camera_id, "main"))
+        with self.condition:
+            for key in keys:
+                self.watchers.pop(key, None)
+                self.encoded.pop(key, None)
+                self.encoded_seq.pop(key, None)
+            self.condition.notify_all() # Threaded streams notice at once
+        for key in keys:
+            for callback in self.listeners:
+                callback(key) # Async streams too
+
+    def is_watched(self, camera_id):
+        """ False once the stream key was dropped (camera removed): stream handlers then end the response. """
+        return camera_id in self.watchers
+
+    def viewer_counts(self):
+        with self.condition:
+            return dict(self.watchers)
+
+    def viewers(self, camera_id):
+        """ Open streams for a stream key; polled by camera threads every frame (a dict lookup, no lock). """
+        return self.watchers.get(camera_id, 0)
+
+    # --- Frames ---
+    def latest(self, camera_id):
+        """ (version, multipart chunk) of the newest encoded frame, or None. """
+        return self.encoded.get(camera_id)
+
+    def wait_for(self, camera_id, after_version, timeout=1.0):
+        """ Blocks until a frame newer than `after_version` exists (threaded server). """
+        deadline = time.time() + timeout
+        with self.condition:
+            while not self.stop_event.is_set() and camera_id in self.watchers:
+                current = self.encoded.get(camera_id)
+                if current is not None and current[0] != after_version:
+                    return current
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return None
+                self.condition.wait(remaining)
+        return None
+
+    def _encode(self, camera_id, version):
+        health = self.health_source(camera_id) if self.health_source is not None else None
+        if health is not None and health.is_offline():
+            if self.encoded_seq.get(camera_id) == OFFLINE_SEQ:
+                return None # Viewers already have the offline frame
+            self.encoded_seq[camera_id] = OFFLINE_SEQ
+            return (version, status_part(OFFLINE_MESSAGE)) # Cached JPEG, no per-tick encode
+        seq, _, frame = self.frame_dict.read(camera_id) # Read-only view, no lock, no copy
+        if frame is None or seq == self.encoded_seq.get(camera_id):
+            return None # Camera hasn't published a new frame since the last tick
+        ret, buffer = cv2.imencode('.jpg', frame, [int(cv2.IMWRITE_JPEG_QUALITY), self.jpeg_quality])
+        if not ret:
+            self.stats["encode_errors"] += 1
+            print(f"Error encoding frame for stream (Cam {camera_id})")
+            return None
+        if not self.frame_dict.still_valid(camera_id, seq):
+            self.stats["torn_reads"] += 1 # Writer lapped the encoder; the next tick picks up a fresh frame
+            return None
+        self.encoded_seq[camera_id] = seq
+        self.stats["frames_encoded"] += 1
+        return (version, mjpeg_part(buffer.tobytes()))
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            tick_start = time.time()
+            with self.condition:
+                watched = list(self.watchers)
+            updated = []
+            for camera_id in watched:
+                # Per camera, so a client's version gap is exactly the number of this stream's frames it missed
+                version = self.versions.get(camera_id, 0) + 1
+                try:
+                    encoded = self._encode(camera_id, version)
+                except Exception as e:
+                    self.stats["encode_errors"] += 1
+                    print(f"Error in stream encoder (Cam {camera_id}): {e}")
+                    encoded = None
+                if encoded is not None:
+                    with self.condition:
+                        if camera_id in self.watchers:
+                            self.encoded[camera_id] = encoded
+                            self.versions[camera_id] = version
+                            updated.append(camera_id)
+            if updated:
+                with self.condition:
+                    self.condition.notify_all()
+                for camera_id in updated:
+                    for callback in self.listeners:
+                        callback(camera_id)
+            self.stop_event.wait(max(0.0, self.interval - (time.time() - tick_start)))
+
+
+"""
+streaming.py
+
+Shared MJPEG encoding for /video_feed.
+
+Previously every client's request thread ran its own `cv2.imencode` loop, so N viewers of one
+camera meant N identical JPEG encodes per frame.
+
+class FrameBroadcaster:
+
+    A single "StreamEncoder" thread encodes the latest frame of every camera that has at least one
+    viewer, at most `fps` times per second (`Config.STREAM_FPS`) and only when the camera's FrameSlot
+    sequence number has moved, and stores it as a ready-to-send multipart chunk with a version
+    number (consecutive per stream key). Clients send whatever the newest version is, so a slow client
+    skips frames instead of building a backlog.
+
+    Used by both serving modes:
+        - threaded (Flask `app.run`): `generate_frames` blocks in `wait_for(camera_id, version)`.
+        - async (async_server.py): a listener wakes the event loop's stream handlers.
+
+    While a camera's `health` reports it offline (source down, stalled, backing off), viewers get
+    one cached "Camera offline" JPEG (`status_part`) instead of the last frozen frame; frames resume
+    as soon as it reconnects.
+
+    Stream keys are camera IDs, or (camera_id, "main") for a dual-stream camera's full-resolution
+    stream (`select_stream`).
+
+    Viewer counts live here, per stream key, not on a camera thread: CameraProcessor and MainStream
+    poll `viewers(key)` (passed in as `viewer_count`), and the offline check asks `health_source`
+    (CameraRegistry.stream_health) each tick. A camera that is reconfigured, paused/resumed or
+    restarted while streams are open therefore keeps publishing to them.
+
+    Methods:
+        subscribe(camera_id) / unsubscribe(camera_id): Viewer tracking.
+        drop(camera_id): Ends all streams of a removed camera (`is_watched` turns False).
+        viewers(camera_id): Current viewer count of a stream key.
+        latest(camera_id): Newest (version, chunk).
+        wait_for(camera_id, after_version, timeout): Blocking wait for a newer frame.
+        add_listener(callback): Called with camera_id from the encoder thread after each new frame.
+"""
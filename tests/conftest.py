@@ -0,0 +1,6 @@
+# tests/conftest.py
+import os
+import sys
+
+# The app is a flat set of modules in the repository root (no package); make them importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
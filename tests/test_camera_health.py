@@ -0,0 +1,150 @@
+# tests/test_camera_health.py
+import threading
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+import camera_health
+from camera_health import Backoff, TimedCapture, CameraHealth
+
+
+@pytest.fixture
+def no_jitter(monkeypatch):
+    monkeypatch.setattr(camera_health.random, "uniform", lambda low, high: high)
+
+
+def test_backoff_doubles_up_to_maximum(no_jitter):
+    backoff = Backoff(base=0.5, maximum=4.0, stable_after=30.0)
+    assert [backoff.next_delay() for _ in range(6)] == [0.5, 1.0, 2.0, 4.0, 4.0, 4.0]
+
+
+def test_backoff_resets_after_a_stable_connection(no_jitter):
+    backoff = Backoff(base=0.5, maximum=30.0, stable_after=30.0)
+    for _ in range(4):
+        backoff.next_delay(connected_for=5.0) # Flapping: keeps growing
+    assert backoff.next_delay(connected_for=5.0) == 8.0
+    assert backoff.next_delay(connected_for=31.0) == 0.5
+
+
+def test_backoff_jitter_stays_within_half_to_full_delay():
+    backoff = Backoff(base=1.0, maximum=1.0)
+    assert all(0.5 <= backoff.next_delay() <= 1.0 for _ in range(50))
+
+
+class FakeCapture:
+    def __init__(self, opened=True, hang=None):
+        self.opened = opened
+        self.hang = hang # Event: read() blocks until it is set
+        self.released = False
+
+    def isOpened(self):
+        return self.opened
+
+    def read(self):
+        if self.hang is not None:
+            self.hang.wait()
+        return True, np.zeros((4, 4, 3), dtype=np.uint8)
+
+    def release(self):
+        self.released = True
+
+
+def hanging_factory(unblock):
+    def factory(source):
+        unblock.wait() # A dead RTSP host: open never returns on its own
+        return FakeCapture()
+    return factory
+
+
+def helper_threads(name):
+    return [t for t in threading.enumerate() if t.name == name]
+
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_open_and_read():
+    capture = FakeCapture()
+    timed = TimedCapture(lambda source: capture, "rtsp://cam", name="Capture-t1")
+    assert timed.open() and timed.isOpened() and timed.capture is capture
+    ret, frame = timed.read()
+    assert ret and frame.shape == (4, 4, 3)
+    timed.release()
+    assert not timed.isOpened()
+    assert wait_until(lambda: capture.released and not helper_threads("Capture-t1"))
+
+
+def test_refused_open_releases_helper():
+    capture = FakeCapture(opened=False)
+    timed = TimedCapture(lambda source: capture, "rtsp://cam", name="Capture-t2")
+    assert timed.open() is False
+    assert wait_until(lambda: capture.released and not helper_threads("Capture-t2"))
+
+
+def test_open_timeout_blocks_new_helpers_until_the_stuck_one_returns():
+    unblock = threading.Event()
+    calls = []
+    def factory(source):
+        calls.append(source)
+        return hanging_factory(unblock)(source)
+    for _ in range(5):
+        with pytest.raises(TimeoutError):
+            TimedCapture(factory, "rtsp://dead", open_timeout=0.05, name="Capture-t3").open()
+    # Five timeouts, one stuck helper (not five)
+    assert len(calls) == 1 and len(helper_threads("Capture-t3")) == 1
+    assert TimedCapture.stuck_helpers("Capture-t3") == 1
+    health = CameraHealth(capture_name="Capture-t3")
+    assert health.to_dict()["stuck_captures"] == 1
+
+    unblock.set() # The native call finally returns
+    assert wait_until(lambda: TimedCapture.stuck_helpers("Capture-t3") == 0 and not helper_threads("Capture-t3"))
+    assert health.to_dict()["stuck_captures"] == 0
+    assert TimedCapture(factory, "rtsp://dead", name="Capture-t3").open()
+
+
+def test_read_timeout_abandons_capture():
+    hang = threading.Event()
+    capture = FakeCapture(hang=hang)
+    timed = TimedCapture(lambda source: capture, "rtsp://cam", read_timeout=0.05, name="Capture-t4")
+    assert timed.open()
+    with pytest.raises(TimeoutError):
+        timed.read()
+    assert not timed.isOpened() and TimedCapture.stuck_helpers("Capture-t4") == 1
+    hang.set()
+    assert wait_until(lambda: capture.released and TimedCapture.stuck_helpers("Capture-t4") == 0)
+
+
+def test_video_capture_gets_backend_timeouts(monkeypatch):
+    opened = []
+    def fake_open(source, open_timeout, read_timeout):
+        opened.append((source, open_timeout, read_timeout))
+        return FakeCapture()
+    monkeypatch.setattr(camera_health, "open_video_capture", fake_open)
+    timed = TimedCapture(cv2.VideoCapture, "rtsp://cam", open_timeout=3.0, read_timeout=2.0, name="Capture-t5")
+    assert timed.open()
+    timed.release()
+    assert opened == [("rtsp://cam", 3.0, 2.0)]
+
+
+def test_health_states():
+    health = CameraHealth(stall_timeout=0.05)
+    health.connected()
+    health.frame(time.time())
+    assert health.to_dict()["state"] == "streaming" and not health.is_offline()
+    time.sleep(0.06)
+    assert health.is_offline() and health.to_dict()["state"] == "stalled" # No frame for stall_timeout
+    health.failed("read failed", retry_in=5.0)
+    report = health.to_dict()
+    assert report["state"] == "offline" and report["consecutive_failures"] == 1 and report["retry_in"] > 4.0
+    health.connected()
+    assert health.reconnects == 1 and health.to_dict()["retry_in"] is None
+    health.released()
+    assert health.state == "idle" and not health.is_offline()
@@ -0,0 +1,114 @@
+# tests/test_camera_registry.py
+import threading
+
+import numpy as np
+import pytest
+
+import camera_registry
+from camera_registry import CameraRegistry, CameraBusyError, parse_bool, normalize_source
+from frame_slots import FrameSlots
+
+
+class FakeProcessor:
+    """ Stands in for CameraProcessor: no capture, no model. `stuck=True` ignores stop(). """
+    instances = []
+    stuck = False
+
+    def __init__(self, camera_id, camera_source, config, alert_queue, frame_dict, detector_factory=None,
+                 viewer_count=None):
+        self.camera_id = camera_id
+        self.viewer_count = viewer_count
+        self.camera_source = camera_source
+        self.alive = False
+        self.stuck = FakeProcessor.stuck
+        FakeProcessor.instances.append(self)
+
+    def start(self):
+        threading.Event().wait(0.01) # Widen the window between is_running() and the thread being alive
+        self.alive = True
+
+    def stop(self):
+        if not self.stuck:
+            self.alive = False
+
+    def is_alive(self):
+        return self.alive
+
+    def join(self, timeout=None):
+        pass
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    FakeProcessor.instances = []
+    FakeProcessor.stuck = False
+    monkeypatch.setattr(camera_registry, "CameraProcessor", FakeProcessor)
+    registry = CameraRegistry(config=None, alert_queue=None, frame_dict=FrameSlots())
+    registry.stop_timeout = 0.01
+    return registry
+
+
+@pytest.mark.parametrize("value, expected", [(True, True), (False, False), ("true", True), (" False ", False)])
+def test_parse_bool(value, expected):
+    assert parse_bool(value, "flag") is expected
+
+
+@pytest.mark.parametrize("value", ["no", "0", 1, 0, None, ""])
+def test_parse_bool_rejects_other_values(value):
+    with pytest.raises(ValueError):
+        parse_bool(value, "flag")
+
+
+def test_settings_string_false_is_false(registry):
+    entry = registry.add(0, settings={"enable_tiling": "false", "detect_w": "320"})
+    assert entry.settings == {"enable_tiling": False, "detect_w": 320}
+    with pytest.raises(ValueError):
+        registry.add(1, settings={"enable_tiling": "off"})
+
+
+def test_normalize_source():
+    assert normalize_source("2") == 2
+    assert normalize_source({"detect": "1", "main": "rtsp://cam/main"}) == {"detect": 1, "main": "rtsp://cam/main"}
+    with pytest.raises(ValueError):
+        normalize_source({"main": "rtsp://cam/main"})
+
+
+def test_concurrent_resumes_start_one_thread(registry):
+    registry.add(0, paused=True)
+    barrier = threading.Barrier(8)
+    def resume():
+        barrier.wait()
+        registry.resume(0)
+    threads = [threading.Thread(target=resume) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(FakeProcessor.instances) == 1
+    assert registry.get(0).processor is FakeProcessor.instances[0]
+
+
+def test_no_restart_while_old_thread_is_stopping(registry):
+    FakeProcessor.stuck = True
+    entry = registry.add(0)
+    old = entry.processor
+    registry.frame_dict[0] = np.zeros((2, 2, 3), np.uint8)
+    FakeProcessor.stuck = False
+    with pytest.raises(CameraBusyError):
+        registry.reconfigure(0, settings={"detect_w": 320})
+    assert registry.stopping[0] is old
+    assert 0 in registry.frame_dict # The old thread still owns the slot; it clears it when it exits
+    assert entry.processor is None and entry.settings["detect_w"] == 320 # New config kept for resume
+
+    old.alive = False # The old thread finally exits
+    registry.resume(0)
+    assert entry.processor is FakeProcessor.instances[-1] and entry.processor is not old
+    assert 0 not in registry.stopping
+
+
+def test_operations_after_remove_are_ignored(registry):
+    registry.add(0)
+    assert registry.remove(0) is not None
+    assert registry.pause(0) is None
+    assert registry.resume(0) is None
+    assert registry.get(0) is None
@@ -0,0 +1,142 @@
+# tests/test_camera_supervisor.py
+import time
+import queue
+import threading
+
+import numpy as np
+import pytest
+
+import camera_supervisor
+from camera_supervisor import CameraSupervisor, SharedFrameRing, STATUS_MESSAGE
+from config import Config
+
+
+class FakeProcess:
+    def __init__(self, alive=True):
+        self.alive = alive
+        self.pid = 1234
+        self.exitcode = None if alive else 1
+
+    def is_alive(self):
+        return self.alive
+
+
+class FakeRing:
+    name, slots, max_frame_bytes = "ring", 1, 1
+
+
+class FakeCommands:
+    def __init__(self):
+        self.sent = []
+
+    def put(self, command):
+        self.sent.append(command)
+
+
+@pytest.fixture
+def supervisor():
+    """ A supervisor with one fake worker (no processes spawned) and its forwarder thread running. """
+    supervisor = CameraSupervisor(Config, 1, queue.Queue())
+    supervisor.workers.append({"process": FakeProcess(), "commands": FakeCommands(), "cameras": {},
+                               "restarts": 0, "next_restart": 0.0, "started_at": time.time()})
+    supervisor.running = True
+    forwarder = threading.Thread(target=supervisor._forward_detections, daemon=True)
+    forwarder.start()
+    yield supervisor
+    supervisor.running = False
+    forwarder.join(timeout=2.0)
+
+
+def report(supervisor, status, worker=0):
+    supervisor.detection_queue.put((STATUS_MESSAGE, worker, status))
+    deadline = time.time() + 2.0
+    while time.time() < deadline and not supervisor.detection_queue.empty():
+        time.sleep(0.01)
+    time.sleep(0.05) # Let the forwarder apply it
+
+
+def status(state="streaming", health_state="streaming", frames=10):
+    return {"state": state, "health": {"state": health_state, "last_error": None},
+            "stats": {"frames_captured": frames}}
+
+
+def test_state_is_loading_until_the_worker_reports(supervisor):
+    handle = supervisor.create_handle(3, "rtsp://cam", {})
+    assert handle.state == "loading"
+    assert handle.health.to_dict() is None and not handle.health.is_offline()
+    report(supervisor, {3: status(state="warming")})
+    assert handle.state == "warming"
+    report(supervisor, {3: status()})
+    assert handle.state == "streaming" and handle.is_alive()
+    assert supervisor.camera_stats(3) == {"frames_captured": 10}
+
+
+def test_detections_are_forwarded_and_status_messages_are_not(supervisor):
+    supervisor.create_handle(0, "rtsp://cam", {})
+    report(supervisor, {0: status()})
+    supervisor.detection_queue.put({"camera_id": 0, "class": "knife"})
+    assert supervisor.alert_queue.get(timeout=2.0) == {"camera_id": 0, "class": "knife"}
+    assert supervisor.alert_queue.empty()
+
+
+def test_offline_health_reaches_viewers(supervisor):
+    handle = supervisor.create_handle(0, "rtsp://cam", {})
+    report(supervisor, {0: status(health_state="offline")})
+    assert handle.health.is_offline()
+
+
+def test_dead_or_silent_worker(supervisor, monkeypatch):
+    handle = supervisor.create_handle(0, "rtsp://cam", {})
+    report(supervisor, {0: status()})
+    monkeypatch.setattr(camera_supervisor, "STATUS_STALE_SECONDS", 0.0)
+    time.sleep(0.1)
+    assert handle.health.to_dict()["state"] == "stalled" and handle.health.is_offline()
+    supervisor.workers[0]["process"].alive = False
+    assert handle.state == "failed" and not handle.is_alive()
+    assert handle.health.to_dict()["state"] == "offline"
+
+
+def test_reports_for_removed_cameras_are_ignored(supervisor):
+    supervisor.create_handle(0, "rtsp://cam", {})
+    supervisor.stop_camera(0)
+    report(supervisor, {0: status()})
+    assert supervisor.camera_state(0) == "stopped"
+    assert supervisor.camera_health(0) is None
+
+
+def test_crashed_worker_is_started_outside_the_lock(supervisor, monkeypatch):
+    supervisor.create_handle(0, "rtsp://cam/a", {})
+    supervisor.frames.rings.update({0: FakeRing(), 1: FakeRing()})
+    supervisor.workers[0]["process"].alive = False
+    supervisor._check_workers() # Schedules the restart
+    supervisor.workers[0]["next_restart"] = time.time()
+    lock_was_free = []
+    def try_lock():
+        if supervisor.lock.acquire(timeout=0.5):
+            supervisor.lock.release()
+            lock_was_free.append(True)
+    def start_process(index):
+        checker = threading.Thread(target=try_lock) # Another thread, as the RLock is reentrant
+        checker.start()
+        checker.join()
+        supervisor.create_handle(1, "rtsp://cam/b", {}) # Added while the process was starting
+        return FakeProcess(), FakeCommands()
+    monkeypatch.setattr(supervisor, "_start_process", start_process)
+    supervisor._check_workers()
+    assert lock_was_free == [True]
+    worker = supervisor.workers[0]
+    assert worker["process"].is_alive() and worker["restarts"] == 1
+    assert [command[1] for command in worker["commands"].sent] == [0, 1] # The whole current shard is re-sent
+
+
+def test_shared_frame_ring_roundtrip():
+    ring = SharedFrameRing(slots=3, max_frame_bytes=64 * 48 * 3, create=True)
+    try:
+        frame = np.arange(48 * 64 * 3, dtype=np.uint8).reshape(48, 64, 3)
+        assert ring.read() == (0, 0.0, None)
+        ring.write(frame)
+        seq, timestamp, copy = ring.read()
+        assert seq == 1 and timestamp > 0
+        assert np.array_equal(copy, frame)
+    finally:
+        ring.close()
@@ -0,0 +1,176 @@
+# tests/test_edge_worker.py
+import json
+import queue
+import socket
+import struct
+import threading
+
+import cv2
+import numpy as np
+import pytest
+
+import edge_worker
+from camera_registry import CameraRegistry
+from edge_worker import (EdgeReceiver, ProtocolError, encode_message, read_message, encode_snapshot_payload,
+                         decode_snapshot_payload, MSG_HELLO, MSG_FRAME, MSG_DETECTION, MSG_SNAPSHOT, HEADER)
+from frame_slots import FrameSlots
+
+
+def jpeg_bytes():
+    ret, buffer = cv2.imencode('.jpg', np.zeros((8, 8, 3), dtype=np.uint8))
+    assert ret
+    return buffer.tobytes()
+
+
+@pytest.fixture
+def pair():
+    a, b = socket.socketpair()
+    a.settimeout(2.0)
+    b.settimeout(2.0)
+    yield a, b
+    a.close()
+    b.close()
+
+
+@pytest.fixture
+def receiver(tmp_path):
+    registry = CameraRegistry(config=None, alert_queue=None, frame_dict=FrameSlots())
+    receiver = EdgeReceiver("127.0.0.1", 0, queue.Queue(), registry.frame_dict, registry,
+                            snapshot_dir=str(tmp_path), token="secret")
+    receiver.running = True
+    return receiver
+
+
+def hello(node="gate", token="secret", cameras=(0,)):
+    return encode_message(MSG_HELLO, payload=json.dumps({"node": node, "token": token, "cameras": list(cameras)}).encode())
+
+
+def test_message_round_trip(pair):
+    a, b = pair
+    a.sendall(encode_message(MSG_FRAME, 3, b"payload", timestamp=12.5) + encode_message(MSG_DETECTION, 1))
+    assert read_message(b) == (MSG_FRAME, 3, 12.5, b"payload")
+    msg_type, camera_id, timestamp, payload = read_message(b)
+    assert (msg_type, camera_id, payload) == (MSG_DETECTION, 1, b"")
+    assert timestamp > 0 # Stamped with the sender's clock when not given
+
+
+def test_bad_magic_and_oversized_payload_are_rejected(pair):
+    a, b = pair
+    a.sendall(HEADER.pack(b"XX", 1, MSG_FRAME, 0, 0.0, 0))
+    with pytest.raises(ProtocolError):
+        read_message(b)
+    a.sendall(HEADER.pack(b"SV", 1, MSG_FRAME, 0, 0.0, edge_worker.MAX_PAYLOAD_BYTES + 1))
+    with pytest.raises(ProtocolError):
+        read_message(b)
+
+
+def test_snapshot_payload_round_trip():
+    payload = encode_snapshot_payload("gate_threat.jpg", b"\xff\xd8\xffdata")
+    assert struct.unpack("!H", payload[:2]) == (len("gate_threat.jpg"),)
+    assert decode_snapshot_payload(payload) == ("gate_threat.jpg", b"\xff\xd8\xffdata")
+
+
+def test_token_check(receiver):
+    assert receiver.check_token("secret")
+    assert not receiver.check_token("wrong")
+    assert not receiver.check_token(None)
+    receiver.token = ""
+    assert not receiver.check_token("") # An unset token never authenticates anyone
+
+
+def test_receiver_refuses_to_run_without_token(receiver):
+    receiver.token = ""
+    receiver.running = False
+    receiver.run()
+    assert receiver.server is None and not receiver.running
+
+
+@pytest.mark.parametrize("filename, data, ok", [
+    ("gate_threat.jpg", None, True),
+    ("other_threat.jpg", None, False),     # Another node's prefix
+    ("gate_x.html", None, False),          # Wrong extension
+    ("gate_../../x.jpg", None, False),     # Path components
+    ("gate_threat.jpg", b"<script>", False),  # Not a JPEG
+])
+def test_valid_snapshot(filename, data, ok):
+    assert EdgeReceiver.valid_snapshot("gate", filename, jpeg_bytes() if data is None else data) is ok
+
+
+def test_handle_connection_writes_frames_detections_and_snapshots(receiver, pair, tmp_path):
+    a, b = pair
+    thread = threading.Thread(target=receiver.handle_connection, args=(b, ("10.0.0.2", 1234)))
+    thread.start()
+    a.sendall(hello())
+    a.sendall(encode_message(MSG_SNAPSHOT, 0, encode_snapshot_payload("gate_a.jpg", jpeg_bytes())))
+    a.sendall(encode_message(MSG_SNAPSHOT, 0, encode_snapshot_payload("gate_a.html", b"<script>")))
+    a.sendall(encode_message(MSG_FRAME, 0, jpeg_bytes()))
+    a.sendall(encode_message(MSG_DETECTION, 0, json.dumps({"class": "person", "snapshot_file": "gate_a.jpg"}).encode()))
+    detection = receiver.alert_queue.get(timeout=2.0)
+    assert detection["camera_id"] == "gate-0" and detection["edge_node"] == "gate"
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["gate_a.jpg"]
+    assert receiver.frame_dict.read("gate-0")[2] is not None
+    a.close()
+    thread.join(timeout=2.0)
+    assert receiver.camera_registry.get("gate-0") is None
+    assert receiver.nodes == {}
+
+
+def test_detection_drops_a_rejected_snapshot(receiver, pair, tmp_path):
+    a, b = pair
+    thread = threading.Thread(target=receiver.handle_connection, args=(b, ("10.0.0.2", 1234)))
+    thread.start()
+    a.sendall(hello())
+    a.sendall(encode_message(MSG_SNAPSHOT, 0, encode_snapshot_payload("gate_a.jpg", b"not a jpeg")))
+    a.sendall(encode_message(MSG_DETECTION, 0, json.dumps({"class": "person", "snapshot_file": "gate_a.jpg"}).encode()))
+    a.sendall(encode_message(MSG_DETECTION, 0, json.dumps({"class": "person", "snapshot_file": "gate_b.jpg"}).encode()))
+    assert receiver.alert_queue.get(timeout=2.0)["snapshot_file"] is None
+    assert receiver.alert_queue.get(timeout=2.0)["snapshot_file"] is None # Never sent at all
+    assert list(tmp_path.iterdir()) == []
+    a.close()
+    thread.join(timeout=2.0)
+
+
+@pytest.mark.parametrize("message", [
+    encode_message(MSG_SNAPSHOT, 0, b"\x00"), # Truncated: no room for the name length
+    encode_message(MSG_DETECTION, 0, b"[1, 2]"), # Valid JSON, not an object
+])
+def test_malformed_messages_close_the_session(receiver, pair, message):
+    a, b = pair
+    thread = threading.Thread(target=receiver.handle_connection, args=(b, ("10.0.0.2", 1234)))
+    thread.start()
+    a.sendall(hello())
+    a.sendall(message)
+    thread.join(timeout=2.0)
+    assert not thread.is_alive() and receiver.nodes == {}
+    assert receiver.camera_registry.get("gate-0") is None and receiver.alert_queue.empty()
+
+
+@pytest.mark.parametrize("payload", [b'["not", "an", "object"]', b'{"node": "gate", "token": "secret", "cameras": [[0]]}'])
+def test_malformed_hello_registers_nothing(receiver, pair, payload):
+    a, b = pair
+    a.sendall(encode_message(MSG_HELLO, payload=payload))
+    receiver.handle_connection(b, ("10.0.0.2", 1234))
+    assert receiver.nodes == {} and receiver.camera_registry.get("gate-0") is None
+
+
+def test_invalid_token_registers_nothing(receiver, pair):
+    a, b = pair
+    a.sendall(hello(token="wrong"))
+    receiver.handle_connection(b, ("10.0.0.2", 1234))
+    assert receiver.nodes == {} and receiver.camera_registry.get("gate-0") is None
+
+
+def test_reconnect_keeps_new_session_when_old_one_closes(receiver):
+    old, new = object(), object()
+    receiver.register_node("gate", ("10.0.0.2", 1), [0, 1], old)
+    old_entry = receiver.camera_registry.get("gate-0")
+    node = receiver.register_node("gate", ("10.0.0.2", 2), [0], new)
+    assert old_entry.removed # Replaced, not silently overwritten
+    assert receiver.camera_registry.get("gate-1") is None # Dropped from the new session
+
+    receiver.unregister_node("gate", old) # The stale connection times out later
+    assert receiver.nodes["gate"] is node
+    assert receiver.camera_registry.get("gate-0") is node["entries"]["gate-0"]
+
+    receiver.unregister_node("gate", new)
+    assert "gate" not in receiver.nodes and receiver.camera_registry.get("gate-0") is None
@@ -0,0 +1,102 @@
+# tests/test_event_log.py
+import os
+import time
+
+import pytest
+
+from event_log import DetectionEventLog
+
+HOUR = 3600
+BASE = 1_700_000_000 // HOUR * HOUR # An hour boundary
+
+
+def detection(timestamp, camera=0, cls="knife", confidence=0.9):
+    return {"timestamp": timestamp, "camera_id": camera, "class": cls, "confidence": confidence,
+            "bbox_norm": [0.1, 0.2, 0.3, 0.4]}
+
+
+@pytest.fixture
+def log(tmp_path):
+    event_log = DetectionEventLog(str(tmp_path), retention_days=0)
+    yield event_log
+    event_log.close()
+
+
+def test_query_filters_by_time_camera_class_and_confidence(log):
+    log.append(detection(BASE + 10, camera=0, cls="knife", confidence=0.9))
+    log.append(detection(BASE + 20, camera="gate-1", cls="person", confidence=0.5))
+    log.append(detection(BASE + HOUR + 5, camera=0, cls="knife", confidence=0.4))
+
+    rows = log.query(BASE, BASE + 2 * HOUR, camera=0, class_name="knife")
+    assert rows["timestamp"].tolist() == [BASE + 10, BASE + HOUR + 5]
+    assert rows["camera_id"].tolist() == ["0", "0"] and rows["class"].tolist() == ["knife", "knife"]
+    assert rows["bbox"][0].tolist() == pytest.approx([0.1, 0.2, 0.3, 0.4])
+    assert log.query(BASE, BASE + 2 * HOUR, min_confidence=0.8)["class"].tolist() == ["knife"]
+    assert log.query(BASE, BASE + HOUR, camera="gate-1")["class"].tolist() == ["person"]
+    assert len(log.query(BASE, BASE + 2 * HOUR, limit=2)["timestamp"]) == 2
+    assert len(log.query(BASE, BASE + 2 * HOUR, class_name="gun")["timestamp"]) == 0 # Unknown class
+    assert log.count(BASE, BASE + 2 * HOUR) == 3
+    assert log.count(BASE + 15, BASE + HOUR) == 1
+
+
+def test_hourly_counts(log):
+    for offset, cls in [(10, "knife"), (20, "knife"), (30, "person"), (HOUR + 1, "knife")]:
+        log.append(detection(BASE + offset, cls=cls))
+    assert log.hourly_counts(BASE, BASE + 2 * HOUR) == {
+        BASE: {"knife": 2, "person": 1},
+        BASE + HOUR: {"knife": 1},
+    }
+
+
+def test_late_rows_do_not_rotate_back(log, tmp_path):
+    log.append(detection(BASE + HOUR + 1))
+    log.append(detection(BASE + HOUR - 5)) # Late: queued across the hour boundary
+    log.append(detection(BASE + HOUR + 2))
+    assert len(os.listdir(tmp_path)) == 2 # One segment plus dictionary.json
+    # Still found by a window that ends before the active segment's hour
+    assert log.query(BASE, BASE + HOUR)["timestamp"].tolist() == [BASE + HOUR - 5]
+
+    log.append(detection(BASE + 2 * HOUR + 1)) # Rolls forward; the late row now lives in a closed segment
+    assert log.count(BASE, BASE + HOUR) == 1
+    assert log.hourly_counts(BASE, BASE + HOUR) == {BASE: {"knife": 1}}
+
+
+def test_reopened_log_keeps_rows_and_codes(tmp_path):
+    first = DetectionEventLog(str(tmp_path), retention_days=0)
+    first.append(detection(BASE + 1, camera="gate-0"))
+    first.append(detection(BASE + HOUR + 1, camera="gate-0")) # Rollover flushes the first segment
+    first.close()
+    second = DetectionEventLog(str(tmp_path), retention_days=0)
+    assert second.query(BASE, BASE + 2 * HOUR, camera="gate-0")["timestamp"].tolist() == [BASE + 1, BASE + HOUR + 1]
+
+
+def test_full_segment_overflows_into_same_period(tmp_path):
+    log = DetectionEventLog(str(tmp_path), segment_capacity=2, retention_days=0)
+    for offset in (1, 2, 3):
+        log.append(detection(BASE + offset))
+    log.close()
+    segments = sorted(n for n in os.listdir(tmp_path) if os.path.isdir(tmp_path / n))
+    assert segments == [f"{BASE:012d}_000", f"{BASE:012d}_001"]
+    assert log.count(BASE, BASE + HOUR) == 3
+
+
+def test_limit_keeps_the_newest_rows_across_segments(log):
+    for offset in (1, 2, HOUR + 1, HOUR + 2, 2 * HOUR + 1):
+        log.append(detection(BASE + offset))
+    log.append(detection(BASE + HOUR + 3)) # Late row in the newest segment
+    assert log.query(BASE, BASE + 3 * HOUR, limit=3)["timestamp"].tolist() == [BASE + HOUR + 2, BASE + HOUR + 3, BASE + 2 * HOUR + 1]
+    assert log.query(BASE, BASE + 3 * HOUR, limit=1)["timestamp"].tolist() == [BASE + 2 * HOUR + 1]
+    assert log.query(BASE, BASE + HOUR, limit=1)["timestamp"].tolist() == [BASE + 2]
+    assert len(log.query(BASE, BASE + 3 * HOUR, limit=0)["timestamp"]) == 0
+    assert len(log.query(BASE, BASE + 3 * HOUR, limit=100)["timestamp"]) == 6
+
+
+def test_retention_drops_old_segments_on_rollover(tmp_path):
+    now = time.time() // HOUR * HOUR
+    log = DetectionEventLog(str(tmp_path), retention_days=1)
+    log.append(detection(now - 3 * 86400))
+    log.append(detection(now - 3600)) # Rollover applies retention
+    log.append(detection(now + 1))
+    log.close()
+    assert log.count(0, now + HOUR) == 2
+    assert log.count(0, now - 86400) == 0
@@ -0,0 +1,82 @@
+# tests/test_frame_slots.py
+import numpy as np
+import pytest
+
+from frame_slots import FrameSlot, FrameSlots
+from streaming import FrameBroadcaster
+
+
+def frame(value, shape=(4, 4, 3)):
+    return np.full(shape, value, dtype=np.uint8)
+
+
+def test_empty_slot():
+    assert FrameSlot().read() == (0, 0.0, None)
+    assert FrameSlots().read(0) == (0, 0.0, None)
+
+
+def test_commit_publishes_back_buffer():
+    slot = FrameSlot()
+    buffer = slot.begin_write((4, 4, 3))
+    buffer[:] = 7
+    assert slot.read()[2] is None # Not visible before commit
+    slot.commit(12.5)
+    seq, timestamp, view = slot.read()
+    assert (seq, timestamp) == (1, 12.5) and (view == 7).all()
+    with pytest.raises(ValueError):
+        view[0, 0, 0] = 1 # Readers get a read-only view
+
+
+def test_buffers_alternate_without_reallocating():
+    slot = FrameSlot()
+    for value in range(6):
+        slot.write(frame(value))
+    assert slot.stats == {"writes": 6, "allocations": 2}
+    slot.write(frame(0, shape=(8, 8, 3))) # Resolution change reallocates that buffer only
+    assert slot.stats["allocations"] == 3
+
+
+def test_still_valid_until_writer_reaches_the_buffer():
+    slot = FrameSlot()
+    slot.write(frame(1))
+    seq, _, view = slot.read()
+    slot.write(frame(2)) # Writes the other buffer
+    assert slot.still_valid(seq) and (view == 1).all()
+    slot.begin_write((4, 4, 3)) # Starts overwriting the buffer `view` points at
+    assert not slot.still_valid(seq)
+    slot.commit()
+    assert slot.read()[0] == seq + 2
+
+
+def test_frame_slots_dict_interface():
+    frames = FrameSlots()
+    frames["gate-0"] = frame(3)
+    assert "gate-0" in frames and (frames.get("gate-0") == 3).all()
+    assert frames.get("missing", "default") == "default"
+    seq, _, _ = frames.read("gate-0")
+    assert frames.still_valid("gate-0", seq) and not frames.still_valid("missing", seq)
+    assert frames.get_stats()["gate-0"]["seq"] == 1
+    assert frames.pop("gate-0") is not None and "gate-0" not in frames
+    assert frames.pop("gate-0") is None
+
+
+def test_recreated_slot_continues_the_sequence():
+    frames = FrameSlots()
+    frames[0] = frame(1)
+    frames[0] = frame(2)
+    frames.pop(0) # Camera / main stream released
+    assert frames.read(0) == (0, 0.0, None)
+    frames[0] = frame(3)
+    seq, _, view = frames.read(0)
+    assert seq == 3 and (view == 3).all()
+
+
+def test_broadcaster_encodes_first_frame_after_reopen():
+    frames = FrameSlots()
+    broadcaster = FrameBroadcaster(frames)
+    broadcaster.subscribe(0)
+    frames[0] = frame(1)
+    assert broadcaster._encode(0, 1) is not None
+    frames.pop(0)
+    frames[0] = frame(2) # Would have been seq 1 again, matching encoded_seq, and been skipped
+    assert broadcaster._encode(0, 2) is not None
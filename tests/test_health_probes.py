@@ -0,0 +1,63 @@
+# tests/test_health_probes.py
+import os
+import subprocess
+import sys
+
+import pytest
+
+import main
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+class FakeRegistry:
+    def __init__(self, *entries):
+        self.entries = list(entries)
+
+    def list(self):
+        return [dict(entry) for entry in self.entries]
+
+
+def camera(camera_id, state, health=None):
+    return {"id": camera_id, "state": state, "health": health}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    registry = FakeRegistry()
+    monkeypatch.setattr(main, "camera_registry", registry)
+    return main.app.test_client(), registry
+
+
+def test_readyz_follows_camera_states(client):
+    client, registry = client
+    registry.entries = [camera(0, "loading"), camera(1, "paused")]
+    response = client.get("/readyz")
+    assert response.status_code == 503 and response.get_json()["status"] == "not_ready"
+    registry.entries[0]["state"] = "warming"
+    assert client.get("/readyz").status_code == 503
+    for state in main.READY_STATES:
+        registry.entries[0]["state"] = state
+        response = client.get("/readyz")
+        assert response.status_code == 200 and response.get_json()["cameras"] == {"0": state, "1": "paused"}
+    registry.entries[0]["state"] = "failed"
+    assert client.get("/readyz").status_code == 503
+    registry.entries = [camera(1, "stopped")] # Nothing active: ready
+    assert client.get("/readyz").status_code == 200
+
+
+def test_healthz_reports_an_offline_camera(client):
+    client, registry = client
+    offline = {"state": "offline", "last_error": "connection refused", "consecutive_failures": 3}
+    registry.entries = [camera(0, "connecting", offline), camera(1, "streaming")]
+    response = client.get("/healthz")
+    body = response.get_json()
+    assert response.status_code == 200 and body["status"] == "ok" # Liveness: the web tier itself is fine
+    assert body["cameras"] == {"0": "connecting", "1": "streaming"}
+    assert body["camera_health"] == {"0": offline}
+
+
+def test_camera_processor_import_does_not_load_ultralytics():
+    # Blocking the module makes any import of it fail, whether or not it is installed here
+    code = "import sys; sys.modules['ultralytics'] = None; import camera_processor"
+    subprocess.run([sys.executable, "-c", code], cwd=REPO_ROOT, check=True)
@@ -0,0 +1,112 @@
+# tests/test_main_stream.py
+import time
+
+import numpy as np
+import pytest
+
+from camera_health import Backoff
+from frame_slots import FrameSlots
+from main_stream import MainStream, split_source, scale_detections
+
+
+class FakeCapture:
+    def __init__(self, opened=True, frames=None):
+        self.opened = opened
+        self.frames = frames # Frames left before read() fails; None = unlimited
+        self.released = False
+
+    def isOpened(self):
+        return self.opened
+
+    def read(self):
+        time.sleep(0.005)
+        if self.frames is not None:
+            if self.frames == 0:
+                return False, None
+            self.frames -= 1
+        return True, np.zeros((8, 8, 3), dtype=np.uint8)
+
+    def release(self):
+        self.released = True
+
+
+class Factory:
+    """ Hands out the scripted captures in order, then working ones. """
+    def __init__(self, *captures):
+        self.captures = list(captures)
+        self.opens = 0
+
+    def __call__(self, source):
+        self.opens += 1
+        return self.captures.pop(0) if self.captures else FakeCapture()
+
+
+def wait_until(condition, timeout=3.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+class CopyRenderer:
+    def render(self, frame, detections, out):
+        out[:] = frame
+        return out
+
+
+@pytest.fixture
+def viewers():
+    return {}
+
+
+def make_stream(factory, viewers, idle_timeout=30.0):
+    return MainStream(0, "rtsp://cam/main", factory, frame_slots=FrameSlots(), renderer=CopyRenderer(),
+                      idle_timeout=idle_timeout, backoff=Backoff(base=0.05, maximum=0.05), viewer_count=lambda key: viewers.get(key, 0))
+
+
+def test_split_source_and_scale_detections():
+    assert split_source("rtsp://a") == ("rtsp://a", None)
+    assert split_source({"detect": "sub", "main": "main"}) == ("sub", "main")
+    assert split_source({"main": "main"}) == ("main", None)
+    scaled = scale_detections([{"bbox_norm": [0.5, 0.5, 1.0, 1.0]}, {"bbox": [1, 2, 3, 4]}], 200, 100)
+    assert scaled == [{"bbox_norm": [0.5, 0.5, 1.0, 1.0], "bbox": [100, 50, 200, 100]}]
+
+
+def test_viewers_get_retries_without_another_touch(viewers):
+    factory = Factory(FakeCapture(opened=False), FakeCapture(frames=3))
+    stream = make_stream(factory, viewers)
+    viewers[stream.stream_key] = 1
+    stream.touch() # Only once: the open fails, then the read fails, and the thread keeps retrying
+    try:
+        assert wait_until(lambda: factory.opens >= 3 and stream.health.last_frame_time is not None)
+        assert stream.health.state == "streaming" and stream.health.last_error == "read failed"
+        assert wait_until(lambda: stream.frame_slots.read(stream.stream_key)[2] is not None)
+        assert stream.stats["open_failures"] == 1
+    finally:
+        stream.close()
+
+
+def test_failure_without_viewers_waits_for_demand(viewers):
+    factory = Factory(FakeCapture(opened=False))
+    stream = make_stream(factory, viewers)
+    stream.touch()
+    assert wait_until(lambda: not stream.thread.is_alive())
+    assert factory.opens == 1 and stream.state == "failed"
+    assert stream.health.is_offline() and stream.health.to_dict()["retry_in"] is not None
+    stream.touch() # Too early: still backing off
+    assert factory.opens == 1
+    time.sleep(0.06)
+    assert stream.latest_frame(max_age=1.0) is None # Reopens in the background
+    assert wait_until(lambda: stream.latest_frame(max_age=1.0) is not None)
+    stream.close()
+
+
+def test_idle_stream_is_released(viewers):
+    capture = FakeCapture()
+    stream = make_stream(Factory(capture), viewers, idle_timeout=0.05)
+    stream.touch()
+    assert wait_until(lambda: capture.released)
+    assert wait_until(lambda: stream.state == "idle" and stream.health.state == "idle")
+    assert not stream.health.is_offline() and stream.latest is None
@@ -0,0 +1,91 @@
+# tests/test_notifications.py
+import time
+
+import pytest
+from flask import Flask
+
+from models import db, User, AlertSubscription
+from notifications import Recipient, SubscriptionIndex, in_quiet_hours, backfill_default_subscriptions
+
+
+def recipient(quiet_start=None, quiet_end=None):
+    return Recipient(1, "a@example.com", frozenset({"email"}), quiet_start, quiet_end)
+
+
+@pytest.mark.parametrize("start, end, minute, quiet", [
+    (None, None, 600, False),
+    (8 * 60, 8 * 60, 8 * 60, False),      # Empty window
+    (9 * 60, 17 * 60, 9 * 60, True),      # Start is inclusive
+    (9 * 60, 17 * 60, 17 * 60, False),    # End is exclusive
+    (22 * 60, 6 * 60, 23 * 60, True),     # Spans midnight
+    (22 * 60, 6 * 60, 5 * 60 + 59, True),
+    (22 * 60, 6 * 60, 12 * 60, False),
+])
+def test_in_quiet_hours(start, end, minute, quiet):
+    assert in_quiet_hours(recipient(start, end), minute) is quiet
+
+
+@pytest.fixture(scope="module")
+def app():
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    db.init_app(app)
+    return app
+
+
+@pytest.fixture(scope="module")
+def index(app):
+    return SubscriptionIndex(app, refresh_interval=3600) # One instance: its mapper listeners are global
+
+
+@pytest.fixture
+def database(app):
+    with app.app_context():
+        db.create_all()
+        yield db
+        db.session.remove()
+        db.drop_all()
+
+
+def add_user(email, *subscriptions):
+    user = User(email=email)
+    db.session.add(user)
+    db.session.flush()
+    for fields in subscriptions:
+        db.session.add(AlertSubscription(user_id=user.id, **fields))
+    db.session.commit()
+    return user.id
+
+
+def at(hour, minute=0):
+    return time.mktime((2026, 1, 15, hour, minute, 0, 0, 0, -1)) # Local time, like the quiet-hour columns
+
+
+def test_recipients_merge_wildcards_and_channels(database, index):
+    alice = add_user("alice@example.com", {"camera_id": "0", "class_name": "knife", "channels": "mqtt"},
+                     {"channels": "email"})
+    bob = add_user("bob@example.com", {"camera_id": "1", "channels": "email"})
+    carol = add_user("carol@example.com", {"class_name": "gun", "channels": "email"})
+    add_user("dave@example.com", {"channels": "email", "enabled": False})
+    index.refresh()
+
+    assert index.recipients(0, "knife", at(12)) == {alice: ("alice@example.com", frozenset({"email", "mqtt"}))}
+    assert set(index.recipients(1, "gun", at(12))) == {alice, bob, carol}
+    assert set(index.recipients("gate-0", "person", at(12))) == {alice}
+
+
+def test_recipients_skip_quiet_hours(database, index):
+    night_owl = add_user("owl@example.com", {"channels": "email", "quiet_start": 8 * 60, "quiet_end": 20 * 60})
+    index.refresh()
+    assert index.recipients(0, "knife", at(12)) == {}
+    assert night_owl in index.recipients(0, "knife", at(23, 30))
+
+
+def test_backfill_gives_only_unsubscribed_users_the_default(database):
+    subscribed = add_user("sub@example.com", {"camera_id": "2", "channels": "mqtt"})
+    legacy = add_user("legacy@example.com")
+    assert backfill_default_subscriptions() == 1
+    defaults = AlertSubscription.query.filter_by(user_id=legacy).all()
+    assert [(s.camera_id, s.class_name, s.channel_list(), s.enabled) for s in defaults] == [(None, None, ["email"], True)]
+    assert AlertSubscription.query.filter_by(user_id=subscribed).count() == 1
+    assert backfill_default_subscriptions() == 0
@@ -0,0 +1,42 @@
+# tests/test_preprocess.py
+import numpy as np
+import pytest
+
+from preprocess import Letterbox, LETTERBOX_PAD_VALUE, normalize_bbox
+
+
+def test_wide_frame_is_padded_top_and_bottom():
+    letterbox = Letterbox(640, 480)
+    canvas = letterbox(np.zeros((720, 1280, 3), dtype=np.uint8))
+    assert canvas.shape == (480, 640, 3)
+    assert letterbox.scale == pytest.approx(0.5) and (letterbox.pad_x, letterbox.pad_y) == (0, 60)
+    assert (canvas[:60] == LETTERBOX_PAD_VALUE).all() and (canvas[420:] == LETTERBOX_PAD_VALUE).all()
+    assert (canvas[60:420] == 0).all()
+
+
+def test_to_native_inverts_the_letterbox():
+    letterbox = Letterbox(640, 480)
+    letterbox(np.zeros((720, 1280, 3), dtype=np.uint8))
+    # A box at native (100, 200)-(300, 400) sits at canvas (50, 160)-(150, 260)
+    assert letterbox.to_native([50, 160, 150, 260]) == pytest.approx([100, 200, 300, 400])
+
+
+def test_to_native_tall_frame_and_clipping():
+    letterbox = Letterbox(640, 480)
+    letterbox(np.zeros((960, 480, 3), dtype=np.uint8)) # Scale 0.5, pillarboxed: pad_x = 200
+    assert letterbox.pad_x == 200 and letterbox.pad_y == 0
+    assert letterbox.to_native([210, 10, 250, 50]) == pytest.approx([20, 20, 100, 100])
+    # Boxes reaching into the padding are clipped to the source frame
+    assert letterbox.to_native([0, -5, 640, 480]) == pytest.approx([0, 0, 480, 960])
+
+
+def test_buffers_are_reused_until_resolution_changes():
+    letterbox = Letterbox(320, 240)
+    first = letterbox(np.zeros((480, 640, 3), dtype=np.uint8))
+    assert letterbox(np.ones((480, 640, 3), dtype=np.uint8)) is first
+    letterbox(np.zeros((240, 640, 3), dtype=np.uint8))
+    assert letterbox.pad_y == 60 # Rebuilt for the new shape
+
+
+def test_normalize_bbox():
+    assert normalize_bbox([100, 200, 300, 400], 1280, 720) == pytest.approx([100 / 1280, 200 / 720, 300 / 1280, 400 / 720])
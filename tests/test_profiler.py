@@ -0,0 +1,40 @@
+# tests/test_profiler.py
+import threading
+
+import pytest
+
+from profiler import SamplingProfiler, parse_thread_prefixes, DEFAULT_THREAD_PREFIXES
+
+
+def test_parse_thread_prefixes_defaults_when_missing():
+    assert parse_thread_prefixes(None) == DEFAULT_THREAD_PREFIXES
+
+
+def test_parse_thread_prefixes_accepts_list_of_names():
+    assert parse_thread_prefixes(["Camera-1", " Stream "]) == ("Camera-1", "Stream")
+
+
+@pytest.mark.parametrize("value", ["Camera", [], [""], ["  "], ["Camera", 3], [None], {"Camera": 1}, 7])
+def test_parse_thread_prefixes_rejects_invalid(value):
+    with pytest.raises(ValueError):
+        parse_thread_prefixes(value)
+
+
+def test_samples_only_selected_threads():
+    stop = threading.Event()
+    workers = [threading.Thread(target=stop.wait, name=name, daemon=True) for name in ("Camera-7", "Other")]
+    for worker in workers:
+        worker.start()
+    profiler = SamplingProfiler()
+    try:
+        assert profiler.start(duration=5, interval=0.005, thread_prefixes=("Camera",))
+        assert not profiler.start(duration=5) # One session at a time
+        while profiler.samples_taken < 3:
+            stop.wait(0.005)
+    finally:
+        profiler.stop()
+        stop.set()
+    status = profiler.status()
+    assert not status["running"]
+    assert set(status["samples_per_thread"]) == {"Camera-7"}
+    assert all(line.startswith("Camera-7;") for line in profiler.collapsed().splitlines())
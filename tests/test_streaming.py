@@ -0,0 +1,143 @@
+# tests/test_streaming.py
+import threading
+import time
+
+import numpy as np
+import pytest
+
+import camera_processor
+from camera_registry import CameraRegistry
+from config import Config
+from frame_slots import FrameSlots
+from streaming import FrameBroadcaster, OFFLINE_MESSAGE, status_part, select_stream
+
+
+@pytest.fixture
+def setup(tmp_path, monkeypatch):
+    monkeypatch.setattr(camera_processor.CameraProcessor, "start", lambda self: None) # Threads never run
+    config = type("TestConfig", (Config,), {"SNAPSHOT_DIR": str(tmp_path)})
+    frames = FrameSlots()
+    broadcaster = FrameBroadcaster(frames)
+    registry = CameraRegistry(config, None, frames, viewer_count=broadcaster.viewers, drop_streams=broadcaster.drop)
+    broadcaster.health_source = registry.stream_health
+    return broadcaster, registry, frames
+
+
+def test_viewer_counts_per_stream_key():
+    broadcaster = FrameBroadcaster(FrameSlots())
+    broadcaster.subscribe(0)
+    broadcaster.subscribe(0)
+    broadcaster.subscribe((0, "main"))
+    assert (broadcaster.viewers(0), broadcaster.viewers((0, "main")), broadcaster.viewers(1)) == (2, 1, 0)
+    broadcaster.unsubscribe(0)
+    broadcaster.unsubscribe((0, "main"))
+    broadcaster.unsubscribe((0, "main")) # Extra unsubscribe is harmless
+    assert broadcaster.viewer_counts() == {0: 1}
+
+
+def test_restarted_camera_sees_open_streams(setup):
+    broadcaster, registry, _ = setup
+    entry = registry.add("rtsp://cam/a")
+    broadcaster.subscribe(entry.camera_id) # Stream opened against the first thread
+    registry.reconfigure(entry.camera_id, source="rtsp://cam/b")
+    registry.pause(entry.camera_id)
+    registry.resume(entry.camera_id)
+    assert entry.processor.viewers == 1 # The new thread publishes for the stream that was already open
+    broadcaster.unsubscribe(entry.camera_id)
+    assert entry.processor.viewers == 0
+
+
+def test_offline_frame_follows_current_thread(setup):
+    broadcaster, registry, frames = setup
+    entry = registry.add("rtsp://cam/a")
+    broadcaster.subscribe(entry.camera_id)
+    registry.reconfigure(entry.camera_id, settings={"detect_every_n_frames": 2})
+    entry.processor.health.failed("refused", retry_in=5.0)
+    assert broadcaster._encode(entry.camera_id, 1) == (1, status_part(OFFLINE_MESSAGE))
+    assert broadcaster._encode(entry.camera_id, 2) is None # Already showing the offline frame
+
+    entry.processor.health.connected()
+    frames[entry.camera_id] = np.zeros((8, 8, 3), dtype=np.uint8)
+    version, chunk = broadcaster._encode(entry.camera_id, 3)
+    assert version == 3 and chunk.startswith(b"--frame\r\nContent-Type: image/jpeg")
+
+
+def test_removing_a_camera_ends_its_open_streams(setup):
+    broadcaster, registry, frames = setup
+    entry = registry.add("rtsp://cam/a")
+    broadcaster.subscribe(entry.camera_id)
+    broadcaster.subscribe((entry.camera_id, "main"))
+    woken = []
+    broadcaster.add_listener(woken.append)
+    waiting = threading.Thread(target=lambda: woken.append(broadcaster.wait_for(entry.camera_id, None, timeout=5.0)))
+    waiting.start()
+    time.sleep(0.05)
+    started = time.time()
+    registry.remove(entry.camera_id)
+    waiting.join(timeout=2.0)
+    assert time.time() - started < 1.0 and not waiting.is_alive() # A blocked stream thread wakes up
+    assert not broadcaster.is_watched(entry.camera_id) and not broadcaster.is_watched((entry.camera_id, "main"))
+    assert entry.camera_id in woken and (entry.camera_id, "main") in woken # Async streams are woken too
+    assert broadcaster.viewer_counts() == {}
+    broadcaster.unsubscribe(entry.camera_id) # The stream's own cleanup afterwards is harmless
+    assert broadcaster.viewer_counts() == {}
+
+
+def test_stream_health_of_unknown_or_single_stream_camera(setup):
+    _, registry, _ = setup
+    entry = registry.add("rtsp://cam/a")
+    assert registry.stream_health("nope") is None
+    assert registry.stream_health((entry.camera_id, "main")) is None # No main stream configured
+    assert select_stream(entry.camera_id, entry.processor, "full") == entry.camera_id
+
+
+def test_versions_are_consecutive_per_stream():
+    frames = FrameSlots()
+    broadcaster = FrameBroadcaster(frames, fps=200)
+    broadcaster.subscribe(0)
+    broadcaster.subscribe(1) # Another watched camera must not bump camera 0's versions
+    broadcaster.start()
+    try:
+        seen = []
+        version = None
+        for value in range(3):
+            frames[0] = np.full((8, 8, 3), value, dtype=np.uint8)
+            frames[1] = np.full((8, 8, 3), value, dtype=np.uint8)
+            version, _ = broadcaster.wait_for(0, version, timeout=2.0)
+            seen.append(version)
+        assert seen == [1, 2, 3]
+    finally:
+        broadcaster.stop()
+
+
+def test_async_stream_ends_when_camera_is_removed(setup, monkeypatch):
+    pytest.importorskip("asgiref")
+    pytest.importorskip("uvicorn")
+    import asyncio
+    from flask import Flask
+    from async_server import AsyncStreamServer
+
+    broadcaster, registry, _ = setup
+    entry = registry.add("rtsp://cam/a")
+    server = AsyncStreamServer(Flask(__name__), broadcaster, registry, placeholder_interval=0.05)
+    monkeypatch.setattr(server, "_authenticate", lambda scope: True)
+    sent = []
+
+    async def receive():
+        await asyncio.sleep(3600) # Client never disconnects
+
+    async def send(message):
+        sent.append(message)
+
+    async def run():
+        server.loop = asyncio.get_running_loop()
+        broadcaster.add_listener(server._on_frame)
+        scope = {"type": "http", "path": f"/video_feed/{entry.camera_id}", "query_string": b"", "headers": []}
+        stream = asyncio.create_task(server._stream(scope, receive, send))
+        await asyncio.sleep(0.1)
+        registry.remove(entry.camera_id)
+        await asyncio.wait_for(stream, timeout=2.0)
+
+    asyncio.run(run())
+    assert sent[-1] == {"type": "http.response.body", "body": b"", "more_body": False}
+    assert server.stats["clients"] == 0
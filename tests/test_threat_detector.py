@@ -0,0 +1,83 @@
+# tests/test_threat_detector.py
+import sys
+import types
+
+import numpy as np
+import pytest
+
+from camera_processor import ThreatDetector
+
+NAMES = {0: "person", 1: "knife", 2: "car"}
+
+
+class FakeBox:
+    def __init__(self, class_id, confidence, bbox):
+        self.cls = np.array([class_id])
+        self.conf = np.array([confidence])
+        self.xyxy = np.array([bbox], dtype=float)
+
+
+class FakeResult:
+    def __init__(self, boxes):
+        self.boxes = boxes
+
+
+class FakeModel:
+    """ Stands in for a YOLO model: returns scripted boxes and records the input shapes it saw. """
+    def __init__(self, path):
+        self.path = path
+        self.names = NAMES
+        self.boxes = []
+        self.calls = []
+
+    def __call__(self, frame, conf, verbose):
+        self.calls.append(frame.shape)
+        return [FakeResult(list(self.boxes))]
+
+
+@pytest.fixture
+def fake_yolo(monkeypatch):
+    monkeypatch.setitem(sys.modules, "ultralytics", types.SimpleNamespace(YOLO=FakeModel))
+
+
+def make_detector(screen=True, escalate_on_crops=False):
+    return ThreatDetector("main.pt", 0.5, ["knife"], "person", screen_model_path="screen.pt" if screen else None,
+                          escalate_on_crops=escalate_on_crops, crop_margin=0.0)
+
+
+def frame():
+    return np.zeros((480, 640, 3), dtype=np.uint8)
+
+
+def test_screen_negative_skips_the_main_model(fake_yolo):
+    detector = make_detector()
+    detector.model.boxes = [FakeBox(1, 0.9, (10, 10, 50, 50))]
+    detector.screen_model.boxes = [FakeBox(2, 0.8, (0, 0, 100, 100))] # Only a car: not a candidate
+    assert detector.detect(frame()) == []
+    assert detector.model.calls == [] and len(detector.screen_model.calls) == 1
+    stats = detector.get_stats()
+    assert (stats["frames"], stats["frames_escalated"], stats["screen_hit_rate"]) == (1, 0, 0.0)
+
+
+def test_crop_detections_map_back_to_frame_coordinates(fake_yolo):
+    detector = make_detector(escalate_on_crops=True)
+    detector.screen_model.boxes = [FakeBox(0, 0.6, (100, 100, 140, 180))]
+    detector.model.boxes = [FakeBox(1, 0.9, (10, 20, 30, 40))] # In crop coordinates
+    detections = detector.detect(frame())
+    # Crop = candidate box + the fixed 16px margin: (84, 84)-(156, 196)
+    assert detector.model.calls == [(112, 72, 3)]
+    assert detections == [{"class": "knife", "confidence": 0.9, "is_primary_threat": True, "bbox": [94.0, 104.0, 114.0, 124.0]}]
+    assert detector.get_stats()["confirm_rate"] == 1.0
+
+
+def test_full_frame_escalation_matches_detect_without_cascade(fake_yolo):
+    cascade = make_detector()
+    plain = make_detector(screen=False)
+    for detector in (cascade, plain):
+        detector.model.boxes = [FakeBox(1, 0.9, (10, 20, 30, 40)), FakeBox(0, 0.7, (100, 100, 200, 300))]
+    cascade.screen_model.boxes = [FakeBox(0, 0.4, (100, 100, 200, 300))]
+    expected = plain.detect(frame())
+    assert len(expected) == 2
+    assert cascade.detect(frame()) == expected == cascade.detect_without_cascade(frame())
+    assert cascade.model.calls[0] == (480, 640, 3) # The whole frame, not a crop
+    assert not plain.get_stats()["cascade_enabled"] and cascade.get_stats()["frames_escalated"] == 1
@@ -0,0 +1,74 @@
+# tests/test_tiling.py
+import numpy as np
+import pytest
+
+from tiling import tile_grid, merge_detections, TiledInference
+
+
+def det(cls, confidence, bbox):
+    return {"class": cls, "confidence": confidence, "bbox": list(bbox)}
+
+
+def test_tile_grid_covers_frame_with_edge_flush_tiles():
+    tiles = tile_grid(1500, 700, 640, 0.2)
+    assert all(x1 - x0 == 640 and y1 - y0 == 640 for x0, y0, x1, y1 in tiles)
+    assert max(x1 for _, _, x1, _ in tiles) == 1500 and max(y1 for _, _, _, y1 in tiles) == 700
+    assert tile_grid(320, 240, 640, 0.2) == [(0, 0, 320, 240)] # Smaller than one tile
+
+
+def test_merge_drops_overlapping_lower_confidence_box():
+    merged = merge_detections([det("person", 0.6, (12, 10, 110, 210)), det("person", 0.9, (10, 10, 110, 200))])
+    assert len(merged) == 1
+    assert merged[0]["confidence"] == 0.9
+
+
+def test_merge_keeps_other_classes_and_separate_objects():
+    merged = merge_detections([det("person", 0.9, (0, 0, 100, 200)), det("knife", 0.8, (0, 0, 100, 200)),
+                               det("person", 0.7, (500, 0, 600, 200))])
+    assert sorted((d["class"], d["confidence"]) for d in merged) == [("knife", 0.8), ("person", 0.7), ("person", 0.9)]
+
+
+def test_merge_unions_object_cut_by_tile_edge():
+    # One person split by a tile boundary at x=512: a wide half and a sliver mostly inside it
+    merged = merge_detections([det("person", 0.9, (400, 100, 520, 300)), det("person", 0.5, (500, 110, 515, 290))])
+    assert len(merged) == 1
+    assert merged[0]["bbox"] == pytest.approx([400, 100, 520, 300])
+    merged = merge_detections([det("person", 0.9, (400, 100, 520, 300)), det("person", 0.5, (380, 90, 450, 200))],
+                              containment_threshold=0.4)
+    assert merged[0]["bbox"] == pytest.approx([380, 90, 520, 300])
+
+
+def test_merge_empty():
+    assert merge_detections([]) == []
+
+
+class FakeDetector:
+    """ Reports one box at the same tile-local position in every tile it is given. """
+    def __init__(self):
+        self.batches = []
+
+    def detect_batch(self, crops):
+        self.batches.append(len(crops))
+        return [[det("person", 0.9, (0, 0, 10, 10))] for _ in crops]
+
+
+def test_tiled_detect_offsets_boxes_and_batches():
+    detector = FakeDetector()
+    tiled = TiledInference(detector, tile_size=640, overlap=0.0, max_tiles_per_batch=3)
+    detections = tiled.detect(np.zeros((1280, 1280, 3), dtype=np.uint8)) # First frame: full scan of 4 tiles
+    assert detector.batches == [3, 1]
+    assert sorted(tuple(d["bbox"][:2]) for d in detections) == [(0, 0), (0, 640), (640, 0), (640, 640)]
+    assert tiled.stats == {"frames": 1, "tiles_total": 4, "tiles_run": 4}
+
+
+def test_tiled_detect_only_runs_tiles_with_motion_or_tracks():
+    detector = FakeDetector()
+    tiled = TiledInference(detector, tile_size=640, overlap=0.0, full_scan_interval=3600, track_ttl=0.0)
+    frame = np.zeros((1280, 1280, 3), dtype=np.uint8)
+    tiled.detect(frame)
+    moved = frame.copy()
+    moved[700:900, 700:900] = 255 # Motion only in the bottom-right tile
+    detector.batches = []
+    tiled.detect(moved)
+    assert detector.batches == [1]
+    assert tiled.detect(moved) == [] # No motion, no live tracks
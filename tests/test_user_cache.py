@@ -0,0 +1,119 @@
+# tests/test_user_cache.py
+import pytest
+from flask import Flask
+
+import user_cache
+from models import db, User
+from user_cache import UserCache, CachedUser
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(user_cache.time, "time", clock.time)
+    return clock
+
+
+def counting_loader(users):
+    calls = []
+    def load(user_id):
+        calls.append(user_id)
+        return users.get(user_id)
+    return load, calls
+
+
+def test_hits_until_ttl_expires(clock):
+    load, calls = counting_loader({1: CachedUser(1, "a@example.com")})
+    cache = UserCache(load, ttl=60.0)
+    assert cache.get(1).email == "a@example.com"
+    clock.now += 59
+    assert cache.get(1).email == "a@example.com"
+    assert calls == [1]
+    clock.now += 2
+    cache.get(1)
+    assert calls == [1, 1]
+    assert cache.get_stats() == {"hits": 1, "misses": 2, "invalidations": 0, "size": 1, "hit_rate": 0.3333}
+
+
+def test_unknown_ids_are_not_cached(clock):
+    users = {}
+    load, calls = counting_loader(users)
+    cache = UserCache(load)
+    assert cache.get(7) is None
+    users[7] = CachedUser(7, "new@example.com") # Registered right after the miss
+    assert cache.get(7).email == "new@example.com"
+    assert calls == [7, 7] and cache.get_stats()["size"] == 1
+
+
+def test_lru_eviction(clock):
+    load, calls = counting_loader({i: CachedUser(i, f"{i}@example.com") for i in range(3)})
+    cache = UserCache(load, max_size=2)
+    cache.get(0)
+    cache.get(1)
+    cache.get(0) # 1 is now least recently used
+    cache.get(2)
+    assert list(cache.entries) == [0, 2]
+
+
+def test_invalidate_and_clear(clock):
+    load, calls = counting_loader({1: CachedUser(1, "a@example.com")})
+    cache = UserCache(load)
+    cache.get(1)
+    cache.invalidate(1)
+    cache.invalidate(1) # Already gone: not counted again
+    cache.get(1)
+    assert calls == [1, 1] and cache.get_stats()["invalidations"] == 1
+    cache.clear()
+    assert cache.get_stats()["size"] == 0
+
+
+@pytest.fixture(scope="module")
+def app():
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    db.init_app(app)
+    return app
+
+
+@pytest.fixture(scope="module")
+def listening_cache(app):
+    cache = UserCache(lambda user_id: CachedUser.from_model(db.session.get(User, user_id)))
+    cache.listen(User) # Once per module: the listeners are global
+    return cache
+
+
+def test_database_changes_invalidate(app, listening_cache):
+    with app.app_context():
+        db.create_all()
+        try:
+            user = User(email="old@example.com")
+            db.session.add(user)
+            db.session.commit()
+            user_id = user.id
+            assert listening_cache.get(user_id).email == "old@example.com"
+
+            user.email = "new@example.com"
+            db.session.commit()
+            assert listening_cache.get(user_id).email == "new@example.com"
+
+            db.session.delete(user)
+            db.session.commit()
+            assert listening_cache.get(user_id) is None
+
+            missing_id = user_id + 1
+            assert listening_cache.get(missing_id) is None
+            newcomer = User(id=missing_id, email="newcomer@example.com")
+            db.session.add(newcomer)
+            db.session.commit()
+            assert listening_cache.get(missing_id).email == "newcomer@example.com"
+        finally:
+            db.session.remove()
+            db.drop_all()
@@ -0,0 +1,177 @@
+# tiling.py
+import time
+
+import cv2
+import numpy as np
+
+
+def tile_grid(width, height, tile_size, overlap):
+    """ Overlapping tile rectangles [(x0, y0, x1, y1)] covering a width x height frame. """
+    stride = max(1, int(tile_size * (1.0 - overlap)))
+    def starts(length):
+        if length <= tile_size:
+            return [0]
+        positions = list(range(0, length - tile_size, stride))
+        positions.append(length - tile_size) # Last tile flush with the edge
+        return sorted(set(positions))
+    return [(x, y, min(x + tile_size, width), min(y + tile_size, height))
+            for y in starts(height) for x in starts(width)]
+
+
+def merge_detections(detections, iou_threshold=0.5, containment_threshold=0.7):
+    """
+    Cross-tile NMS per class. Boxes overlapping a higher-confidence box by IoU are dropped; boxes
+    mostly contained in one (an object cut by a tile edge) are folded into it by taking the union.
+    """
+    merged = []
+    by_class = {}
+    for detection in detections:
+        by_class.setdefault(detection["class"], []).append(detection)
+
+    for class_detections in by_class.values():
+        class_detections.sort(key=lambda d: d["confidence"], reverse=True)
+        boxes = np.array([d["bbox"] for d in class_detections], dtype=np.float32)
+        areas = np.maximum(boxes[:, 2] - boxes[:, 0], 0) * np.maximum(boxes[:, 3] - boxes[:, 1], 0)
+        alive = np.ones(len(class_detections), dtype=bool)
+        for i in range(len(class_detections)):
+            if not alive[i]:
+                continue
+            keep = dict(class_detections[i])
+            box = boxes[i].copy()
+            rest = np.nonzero(alive[i + 1:])[0] + i + 1
+            if len(rest):
+                ix0 = np.maximum(box[0], boxes[rest, 0]); iy0 = np.maximum(box[1], boxes[rest, 1])
+                ix1 = np.minimum(box[2], boxes[rest, 2]); iy1 = np.minimum(box[3], boxes[rest, 3])
+                inter = np.maximum(ix1 - ix0, 0) * np.maximum(iy1 - iy0, 0)
+                iou = inter / np.maximum(areas[i] + areas[rest] - inter, 1e-6)
+                containment = inter / np.maximum(np.minimum(areas[i], areas[rest]), 1e-6)
+                for j in rest[containment > containment_threshold]:
+                    # Same object split across tiles: grow the kept box to cover both halves
+                    box = np.array([min(box[0], boxes[j, 0]), min(box[1], boxes[j, 1]),
+                                    max(box[2], boxes[j, 2]), max(box[3], boxes[j, 3])], dtype=np.float32)
+                alive[rest[(iou > iou_threshold) | (containment > containment_threshold)]] = False
+            keep["bbox"] = [float(v) for v in box]
+            merged.append(keep)
+    return merged
+
+
+class TiledInference:
+    """
+    Runs detection on the native-resolution frame by cutting it into overlapping tiles, but only
+    on tiles with recent motion or recent detections, batched into one model call.
+    """
+    def __init__(self, detector, tile_size=640, overlap=0.2, motion_threshold=25, motion_min_fraction=0.002,
+                 track_ttl=2.0, full_scan_interval=10.0, max_tiles_per_batch=16, motion_scale=0.25):
+        self.detector = detector
+        self.tile_size = tile_size
+        self.overlap = overlap
+        self.motion_threshold = motion_threshold # Per-pixel grey-level change counted as motion
+        self.motion_min_fraction = motion_min_fraction # Fraction of a tile's pixels that must change
+        self.track_ttl = track_ttl # Seconds a detection keeps its tiles active
+        self.full_scan_interval = full_scan_interval # Periodic full pass so static objects aren't missed forever
+        self.max_tiles_per_batch = max_tiles_per_batch
+        self.motion_scale = motion_scale
+        self.tiles = []
+        self.frame_shape = None
+        self.previous_gray = None
+        self.recent_boxes = [] # [(expires_at, bbox)]
+        self.last_full_scan = 0.0
+        self.stats = {"frames": 0, "tiles_total": 0, "tiles_run": 0}
+
+    def _motion_tiles(self, frame):
+        small = cv2.resize(frame, None, fx=self.motion_scale, fy=self.motion_scale, interpolation=cv2.INTER_AREA)
+        gray = cv2.GaussianBlur(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), (5, 5), 0)
+        previous, self.previous_gray = self.previous_gray, gray
+        if previous is None or previous.shape != gray.shape:
+            return set(range(len(self.tiles))) # No history yet: look everywhere
+        changed = cv2.absdiff(gray, previous) > self.motion_threshold
+        # Integral image gives every tile's changed-pixel count in O(1)
+        integral = cv2.integral(changed.astype(np.uint8))
+        active = set()
+        for index, (x0, y0, x1, y1) in enumerate(self.tiles):
+            sx0, sy0 = int(x0 * self.motion_scale), int(y0 * self.motion_scale)
+            sx1, sy1 = int(x1 * self.motion_scale), int(y1 * self.motion_scale)
+            count = integral[sy1, sx1] - integral[sy0, sx1] - integral[sy1, sx0] + integral[sy0, sx0]
+            if count >= self.motion_min_fraction * max((sx1 - sx0) * (sy1 - sy0), 1):
+                active.add(index)
+        return active
+
+    def _track_tiles(self, now):
+        self.recent_boxes = [(expires, box) for expires, box in self.recent_boxes if expires > now]
+        active = set()
+        for _, (bx0, by0, bx1, by1) in self.recent_boxes:
+            for index, (x0, y0, x1, y1) in enumerate(self.tiles):
+                if bx0 < x1 and bx1 > x0 and by0 < y1 and by1 > y0:
+                    active.add(index)
+        return active
+
+    def select_tiles(self, frame):
+        """ Indices of tiles that need inference this frame. """
+        height, width = frame.shape[:2]
+        if self.frame_shape != (height, width):
+            self.frame_shape = (height, width)
+            self.tiles = tile_grid(width, height, self.tile_size, self.overlap)
+            self.previous_gray = None
+        now = time.time()
+        motion = self._motion_tiles(frame)
+        if now - self.last_full_scan >= self.full_scan_interval:
+            self.last_full_scan = now
+            return list(range(len(self.tiles)))
+        return sorted(motion | self._track_tiles(now))
+
+    def detect(self, frame):
+        """ Returns detections in full-frame pixel coordinates. """
+        selected = self.select_tiles(frame)
+        self.stats["frames"] += 1
+        self.stats["tiles_total"] += len(self.tiles)
+        self.stats["tiles_run"] += len(selected)
+        if not selected:
+            return []
+
+        detections = []
+        for start in range(0, len(selected), self.max_tiles_per_batch):
+            batch = selected[start:start + self.max_tiles_per_batch]
+            crops = [frame[y0:y1, x0:x1] for (x0, y0, x1, y1) in (self.tiles[i] for i in batch)]
+            for index, tile_detections in zip(batch, self.detector.detect_batch(crops)):
+                x0, y0 = self.tiles[index][:2]
+                for detection in tile_detections:
+                    bx0, by0, bx1, by1 = detection["bbox"]
+                    detection["bbox"] = [bx0 + x0, by0 + y0, bx1 + x0, by1 + y0]
+                    detections.append(detection)
+
+        detections = merge_detections(detections)
+        expires = time.time() + self.track_ttl
+        self.recent_boxes.extend((expires, d["bbox"]) for d in detections)
+        return detections
+
+
+"""
+tiling.py
+
+Tiled inference for high-resolution cameras.
+
+Resizing a 4K frame to 640x480 shrinks small objects (knives, guns) to a few pixels. With tiling,
+the native frame is cut into overlapping `tile_size` squares that are fed to the model at native
+resolution. To keep the cost manageable only some tiles run each frame:
+
+    - tiles with motion (frame differencing on a downscaled grey image, counted with an integral image)
+    - tiles overlapping detections from the last `track_ttl` seconds (so stationary threats stay tracked)
+    - every tile, every `full_scan_interval` seconds
+
+Selected tiles are batched into one model call (`ThreatDetector.detect_batch`), offset back into
+full-frame coordinates and merged with per-class cross-tile NMS (`merge_detections`), which also
+folds together boxes of an object cut in half by a tile edge.
+
+class TiledInference:
+
+    Args:
+        detector (ThreatDetector): Detector providing `detect_batch(frames)`.
+        tile_size (int): Tile edge in native pixels (normally the model's input size).
+        overlap (float): Fraction of overlap between neighbouring tiles.
+
+    Methods:
+        select_tiles(frame): Indices of tiles needing inference.
+        detect(frame): Detections in full-frame coordinates.
+
+Enabled per camera with the `enable_tiling` setting (default `Config.TILING_ENABLED`).
+"""
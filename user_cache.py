@@ -0,0 +1,119 @@
+# user_cache.py
+import time
+import threading
+from collections import OrderedDict
+
+from flask_login import UserMixin
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+
+class CachedUser(UserMixin):
+    """ Detached, read-only snapshot of a `User` row; safe to share between request threads. """
+    def __init__(self, id, email):
+        self.id = id
+        self.email = email
+
+    @classmethod
+    def from_model(cls, user):
+        return cls(user.id, user.email) if user is not None else None
+
+    def __repr__(self):
+        return f'<CachedUser {self.email}>'
+
+
+class UserCache:
+    """
+    Bounded LRU cache of `CachedUser` snapshots with a TTL, behind the Flask-Login user loader.
+    Entries are dropped when the user row is updated or deleted; unknown IDs are not cached.
+    """
+    def __init__(self, loader, max_size=1024, ttl=60.0):
+        self.loader = loader # user_id -> CachedUser or None (hits the database)
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict() # user_id -> (expires_at, CachedUser or None)
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    def get(self, user_id):
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(user_id)
+            if entry is not None and entry[0] > now:
+                self.entries.move_to_end(user_id)
+                self.stats["hits"] += 1
+                return entry[1]
+            self.stats["misses"] += 1
+        user = self.loader(user_id) # Outside the lock so one slow query doesn't block other users
+        if user is None:
+            return None # Not cached: the ID may be registered next, and nothing invalidates on insert
+        with self.lock:
+            self.entries[user_id] = (now + self.ttl, user)
+            self.entries.move_to_end(user_id)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+        return user
+
+    def invalidate(self, user_id):
+        with self.lock:
+            if self.entries.pop(user_id, None) is not None:
+                self.stats["invalidations"] += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def listen(self, user_model):
+        """ Drops cached users on update/delete: at flush, and again after commit (a concurrent miss
+        between the two could otherwise re-cache the pre-commit row). """
+        def changed(mapper, connection, target):
+            self.invalidate(target.id)
+            session = object_session(target)
+            if session is not None:
+                session.info.setdefault("changed_user_ids", set()).add(target.id)
+
+        event.listen(user_model, "after_update", changed)
+        event.listen(user_model, "after_delete", changed)
+
+        def after_commit(session):
+            for user_id in session.info.pop("changed_user_ids", ()):
+                self.invalidate(user_id)
+
+        event.listen(Session, "after_commit", after_commit)
+
+    def get_stats(self):
+        with self.lock:
+            stats = dict(self.stats, size=len(self.entries))
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else None
+        return stats
+
+
+"""
+user_cache.py
+
+Cache behind the Flask-Login `user_loader`.
+
+Every authenticated request (dashboard polling of /api/alerts and /api/security_mode from many
+tabs, every /video_feed connection) calls the user loader; without a cache that is one SQLite
+query per request.
+
+class CachedUser:
+
+    What the loader returns: a plain `UserMixin` with `id` and `email`, not an ORM object, so it is
+    not bound to any request's database session and can be shared across threads. Code needing the
+    full row (e.g. password checks at login) queries `User` directly.
+
+class UserCache:
+
+    Args:
+        loader (callable): user_id -> CachedUser or None, called on a miss.
+        max_size (int): Maximum cached users (LRU eviction), `Config.USER_CACHE_MAX_SIZE`.
+        ttl (float): Seconds an entry is trusted, `Config.USER_CACHE_TTL_SECONDS`.
+
+    Methods:
+        get(user_id): Cached snapshot (loads on miss/expiry).
+        invalidate(user_id) / clear(): Drop entries.
+        listen(User): Invalidate automatically on SQLAlchemy update/delete events.
+        get_stats(): Hits, misses, hit rate, size.
+"""